@@ -1,68 +1,89 @@
-import asyncio
 import threading
 from datetime import datetime, time
-import json
-import os
+from alarm_scheduler import AlarmScheduler
+from alarm_store import AlarmStore
 
 
 class AlarmManager:
-   def __init__(self, ring):
+   def __init__(self, ring, store=None):
        self.ring = ring
-       self.alarms = []
-       self.alarm_file = "alarms.json"
+       self.store = store if store is not None else AlarmStore()  # Index par id, journal sur disque
        self.running = False
        self.alarm_task = None
+       self.scheduler = AlarmScheduler(self.fire_alarms)
+       self.offloaded = set()  # Ids des alarmes déclenchées par la bague elle-même
+       self.sync = None  # AlarmSync optionnel: report des modifications sur la bague
        self.load_alarms()
   
+   @property
+   def alarms(self):
+       """Alarmes dans l'ordre de création"""
+       return list(self.store)
+  
    def load_alarms(self):
-       """Charger les alarmes depuis le fichier"""
-       try:
-           if os.path.exists(self.alarm_file):
-               with open(self.alarm_file, 'r') as f:
-                   self.alarms = json.load(f)
-       except Exception as e:
-           print(f"❌ Erreur chargement alarmes: {e}")
-           self.alarms = []
+       """Charger les alarmes depuis le fichier (instantané + journal)"""
+       self.store.load()
   
-   def save_alarms(self):
-       """Sauvegarder les alarmes dans le fichier"""
-       try:
-           with open(self.alarm_file, 'w') as f:
-               json.dump(self.alarms, f, indent=2)
-       except Exception as e:
-           print(f"❌ Erreur sauvegarde alarmes: {e}")
+   def _schedule(self, alarm):
+       """Planifier sur l'hôte, sauf les alarmes confiées à la bague"""
+       if alarm["id"] in self.offloaded:
+           self.scheduler.unschedule(alarm["id"])
+       else:
+           self.scheduler.schedule(alarm)
+  
+   def _changed(self):
+       if self.sync:
+           self.sync.request()
+  
+   def set_offloaded(self, alarm_ids):
+       """Alarmes programmées sur la bague: retirées du planificateur de l'hôte"""
+       self.offloaded = set(alarm_ids)
+       for alarm in self.store:
+           self._schedule(alarm)
+  
+   async def close(self):
+       """Écrire les dernières modifications et compacter le journal"""
+       await self.store.close()
   
    def add_alarm(self, hour, minute, label="Alarme", enabled=True):
        """Ajouter une nouvelle alarme"""
-       alarm_id = len(self.alarms) + 1
-       alarm = {
-           "id": alarm_id,
-           "hour": hour,
-           "minute": minute,
-           "label": label,
-           "enabled": enabled
-       }
-       self.alarms.append(alarm)
-       self.save_alarms()
+       alarm = self.store.add(hour, minute, label, enabled)
+       self._schedule(alarm)
+       self._changed()
        print(f"✅ Alarme ajoutée: {hour:02d}:{minute:02d} - {label}")
-       return alarm_id
+       return alarm["id"]
   
    def remove_alarm(self, alarm_id):
        """Supprimer une alarme"""
-       self.alarms = [a for a in self.alarms if a["id"] != alarm_id]
-       self.save_alarms()
+       if not self.store.delete(alarm_id):
+           print(f"❌ Alarme {alarm_id} introuvable")
+           return False
+       self.scheduler.unschedule(alarm_id)
+       self._changed()
        print(f"✅ Alarme {alarm_id} supprimée")
+       return True
   
    def toggle_alarm(self, alarm_id):
        """Activer/désactiver une alarme"""
-       for alarm in self.alarms:
-           if alarm["id"] == alarm_id:
-               alarm["enabled"] = not alarm["enabled"]
-               self.save_alarms()
-               status = "activée" if alarm["enabled"] else "désactivée"
-               print(f"✅ Alarme {alarm_id} {status}")
-               return True
-       return False
+       alarm = self.store.get(alarm_id)
+       if alarm is None:
+           return False
+      
+       alarm = self.store.update(alarm_id, enabled=not alarm["enabled"])
+       self._schedule(alarm)
+       self._changed()
+       status = "activée" if alarm["enabled"] else "désactivée"
+       print(f"✅ Alarme {alarm_id} {status}")
+       return True
+  
+   def set_enabled(self, alarm_ids, enabled):
+       """Activer/désactiver un lot d'alarmes: une seule écriture disque"""
+       with self.store.batch():
+           for alarm_id in alarm_ids:
+               alarm = self.store.update(alarm_id, enabled=enabled)
+               if alarm:
+                   self._schedule(alarm)
+       self._changed()
   
    def list_alarms(self):
        """Afficher toutes les alarmes"""
@@ -73,64 +94,35 @@ class AlarmManager:
        print("\n📋 === ALARMES ===")
        for alarm in self.alarms:
            status = "🟢" if alarm["enabled"] else "🔴"
-           print(f"{alarm['id']}. {status} {alarm['hour']:02d}:{alarm['minute']:02d} - {alarm['label']}")
+           on_ring = " 💍" if alarm["id"] in self.offloaded else ""
+           print(f"{alarm['id']}. {status} {alarm['hour']:02d}:{alarm['minute']:02d} - {alarm['label']}{on_ring}")
   
-   async def check_alarms(self):
-       """Vérifier les alarmes (boucle principale)"""
-       last_triggered = {}  # Pour éviter les déclenchements multiples
+   async def fire_alarms(self, alarms, scheduled):
+       """Déclencher les alarmes d'une même minute: une seule vibration"""
+       print(f"\n🚨🚨🚨 ALARME DÉCLENCHÉE! 🚨🚨🚨")
+       for alarm in alarms:
+           print(f"⏰ {alarm['hour']:02d}:{alarm['minute']:02d} - {alarm['label']}")
+       print("=" * 50)
       
-       while self.running:
-           try:
-               current_time = datetime.now()
-               current_hour = current_time.hour
-               current_minute = current_time.minute
-              
-               # Debug: afficher l'heure actuelle toutes les minutes
-               if current_time.second == 0:
-                   print(f"🕐 Il est {current_hour:02d}:{current_minute:02d}")
-              
-               for alarm in self.alarms:
-                   alarm_key = f"{alarm['id']}_{current_hour:02d}_{current_minute:02d}"
-                  
-                   if (alarm["enabled"] and
-                       alarm["hour"] == current_hour and
-                       alarm["minute"] == current_minute and
-                       alarm_key not in last_triggered):
-                      
-                       # Marquer comme déclenchée pour cette minute
-                       last_triggered[alarm_key] = True
-                      
-                       print(f"\n🚨🚨🚨 ALARME DÉCLENCHÉE! 🚨🚨🚨")
-                       print(f"⏰ {alarm['hour']:02d}:{alarm['minute']:02d} - {alarm['label']}")
-                       print("=" * 50)
-                      
-                       # Envoyer la vibration d'alarme
-                       try:
-                           if self.ring.client and self.ring.client.is_connected:
-                               await self.ring.send_vibration("3")  # Vibration alarme
-                               print("📳 Vibration envoyée!")
-                           else:
-                               print("❌ Bague non connectée - vibration non envoyée")
-                       except Exception as e:
-                           print(f"❌ Erreur vibration: {e}")
-              
-               # Nettoyer les déclenchements anciens (garder seulement la minute actuelle)
-               current_keys = [k for k in last_triggered.keys()
-                             if k.endswith(f"{current_hour:02d}_{current_minute:02d}")]
-               last_triggered = {k: v for k, v in last_triggered.items() if k in current_keys}
-              
-           except Exception as e:
-               print(f"❌ Erreur surveillance alarmes: {e}")
-          
-           await asyncio.sleep(1)  # Vérifier toutes les secondes
+       # Envoyer la vibration d'alarme
+       try:
+           if self.ring.client and self.ring.client.is_connected:
+               await self.ring.send_vibration("3")  # Vibration alarme
+               # Retard par rapport à l'échéance programmée
+               self.ring.metrics.alarm_lag.observe(datetime.now().timestamp() - scheduled)
+               print("📳 Vibration envoyée!")
+           else:
+               print("❌ Bague non connectée - vibration non envoyée")
+       except Exception as e:
+           print(f"❌ Erreur vibration: {e}")
   
    def start_monitoring(self):
        """Démarrer la surveillance des alarmes"""
        if not self.running:
            self.running = True
-           # Créer la tâche et la stocker pour pouvoir la suivre
-           loop = asyncio.get_event_loop()
-           self.alarm_task = loop.create_task(self.check_alarms())
+           # Planificateur: dort jusqu'à la prochaine échéance
+           self.scheduler.load(a for a in self.store if a["id"] not in self.offloaded)
+           self.alarm_task = self.scheduler.start()
            print("✅ Surveillance des alarmes démarrée")
            print(f"📊 {len([a for a in self.alarms if a['enabled']])} alarme(s) active(s)")
        else:
@@ -140,19 +132,18 @@ class AlarmManager:
        """Arrêter la surveillance des alarmes"""
        if self.running:
            self.running = False
-           if self.alarm_task and not self.alarm_task.done():
-               self.alarm_task.cancel()
+           self.scheduler.stop()
            print("⏹️ Surveillance des alarmes arrêtée")
        else:
            print("⚠️ Surveillance déjà arrêtée")
   
-   def create_alarm_interactive(self):
-       """Interface interactive pour créer une alarme"""
+   async def create_alarm_interactive(self, console):
+       """Interface interactive pour créer une alarme (console.AsyncConsole)"""
        try:
            print("\n⏰ === NOUVELLE ALARME ===")
-           hour = int(input("Heure (0-23): "))
-           minute = int(input("Minute (0-59): "))
-           label = input("Label (optionnel): ").strip()
+           hour = int(await console.input("Heure (0-23): "))
+           minute = int(await console.input("Minute (0-59): "))
+           label = (await console.input("Label (optionnel): ")).strip()
           
            if not (0 <= hour <= 23) or not (0 <= minute <= 59):
                print("❌ Heure invalide")
@@ -167,7 +158,7 @@ class AlarmManager:
        except ValueError:
            print("❌ Format invalide")
            return False
-       except KeyboardInterrupt:
+       except EOFError:
            print("\n❌ Annulé")
            return False
   
@@ -197,8 +188,12 @@ class AlarmManager:
            'next_alarm': None
        }
       
-       # Trouver la prochaine alarme
-       if active_alarms:
+       # Trouver la prochaine alarme (tête du tas quand la surveillance tourne)
+       upcoming = self.scheduler.next_deadline() if self.running else None
+       if upcoming:
+           next_alarm = upcoming[1]
+           status['next_alarm'] = f"{next_alarm['hour']:02d}:{next_alarm['minute']:02d} - {next_alarm['label']}"
+       elif active_alarms:
            next_alarm = None
            min_diff = float('inf')
           
@@ -0,0 +1,169 @@
+import asyncio
+import heapq
+import time
+from datetime import datetime, timedelta
+from config import ALARM_GRACE_PERIOD, ALARM_MAX_SLEEP
+
+
+def next_occurrence(hour, minute, after):
+    """Prochain hh:mm strictement après l'instant after (secondes epoch)"""
+    moment = datetime.fromtimestamp(after)
+    candidate = moment.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if candidate.timestamp() <= after:
+        candidate += timedelta(days=1)
+    return candidate.timestamp()
+
+
+class AlarmScheduler:
+    """Planificateur d'alarmes quotidiennes piloté par échéances
+
+    Les alarmes actives sont rangées dans un tas (heapq) par prochaine
+    échéance. La boucle dort jusqu'à la première échéance (minuterie
+    monotone de la boucle asyncio), au plus max_sleep secondes pour
+    suivre les changements d'heure système, et se réveille dès qu'une
+    alarme est ajoutée, modifiée ou retirée.
+
+    Les alarmes d'une même minute sont déclenchées ensemble par un seul
+    appel à fire(alarms, scheduled). Une échéance dépassée (boucle
+    bloquée, mise en veille) est rattrapée si le retard reste sous
+    grace secondes, sinon elle est signalée manquée et replanifiée.
+    Le même délai vaut à l'ajout: une alarme créée ou activée à 07:30:10
+    pour 07:30 sonne aussitôt, sauf si cette échéance a déjà été traitée.
+    """
+
+    def __init__(self, fire, grace=ALARM_GRACE_PERIOD, max_sleep=ALARM_MAX_SLEEP):
+        self.fire = fire  # Coroutine fire(alarms, échéance epoch)
+        self.grace = grace
+        self.max_sleep = max_sleep
+        self.alarms = {}  # {id: alarme} planifiées
+        self.deadlines = {}  # {id: échéance} - les entrées du tas qui diffèrent sont périmées
+        self.heap = []  # [(échéance, id)]
+        self.handled = {}  # {id: dernière échéance déclenchée ou manquée}
+        self.missed = 0
+        self.changed = None
+        self.task = None
+
+    def __len__(self):
+        return len(self.deadlines)
+
+    def _push(self, alarm, after):
+        deadline = next_occurrence(alarm['hour'], alarm['minute'], after)
+        self.alarms[alarm['id']] = alarm
+        self.deadlines[alarm['id']] = deadline
+        heapq.heappush(self.heap, (deadline, alarm['id']))
+
+    def _first_after(self, alarm_id, now):
+        # Ajout ou rechargement: une échéance de moins de grace secondes est
+        # encore due, à moins d'avoir déjà été déclenchée
+        return max(now - self.grace, self.handled.get(alarm_id, now - self.grace))
+
+    def _wake(self):
+        if self.changed:
+            self.changed.set()
+
+    def load(self, alarms, now=None):
+        """Replanifier toutes les alarmes (tas reconstruit en O(n))"""
+        now = time.time() if now is None else now
+        self.alarms.clear()
+        self.deadlines.clear()
+        for alarm in alarms:
+            if alarm['enabled']:
+                self.alarms[alarm['id']] = alarm
+                self.deadlines[alarm['id']] = next_occurrence(alarm['hour'], alarm['minute'],
+                                                              self._first_after(alarm['id'], now))
+        self.handled = {alarm_id: self.handled[alarm_id] for alarm_id in self.deadlines
+                        if alarm_id in self.handled}
+        self.heap = [(deadline, alarm_id) for alarm_id, deadline in self.deadlines.items()]
+        heapq.heapify(self.heap)
+        self._wake()
+
+    def schedule(self, alarm, now=None):
+        """Ajouter ou replanifier une alarme (retirée si désactivée)"""
+        if not alarm['enabled']:
+            self.unschedule(alarm['id'])
+            return
+        now = time.time() if now is None else now
+        self._push(alarm, self._first_after(alarm['id'], now))
+        self._wake()
+
+    def unschedule(self, alarm_id):
+        """Retirer une alarme (son entrée du tas devient périmée)"""
+        self.alarms.pop(alarm_id, None)
+        if self.deadlines.pop(alarm_id, None) is not None:
+            self._wake()
+
+    def _compact(self):
+        # Trop d'entrées périmées: reconstruire le tas
+        if len(self.heap) > 2 * len(self.deadlines) + 64:
+            self.heap = [(deadline, alarm_id) for alarm_id, deadline in self.deadlines.items()]
+            heapq.heapify(self.heap)
+
+    def next_deadline(self):
+        """(échéance, alarme) la plus proche, ou None"""
+        while self.heap:
+            deadline, alarm_id = self.heap[0]
+            if self.deadlines.get(alarm_id) == deadline:
+                return deadline, self.alarms[alarm_id]
+            heapq.heappop(self.heap)
+        return None
+
+    def pop_due(self, now):
+        """Retirer les échéances atteintes et replanifier leurs alarmes
+
+        Retourne ([(échéance, [alarmes])] par minute, [alarmes manquées]).
+        """
+        groups = {}
+        missed = []
+        while self.heap and self.heap[0][0] <= now:
+            deadline, alarm_id = heapq.heappop(self.heap)
+            if self.deadlines.get(alarm_id) != deadline:
+                continue
+            alarm = self.alarms[alarm_id]
+            if now - deadline > self.grace:
+                missed.append(alarm)
+            else:
+                groups.setdefault(deadline, []).append(alarm)
+            self.handled[alarm_id] = deadline
+            self._push(alarm, max(deadline, now))
+        self._compact()
+        return sorted(groups.items()), missed
+
+    async def run(self):
+        """Boucle: dormir jusqu'à l'échéance suivante, déclencher, recommencer"""
+        loop = asyncio.get_running_loop()
+        changed = self.changed = asyncio.Event()
+        while True:
+            changed.clear()
+            groups, missed = self.pop_due(time.time())
+
+            for alarm in missed:
+                self.missed += 1
+                print(f"⚠️ Alarme manquée: {alarm['hour']:02d}:{alarm['minute']:02d} - {alarm['label']}")
+
+            for deadline, alarms in groups:
+                try:
+                    await self.fire(alarms, deadline)
+                except Exception as e:
+                    print(f"❌ Erreur déclenchement alarme: {e}")
+
+            upcoming = self.next_deadline()
+            delay = self.max_sleep
+            if upcoming:
+                delay = min(max(upcoming[0] - time.time(), 0), self.max_sleep)
+            # Minuterie de la boucle plutôt que wait_for: pas de tâche par
+            # attente, et l'annulation n'est jamais perdue
+            timer = loop.call_later(delay, changed.set)
+            try:
+                await changed.wait()
+            finally:
+                timer.cancel()
+
+    def start(self):
+        if not self.task or self.task.done():
+            self.task = asyncio.ensure_future(self.run())
+        return self.task
+
+    def stop(self):
+        if self.task and not self.task.done():
+            self.task.cancel()
+        self.task = None
@@ -0,0 +1,277 @@
+import asyncio
+import contextlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from config import ALARM_FILE, ALARM_JOURNAL_COMPACT
+
+SNAPSHOT_VERSION = 1
+
+
+def _fsync_directory(path):
+    """Rendre durable un os.replace (POSIX)"""
+    if hasattr(os, 'O_DIRECTORY'):
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class AlarmStore:
+    """Alarmes indexées par id, persistées par journal + instantané
+
+    Chaque modification est ajoutée en mémoire puis écrite en différé
+    dans un journal append-only (une ligne JSON par modification, état
+    complet de l'alarme). Les modifications d'un même tour de boucle
+    sont regroupées en une seule écriture et un seul fsync. Au-delà de
+    compact_after lignes, le journal est compacté dans un instantané
+    remplacé atomiquement (os.replace). Les entrées/sorties passent par
+    un thread dédié, jamais par la boucle asyncio.
+
+    Au chargement: instantané puis rejeu du journal. Une dernière ligne
+    tronquée par un arrêt brutal (ou illisible) est ignorée et coupée du
+    fichier, pour que les ajouts suivants repartent d'une ligne propre.
+    Les ids ne sont jamais réutilisés.
+
+    Une écriture en échec (disque plein, droits) garde ses lignes en
+    attente: elles repartent à l'écriture suivante, et close() lève
+    l'erreur si elles n'ont toujours pas pu être écrites.
+    """
+
+    def __init__(self, path=ALARM_FILE, compact_after=ALARM_JOURNAL_COMPACT):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.compact_after = compact_after
+        self.alarms = {}  # {id: alarme}, ordre d'insertion
+        self.next_id = 1
+        self.pending = []  # Lignes de journal pas encore écrites
+        self.journal_lines = 0
+        self.batch_depth = 0
+        self.flush_task = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="alarm-store")
+
+    def __len__(self):
+        return len(self.alarms)
+
+    def __iter__(self):
+        return iter(list(self.alarms.values()))
+
+    # --- Chargement ------------------------------------------------------------
+
+    def load(self):
+        """Charger l'instantané puis rejouer le journal (synchrone, au démarrage)"""
+        self.alarms.clear()
+        self.next_id = 1
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r') as f:
+                    snapshot = json.load(f)
+                if isinstance(snapshot, list):
+                    # Ancien format: liste simple, ids parfois en double
+                    for alarm in snapshot:
+                        if alarm['id'] in self.alarms:
+                            alarm = dict(alarm, id=self.next_id)
+                        self._apply({'op': 'put', 'alarm': alarm})
+                else:
+                    for alarm in snapshot['alarms']:
+                        self._apply({'op': 'put', 'alarm': alarm})
+                    self.next_id = max(self.next_id, snapshot['next_id'])
+        except Exception as e:
+            print(f"❌ Erreur chargement alarmes: {e}")
+
+        self.journal_lines = 0
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'rb') as f:
+                data = f.read()
+            good = 0  # Fin de la dernière ligne complète et valide
+            lines = data.split(b'\n')[:-1]  # Le reste après le dernier \n est incomplet
+            for line in lines:
+                try:
+                    self._apply(json.loads(line))
+                except (ValueError, KeyError, TypeError):
+                    break  # Ligne tronquée (arrêt brutal pendant l'écriture) ou illisible
+                good += len(line) + 1
+                self.journal_lines += 1
+            if good < len(data):
+                # Couper la fin tronquée: sinon le prochain ajout s'y colle
+                # et toutes les lignes suivantes seraient perdues au rechargement
+                print(f"⚠️ Journal des alarmes tronqué: {len(data) - good} octet(s) ignoré(s)")
+                with open(self.journal_path, 'r+b') as f:
+                    f.truncate(good)
+                    f.flush()
+                    os.fsync(f.fileno())
+        return self
+
+    def _apply(self, record):
+        if record['op'] == 'put':
+            alarm = record['alarm']
+            next_id = max(self.next_id, alarm['id'] + 1)  # Valider avant de modifier
+            self.alarms[alarm['id']] = alarm
+            self.next_id = next_id
+        elif record['op'] == 'delete':
+            self.alarms.pop(record['id'], None)
+
+    # --- Modifications ---------------------------------------------------------
+
+    def get(self, alarm_id):
+        return self.alarms.get(alarm_id)
+
+    def add(self, hour, minute, label="Alarme", enabled=True):
+        """Nouvelle alarme avec le prochain id (jamais réutilisé)"""
+        alarm = {"id": self.next_id, "hour": hour, "minute": minute, "label": label, "enabled": enabled}
+        self._record({'op': 'put', 'alarm': alarm})
+        return alarm
+
+    def update(self, alarm_id, **changes):
+        """Modifier une alarme; retourne l'alarme ou None si introuvable"""
+        if alarm_id not in self.alarms:
+            return None
+        alarm = dict(self.alarms[alarm_id], **changes, id=alarm_id)
+        self._record({'op': 'put', 'alarm': alarm})
+        return alarm
+
+    def delete(self, alarm_id):
+        """Supprimer une alarme; False si introuvable"""
+        if alarm_id not in self.alarms:
+            return False
+        self._record({'op': 'delete', 'id': alarm_id})
+        return True
+
+    def _record(self, record):
+        self._apply(record)
+        self.pending.append(json.dumps(record, ensure_ascii=False))
+        self._schedule_flush()
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Regrouper des modifications en une seule écriture
+
+        with store.batch():
+            for alarm in alarms:
+                store.update(alarm['id'], enabled=False)
+        """
+        self.batch_depth += 1
+        try:
+            yield self
+        finally:
+            self.batch_depth -= 1
+            self._schedule_flush()
+
+    # --- Écriture ----------------------------------------------------------------
+
+    def _schedule_flush(self):
+        if self.batch_depth or not self.pending:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Hors boucle asyncio: écriture immédiate
+            lines, snapshot = self._take()
+            try:
+                self._write(lines, snapshot)
+            except OSError as e:
+                self._requeue(lines, snapshot, e)
+            return
+        if not self.flush_task or self.flush_task.done():
+            # Exécutée après le code synchrone en cours: les modifications
+            # du même tour de boucle partagent l'écriture
+            self.flush_task = loop.create_task(self.flush())
+
+    def _take(self):
+        """Lignes à écrire et, si le journal est trop long, l'instantané"""
+        lines, self.pending = self.pending, []
+        self.journal_lines += len(lines)
+        snapshot = None
+        if self.journal_lines >= self.compact_after:
+            snapshot = self._snapshot()
+            self.journal_lines = 0
+        return lines, snapshot
+
+    def _requeue(self, lines, snapshot, error):
+        """Remettre en tête les lignes d'une écriture en échec"""
+        self.pending[:0] = lines
+        if snapshot is not None:
+            self.journal_lines = self.compact_after  # Retenter l'instantané
+        else:
+            self.journal_lines -= len(lines)
+        print(f"❌ Erreur sauvegarde alarmes ({len(self.pending)} modification(s) en attente): {error}")
+
+    def _snapshot(self):
+        return {'version': SNAPSHOT_VERSION, 'next_id': self.next_id, 'alarms': list(self.alarms.values())}
+
+    async def flush(self):
+        """Écrire les modifications en attente (thread d'entrées/sorties)
+
+        Retourne False si une écriture a échoué: ses lignes restent en
+        attente pour la prochaine modification, flush() ou close().
+        """
+        loop = asyncio.get_running_loop()
+        # Les modifications arrivées pendant une écriture partent à la suivante
+        while self.pending:
+            lines, snapshot = self._take()
+            try:
+                await loop.run_in_executor(self.executor, self._write, lines, snapshot)
+            except OSError as e:
+                self._requeue(lines, snapshot, e)
+                return False
+        return True
+
+    async def compact(self):
+        """Forcer l'écriture de l'instantané et vider le journal (OSError si échec)"""
+        lines, _ = self._take()
+        self.journal_lines = 0
+        loop = asyncio.get_running_loop()
+        snapshot = self._snapshot()
+        try:
+            await loop.run_in_executor(self.executor, self._write, lines, snapshot)
+        except OSError as e:
+            self._requeue(lines, snapshot, e)
+            raise
+
+    def _write(self, lines, snapshot=None):
+        # Avec un instantané, les lignes y sont déjà incluses
+        if lines and snapshot is None:
+            self._append(('\n'.join(lines) + '\n').encode('utf-8'))
+        if snapshot is not None:
+            # Instantané complet puis journal vidé: un arrêt entre les
+            # deux rejoue un journal déjà inclus (opérations idempotentes)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            _fsync_directory(self.path)
+            with open(self.journal_path, 'w') as f:
+                os.fsync(f.fileno())
+
+    def _append(self, data):
+        fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o666)
+        try:
+            start = os.fstat(fd).st_size
+            try:
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(fd, view):]
+                os.fsync(fd)
+            except OSError:
+                # Pas de fragment en fin de journal: la nouvelle tentative
+                # doit repartir d'une ligne propre
+                with contextlib.suppress(OSError):
+                    os.ftruncate(fd, start)
+                raise
+        finally:
+            os.close(fd)
+
+    async def close(self):
+        """Compacter et arrêter le thread d'entrées/sorties
+
+        Lève OSError si des modifications n'ont pas pu être écrites.
+        """
+        try:
+            if self.flush_task:
+                await self.flush_task
+            await self.compact()
+        finally:
+            self.executor.shutdown(wait=True)
@@ -0,0 +1,198 @@
+import asyncio
+import json
+import os
+from config import RING_ALARM_SLOTS, RING_ALARM_FILE, ALARM_SYNC_DELAY
+
+# Alarmes de l'hôte quotidiennes: tous les jours sur la bague
+DAILY_MASK = 0x7F
+
+# Champs comparés entre l'alarme voulue et le contenu connu d'un emplacement
+SLOT_FIELDS = ('alarm_id', 'hour', 'minute', 'day_mask', 'enabled')
+
+
+def slot_name(slot):
+    """Nom fixe par emplacement: la bague garde l'identité de l'emplacement"""
+    return f"W{slot}"
+
+
+def _load_tables(path=RING_ALARM_FILE):
+    try:
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                return json.load(f)
+    except Exception as e:
+        print(f"⚠️ Table des alarmes de la bague illisible: {e}")
+    return {}
+
+
+def _write_tables(tables, path=RING_ALARM_FILE):
+    try:
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(tables, f, indent=2)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"⚠️ Sauvegarde table des alarmes impossible: {e}")
+
+
+def slot_entry(slot, alarm):
+    """Contenu voulu d'un emplacement pour une alarme de l'hôte"""
+    return {
+        'alarm_id': alarm['id'],
+        'name': slot_name(slot),
+        'hour': alarm['hour'],
+        'minute': alarm['minute'],
+        'days': 'daily',
+        'day_mask': DAILY_MASK,
+        'enabled': alarm['enabled'],
+    }
+
+
+def plan_slots(alarms, current, slots=RING_ALARM_SLOTS):
+    """Répartition voulue {emplacement: entrée} des alarmes actives
+
+    Une alarme déjà sur la bague garde son emplacement; les emplacements
+    libres reçoivent les autres alarmes actives par id croissant. Celles
+    qui ne tiennent pas restent gérées par l'hôte.
+    """
+    candidates = {alarm['id']: alarm for alarm in alarms if alarm['enabled']}
+    desired = {}
+    for slot, entry in current.items():
+        alarm = candidates.pop(entry['alarm_id'], None)
+        if alarm is not None:
+            desired[slot] = slot_entry(slot, alarm)
+
+    free = [slot for slot in range(1, slots + 1) if slot not in desired]
+    for slot, alarm_id in zip(free, sorted(candidates)):
+        desired[slot] = slot_entry(slot, candidates[alarm_id])
+    return desired
+
+
+def diff_slots(current, desired):
+    """Opérations minimales [(action, emplacement, entrée)]
+
+    Suppressions d'abord, puis modifications, puis créations par
+    emplacement croissant.
+    """
+    deletes, modifies, creates = [], [], []
+    for slot in sorted(set(current) | set(desired)):
+        have = current.get(slot)
+        want = desired.get(slot)
+        if want is None:
+            deletes.append(('delete', slot, have))
+        elif have is None:
+            creates.append(('create', slot, want))
+        elif any(have[field] != want[field] for field in SLOT_FIELDS):
+            modifies.append(('modify', slot, want))
+    return deletes + modifies + creates
+
+
+class AlarmSync:
+    """Synchronisation des alarmes de l'hôte vers les emplacements de la bague
+
+    Le contenu connu des emplacements est gardé sur disque par bague
+    (RING_ALARM_FILE): une synchronisation n'envoie que les emplacements
+    qui changent. Les alarmes placées sur la bague sont déclenchées par
+    le firmware et retirées du planificateur de l'hôte.
+
+    La bague prévient la synchronisation (ring.alarm_sync): la table est
+    relue à chaque authentification et vidée par une dissociation, qui
+    efface les emplacements du firmware.
+    """
+
+    def __init__(self, manager, beta, path=RING_ALARM_FILE, delay=ALARM_SYNC_DELAY):
+        self.manager = manager  # alarm_manager.AlarmManager (alarmes de l'hôte)
+        self.beta = beta  # beta_alarm.AlarmManager (paquets vers la bague)
+        self.path = path
+        self.delay = delay
+        self.address = beta.ring.address.upper()
+        self.slots = self._load()
+        self.lock = asyncio.Lock()
+        self.pending = None
+        self.dirty = False
+        manager.set_offloaded(self.offloaded)
+        beta.ring.alarm_sync = self
+
+    @property
+    def offloaded(self):
+        """Ids des alarmes de l'hôte confiées à la bague"""
+        return {entry['alarm_id'] for entry in self.slots.values() if entry['enabled']}
+
+    def _load(self):
+        return {int(slot): entry for slot, entry in _load_tables(self.path).get(self.address, {}).items()}
+
+    def _save(self):
+        tables = _load_tables(self.path)
+        tables[self.address] = {str(slot): entry for slot, entry in sorted(self.slots.items())}
+        _write_tables(tables, self.path)
+
+    def plan(self):
+        """Opérations nécessaires pour aligner la bague sur l'hôte"""
+        return diff_slots(self.slots, plan_slots(self.manager.alarms, self.slots))
+
+    async def sync(self):
+        """Envoyer les emplacements modifiés en une transaction; retourne le nombre d'opérations"""
+        async with self.lock:
+            if not self.beta.ring.client or not self.beta.ring.client.is_connected:
+                print("❌ Bague non connectée - synchronisation des alarmes reportée")
+                return 0
+
+            operations = self.plan()
+            if not operations:
+                return 0
+
+            print(f"💍 Synchronisation des alarmes: {len(operations)} emplacement(s)")
+            # Table en mémoire de beta_alarm alignée sur le contenu connu
+            self.beta.alarms = {slot: dict(entry) for slot, entry in self.slots.items()}
+            if not await self.beta.program(operations):
+                # Contenu de la bague incertain: la prochaine synchronisation
+                # renvoie les mêmes opérations
+                print("❌ Synchronisation des alarmes échouée")
+                return 0
+
+            for action, slot, entry in operations:
+                if action == 'delete':
+                    self.slots.pop(slot, None)
+                else:
+                    self.slots[slot] = entry
+            self._save()
+            self.manager.set_offloaded(self.offloaded)
+            return len(operations)
+
+    def reload(self):
+        """Après authentification: relire la table connue puis resynchroniser
+
+        Le fichier a pu changer depuis le démarrage (autre processus,
+        dissociation); une synchronisation en cours reste prioritaire.
+        """
+        if not self.lock.locked():
+            self.slots = self._load()
+            self.manager.set_offloaded(self.offloaded)
+        self.request()
+
+    def forget(self):
+        """Après dissociation: emplacements vides, alarmes rendues à l'hôte"""
+        self.slots = {}
+        self.beta.alarms = {}
+        self._save()
+        self.manager.set_offloaded(set())
+
+    def request(self):
+        """Demander une synchronisation (regroupe les modifications rapprochées)"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Hors boucle: la prochaine sync() rattrapera
+        self.dirty = True
+        if not self.pending or self.pending.done():
+            self.pending = asyncio.ensure_future(self._delayed_sync())
+
+    async def _delayed_sync(self):
+        # Modifications arrivées pendant une synchronisation: on recommence
+        while self.dirty:
+            await asyncio.sleep(self.delay)
+            self.dirty = False
+            try:
+                await self.sync()
+            except Exception as e:
+                print(f"❌ Erreur synchronisation alarmes: {e}")
@@ -0,0 +1,208 @@
+import struct
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from protocol import FRAME_SCHEMA, FRAME_HEADER
+
+SCHEMA_BY_METRIC = {entry['metric']: entry for entry in FRAME_SCHEMA}
+
+
+def buffer_arrays(buffer):
+    """Vues NumPy chronologiques d'un SampleBuffer
+
+    Retourne (timestamps, trames brutes (n, frame_size), longueurs).
+    """
+    order = (buffer.start + np.arange(buffer.count)) % buffer.capacity
+    timestamps = np.frombuffer(buffer.timestamps, dtype=np.float64)[order]
+    lengths = np.frombuffer(buffer.lengths, dtype=np.uint16)[order]
+    raw = np.frombuffer(buffer.raw, dtype=np.uint8).reshape(buffer.capacity, buffer.frame_size)[order]
+    return timestamps, raw, lengths
+
+
+def history_arrays(rows, frame_size):
+    """Tableaux NumPy depuis SampleStore.query() (timestamp, value, raw)"""
+    timestamps = np.fromiter((row[0] for row in rows), dtype=np.float64, count=len(rows))
+    lengths = np.fromiter((min(len(row[2]), frame_size) for row in rows), dtype=np.uint16, count=len(rows))
+    raw = np.zeros((len(rows), frame_size), dtype=np.uint8)
+    if rows and np.all(lengths == frame_size):
+        raw[:] = np.frombuffer(b''.join(row[2] for row in rows), dtype=np.uint8).reshape(-1, frame_size)
+    else:
+        for i, row in enumerate(rows):
+            raw[i, :lengths[i]] = np.frombuffer(row[2][:frame_size], dtype=np.uint8)
+    return timestamps, raw, lengths
+
+
+def _struct_dtype(fmt):
+    """dtype NumPy équivalent à un format struct scalaire (ex. '>H')"""
+    code = fmt.lstrip('<>!=@')
+    order = '<' if fmt[0] == '<' else '>'
+    kind = 'f' if code in 'efd' else 'i' if code.islower() else 'u'
+    return np.dtype(f"{order}{kind}{struct.calcsize(code)}")
+
+
+def decode_frames(raw, lengths, metric):
+    """Décoder un lot de trames d'après FRAME_SCHEMA
+
+    Retourne un tableau float64, NaN pour les trames invalides.
+    """
+    entry = SCHEMA_BY_METRIC[metric]
+    size = struct.calcsize(entry['format'])
+    offset = entry['offset']
+    if raw.shape[1] < max(offset + size, FRAME_HEADER.size):
+        return np.full(len(raw), np.nan)
+
+    valid = lengths == entry['length']
+    header = np.frombuffer(FRAME_HEADER.pack(entry['header']), dtype=np.uint8)
+    valid &= np.all(raw[:, :FRAME_HEADER.size] == header, axis=1)
+    for position, expected in entry['match'].items():
+        valid &= raw[:, position] == expected
+
+    values = np.ascontiguousarray(raw[:, offset:offset + size]).view(_struct_dtype(entry['format']))
+    values = values.ravel().astype(np.float64)
+    if entry['divisor'] != 1:
+        values /= entry['divisor']
+
+    low, high = entry['range']
+    valid &= (values >= low) & (values <= high)
+    values[~valid] = np.nan
+    return values
+
+
+def rolling_mean(values, window):
+    """Moyenne glissante (NaN ignorés), même longueur que values"""
+    finite = np.isfinite(values)
+    sums = np.cumsum(np.where(finite, values, 0.0))
+    counts = np.cumsum(finite)
+    sums[window:] = sums[window:] - sums[:-window]
+    counts[window:] = counts[window:] - counts[:-window]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+def rolling_percentile(values, window, q):
+    """Percentile glissant (NaN ignorés), NaN tant que la fenêtre est incomplète
+
+    Interpolation linéaire comme np.percentile, calculée sur les fenêtres
+    triées (les NaN se rangent en fin de ligne).
+    """
+    result = np.full(len(values), np.nan)
+    if len(values) < window:
+        return result
+
+    ordered = np.sort(sliding_window_view(values, window), axis=1)
+    counts = np.isfinite(ordered).sum(axis=1)
+    position = np.maximum(counts - 1, 0) * (q / 100.0)
+    low = np.floor(position).astype(np.intp)
+    high = np.minimum(low + 1, np.maximum(counts - 1, 0))
+    fraction = position - low
+    rows = np.arange(len(ordered))
+    percentiles = ordered[rows, low] * (1.0 - fraction) + ordered[rows, high] * fraction
+    percentiles[counts == 0] = np.nan
+    result[window - 1:] = percentiles
+    return result
+
+
+def summarize(values):
+    """Statistiques d'une série: nombre, moyenne, min, max, p5/p50/p95"""
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return {'count': 0}
+    p5, p50, p95 = np.percentile(values, [5, 50, 95])
+    return {
+        'count': int(len(values)),
+        'mean': float(values.mean()),
+        'min': float(values.min()),
+        'max': float(values.max()),
+        'p5': float(p5),
+        'p50': float(p50),
+        'p95': float(p95)
+    }
+
+
+def hrv_stats(bpm):
+    """Statistiques de variabilité à partir des BPM successifs
+
+    Les intervalles RR sont estimés par 60000 / BPM (ms): la bague ne
+    transmet pas les battements individuels, c'est une approximation.
+    """
+    bpm = bpm[np.isfinite(bpm) & (bpm > 0)]
+    if len(bpm) < 2:
+        return {'count': int(len(bpm))}
+    rr = 60000.0 / bpm
+    diffs = np.diff(rr)
+    return {
+        'count': int(len(rr)),
+        'mean_rr': float(rr.mean()),
+        'sdnn': float(rr.std(ddof=1)),
+        'rmssd': float(np.sqrt(np.mean(diffs ** 2))),
+        'pnn50': float(np.mean(np.abs(diffs) > 50.0) * 100.0)
+    }
+
+
+def align(reference, series, tolerance):
+    """Jointure temporelle (as-of) sur les horodatages de référence
+
+    series : {nom: (timestamps, valeurs)} triés par temps. Pour chaque
+    instant de référence, dernière valeur connue depuis moins de
+    tolerance secondes, sinon NaN. Retourne {nom: valeurs alignées}.
+    """
+    aligned = {}
+    for name, (timestamps, values) in series.items():
+        index = np.searchsorted(timestamps, reference, side='right') - 1
+        found = index >= 0
+        safe = np.clip(index, 0, None)
+        result = np.full(len(reference), np.nan)
+        if len(timestamps):
+            fresh = found & (reference - timestamps[safe] <= tolerance)
+            result[fresh] = values[safe[fresh]]
+        aligned[name] = result
+    return aligned
+
+
+def metric_series(analyzer, metric):
+    """(timestamps, valeurs décodées) d'une métrique depuis un DataAnalyzer"""
+    timestamps, raw, lengths = buffer_arrays(analyzer.samples[metric])
+    return timestamps, decode_frames(raw, lengths, metric)
+
+
+def history_series(store, ring, metric, start=None, end=None):
+    """(timestamps, valeurs décodées) d'une métrique depuis un SampleStore"""
+    rows = store.query(ring, metric, start, end)
+    timestamps, raw, lengths = history_arrays(rows, SCHEMA_BY_METRIC[metric]['length'])
+    return timestamps, decode_frames(raw, lengths, metric)
+
+
+def vitals_report(series, tolerance=60.0, window=30):
+    """Rapport: résumé par métrique, HRV, et constantes alignées sur le pouls
+
+    series : {métrique: (timestamps, valeurs)}, ex. via metric_series
+    ou history_series.
+    """
+    report = {metric: summarize(values) for metric, (timestamps, values) in series.items()}
+    if 'heartrate' in series:
+        timestamps, bpm = series['heartrate']
+        report['hrv'] = hrv_stats(bpm)
+        report['heartrate_rolling_mean'] = rolling_mean(bpm, window)
+        report['aligned'] = align(timestamps, series, tolerance)
+    return report
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from config import RING_ADDRESSES
+    from sample_store import SampleStore
+
+    # Rapport sur les N derniers jours d'historique (7 par défaut)
+    days = float(sys.argv[1]) if len(sys.argv) > 1 else 7.0
+    store = SampleStore()
+    since = time.time() - days * 86400
+    for ring in RING_ADDRESSES:
+        series = {
+            metric: history_series(store, ring, metric, start=since)
+            for metric in ('heartrate', 'o2', 'temperature')
+        }
+        report = vitals_report(series)
+        print(f"\n📈 === {ring} ({days:g} j) ===")
+        for metric in series:
+            print(f"{metric}: {report[metric]}")
+        print(f"HRV: {report.get('hrv')}")
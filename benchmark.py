@@ -0,0 +1,419 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+from datetime import datetime
+from config import BENCH_BASELINE_FILE, BENCH_TOLERANCE, SAMPLE_BUFFER_CAPACITY
+from protocol import encode_frame, build_alarm_config, crc16, COMMAND_FACTORY, COMMAND_PACKETS
+
+# Bancs d'essai enregistrés: {nom: fonction(quick) -> [secondes par opération]}
+BENCHMARKS = {}
+
+FRAMES = {
+    'heartrate': encode_frame('heartrate', 72),
+    'o2': encode_frame('o2', 97),
+    'temperature': encode_frame('temperature', 36.6),
+    'steps': encode_frame('steps', 1234),
+}
+
+
+def benchmark(name):
+    """Enregistrer un banc d'essai"""
+    def register(function):
+        BENCHMARKS[name] = function
+        return function
+    return register
+
+
+def timed(function, number, repeat):
+    """repeat échantillons de number appels; secondes par appel"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        samples.append((time.perf_counter() - start) / number)
+    return samples
+
+
+def percentile(values, q):
+    """Percentile par interpolation linéaire (q entre 0 et 100)"""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def summarize(samples):
+    return {
+        'unit': 'seconds/op',
+        'samples': len(samples),
+        'p50': percentile(samples, 50),
+        'p99': percentile(samples, 99),
+        'mean': sum(samples) / len(samples),
+        'ops_per_second': 1 / percentile(samples, 50) if percentile(samples, 50) else None,
+    }
+
+
+# --- Réception des trames ----------------------------------------------------
+
+def _bench_ring(address='BENCH'):
+    from wakering import Wakering
+    return Wakering(address)
+
+
+@benchmark('notification_handler')
+def bench_notification_handler(quick):
+    """Trame de pouls décodée et stockée, mesure active"""
+    ring = _bench_ring()
+    ring.active_measurements['heartrate'] = asyncio.Event()
+    frame = bytearray(FRAMES['heartrate'])
+    return timed(lambda: ring.notification_handler(None, frame), 1000, 20 if quick else 200)
+
+
+@benchmark('notification_handler_idle')
+def bench_notification_handler_idle(quick):
+    """Trame reçue sans mesure active (acquittements, bruit)"""
+    ring = _bench_ring()
+    frame = bytearray(FRAMES['heartrate'])
+    return timed(lambda: ring.notification_handler(None, frame), 1000, 20 if quick else 200)
+
+
+def _bench_analyzer(metric):
+    def run(quick):
+        from data_analyzer import DataAnalyzer
+        analyzer = DataAnalyzer()
+        decoder = getattr(analyzer, f'analyze_{metric}')
+        frame = FRAMES[metric]
+        return timed(lambda: decoder(frame), 2000, 20 if quick else 200)
+    run.__doc__ = f"DataAnalyzer.analyze_{metric}"
+    return run
+
+
+for _metric in FRAMES:
+    benchmark(f'analyze_{_metric}')(_bench_analyzer(_metric))
+
+
+@benchmark('store_data')
+def bench_store_data(quick):
+    """Coût d'un store_data du tampon vide jusqu'à 4x sa capacité"""
+    from data_analyzer import DataAnalyzer
+    analyzer = DataAnalyzer()
+    frame = FRAMES['heartrate']
+    # Un échantillon par bloc de 256 appels: le coût ne doit pas croître
+    chunks = 4 * SAMPLE_BUFFER_CAPACITY // 256
+    samples = []
+    for _ in range(1 if quick else 5):
+        analyzer.clear_data('heartrate')
+        samples += timed(lambda: analyzer.store_data('heartrate', frame, 72), 256, chunks)
+    return samples
+
+
+# --- Alarmes -------------------------------------------------------------------
+
+def _beta_alarm_manager():
+    from beta_alarm import AlarmManager
+    return AlarmManager(_bench_ring())
+
+
+@benchmark('beta_alarm_config_packet')
+def bench_alarm_config(quick):
+    """Paquet de configuration d'alarme (55 bytes)"""
+    manager = _beta_alarm_manager()
+    return timed(lambda: manager._create_alarm_packet(1, "Réveil", 7, 30, 0x7F, True), 1000, 20 if quick else 200)
+
+
+@benchmark('beta_alarm_short_packets')
+def bench_alarm_short_packets(quick):
+    """Paquets d'initialisation, de finalisation et de clôture"""
+    manager = _beta_alarm_manager()
+
+    def build():
+        manager._create_initialization_packet()
+        manager._create_finalization_packet()
+        manager._create_closure_packet()
+    return timed(build, 1000, 20 if quick else 200)
+
+
+@benchmark('build_alarm_config')
+def bench_build_alarm_config(quick):
+    """protocol.build_alarm_config seul"""
+    name = "Réveil".encode('utf-16le')
+    return timed(lambda: build_alarm_config(0x12, 0x7F, 7, 30, True, name), 1000, 20 if quick else 200)
+
+
+@benchmark('command_render')
+def bench_command_render(quick):
+    """Commande répétée (paquet en cache)"""
+    return timed(lambda: COMMAND_FACTORY.render('heartrate'), 1000, 20 if quick else 200)
+
+
+@benchmark('command_render_dated')
+def bench_command_render_dated(quick):
+    """Commande avec {date} à la date courante"""
+    return timed(lambda: COMMAND_FACTORY.render('steps'), 1000, 20 if quick else 200)
+
+
+@benchmark('crc16_payload')
+def bench_crc16(quick):
+    """CRC-16 par table d'un payload de 49 octets"""
+    payload = bytes(range(49))
+    return timed(lambda: crc16(payload), 1000, 20 if quick else 200)
+
+
+def _random_alarms(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        {"id": i, "hour": rng.randrange(24), "minute": rng.randrange(60),
+         "label": f"Alarme {i}", "enabled": rng.random() < 0.8}
+        for i in range(1, count + 1)
+    ]
+
+
+def _bench_scheduler_load(count):
+    def run(quick):
+        from alarm_scheduler import AlarmScheduler
+        scheduler = AlarmScheduler(None)
+        alarms = _random_alarms(count)
+        return timed(lambda: scheduler.load(alarms), max(1, 10000 // count), 20 if quick else 100)
+    run.__doc__ = f"Planification de {count} alarmes (tas reconstruit)"
+    return run
+
+
+def _bench_scheduler_minute(count):
+    def run(quick):
+        from alarm_scheduler import AlarmScheduler
+        scheduler = AlarmScheduler(None)
+        start = datetime.now().replace(second=30, microsecond=0).timestamp()
+        scheduler.load(_random_alarms(count), start)
+        minutes = iter(range(1, 10 ** 9))
+        # Une opération = une minute écoulée: échéances retirées et replanifiées
+        return timed(lambda: scheduler.pop_due(start + 60 * next(minutes)), 100, 20 if quick else 100)
+    run.__doc__ = f"Échéances d'une minute avec {count} alarmes"
+    return run
+
+
+for _count in (10, 1000, 10000):
+    benchmark(f'alarm_scheduler_load_{_count}')(_bench_scheduler_load(_count))
+    benchmark(f'alarm_scheduler_minute_{_count}')(_bench_scheduler_minute(_count))
+
+
+async def _store_batch(store, count):
+    with store.batch():
+        for alarm in list(store)[:count]:
+            store.update(alarm['id'], enabled=not alarm['enabled'])
+    await store.flush()
+
+
+@benchmark('alarm_store_batch_500')
+def bench_alarm_store_batch(quick):
+    """500 modifications groupées puis écriture (un fsync)"""
+    import tempfile
+    from alarm_store import AlarmStore
+    with tempfile.TemporaryDirectory() as directory:
+        store = AlarmStore(os.path.join(directory, 'alarms.json'), compact_after=10 ** 9)
+        for alarm in _random_alarms(500):
+            store.add(alarm['hour'], alarm['minute'], alarm['label'], alarm['enabled'])
+        loop = asyncio.new_event_loop()
+        try:
+            return timed(lambda: loop.run_until_complete(_store_batch(store, 500)), 1, 10 if quick else 50)
+        finally:
+            loop.close()
+            store.executor.shutdown()
+
+
+# --- Bout en bout (bague simulée) --------------------------------------------
+
+def _simulated_ring(address='SIM-BENCH'):
+    from simulator import SimulatedRing, SimulatedTransport
+    from wakering import Wakering
+    sim = SimulatedRing(address, latency=0.001, jitter=0.0, notify_interval=0.01, seed=0)
+    return Wakering(address, transport=SimulatedTransport([sim]))
+
+
+async def _e2e_auth(repeat):
+    samples = []
+    for _ in range(repeat):
+        ring = _simulated_ring()
+        start = time.perf_counter()
+        await ring.connect()
+        await ring.authenticate()
+        samples.append(time.perf_counter() - start)
+        await ring.disconnect()
+    return samples
+
+
+async def _e2e_measure(repeat):
+    ring = _simulated_ring()
+    await ring.connect()
+    await ring.authenticate()
+    samples = []
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            async with ring.stream('heartrate') as stream:
+                await stream.__anext__()
+            samples.append(time.perf_counter() - start)
+    finally:
+        await ring.disconnect()
+    return samples
+
+
+async def _e2e_alarm_table(repeat):
+    from beta_alarm import AlarmManager
+    ring = _simulated_ring()
+    await ring.connect()
+    await ring.authenticate()
+    manager = AlarmManager(ring)
+    changes = [
+        ('create', slot, {'name': f"W{slot}", 'hour': 7, 'minute': slot, 'days': 'daily', 'enabled': True})
+        for slot in range(1, 6)
+    ]
+    samples = []
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            await manager.program(changes)
+            samples.append(time.perf_counter() - start)
+    finally:
+        await ring.disconnect()
+    return samples
+
+
+async def _e2e_vibration_under_load(repeat):
+    from command_queue import PRIORITY_BULK
+    ring = _simulated_ring()
+    await ring.connect()
+    await ring.authenticate()
+    packet = COMMAND_PACKETS['steps']
+    samples = []
+    try:
+        for _ in range(repeat):
+            # 50 écritures de masse en attente devant la vibration
+            bulk = [
+                asyncio.ensure_future(ring.write_data(packet, ack_timeout=0, priority=PRIORITY_BULK))
+                for _ in range(50)
+            ]
+            await asyncio.sleep(0)
+            start = time.perf_counter()
+            await ring.send_vibration("3")
+            samples.append(time.perf_counter() - start)
+            await asyncio.gather(*bulk)
+    finally:
+        await ring.disconnect()
+    return samples
+
+
+@benchmark('e2e_auth')
+def bench_e2e_auth(quick):
+    """Connexion + authentification, bague simulée (latence 1 ms)"""
+    return asyncio.run(_e2e_auth(5 if quick else 30))
+
+
+@benchmark('e2e_first_sample')
+def bench_e2e_first_sample(quick):
+    """Démarrage d'une mesure jusqu'au premier échantillon puis arrêt"""
+    return asyncio.run(_e2e_measure(10 if quick else 100))
+
+
+@benchmark('e2e_vibration_under_load')
+def bench_e2e_vibration_under_load(quick):
+    """Vibration d'alarme derrière 50 écritures de masse en file"""
+    return asyncio.run(_e2e_vibration_under_load(10 if quick else 100))
+
+
+@benchmark('e2e_alarm_table')
+def bench_e2e_alarm_table(quick):
+    """Table complète (5 emplacements) en une transaction beta_alarm"""
+    return asyncio.run(_e2e_alarm_table(5 if quick else 30))
+
+
+# --- Exécution et comparaison ------------------------------------------------
+
+def run(names=None, quick=False):
+    """Exécuter les bancs d'essai; retourne le document JSON des résultats"""
+    results = {}
+    for name, function in BENCHMARKS.items():
+        if names and not any(pattern in name for pattern in names):
+            continue
+        # Les messages des modules (print) ne polluent pas la sortie
+        with contextlib.redirect_stdout(io.StringIO()):
+            samples = function(quick)
+        results[name] = summarize(samples)
+        print(f"⏱️ {name:32s} p50 {results[name]['p50'] * 1e6:10.2f} µs"
+              f"   p99 {results[name]['p99'] * 1e6:10.2f} µs", file=sys.stderr)
+    return {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'quick': quick,
+        },
+        'results': results,
+    }
+
+
+def compare(report, baseline, tolerance=BENCH_TOLERANCE):
+    """Comparer au baseline; retourne la liste des régressions (p50 > tolerance x baseline)"""
+    regressions = []
+    for name, result in report['results'].items():
+        reference = baseline.get('results', {}).get(name)
+        if not reference or not reference['p50']:
+            continue
+        ratio = result['p50'] / reference['p50']
+        result['baseline_p50'] = reference['p50']
+        result['ratio'] = ratio
+        if ratio > tolerance:
+            regressions.append(name)
+        icon = "❌" if ratio > tolerance else "✅"
+        print(f"{icon} {name:32s} x{ratio:.2f}", file=sys.stderr)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bancs d'essai Wakering")
+    parser.add_argument('names', nargs='*', help="filtre sur les noms de bancs")
+    parser.add_argument('--quick', action='store_true', help="moins d'échantillons")
+    parser.add_argument('--output', help="fichier JSON des résultats (défaut: sortie standard)")
+    parser.add_argument('--baseline', default=BENCH_BASELINE_FILE, help="baseline de comparaison")
+    parser.add_argument('--save-baseline', action='store_true', help="enregistrer comme nouveau baseline")
+    parser.add_argument('--tolerance', type=float, default=BENCH_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    report = run(args.names, args.quick)
+
+    regressions = []
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Baseline enregistré: {args.baseline}", file=sys.stderr)
+    else:
+        try:
+            with open(args.baseline) as f:
+                regressions = compare(report, json.load(f), args.tolerance)
+        except FileNotFoundError:
+            print(f"⚠️ Pas de baseline ({args.baseline}), le générer avec --save-baseline",
+                  file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if regressions:
+        print(f"❌ {len(regressions)} régression(s): {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
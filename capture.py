@@ -0,0 +1,147 @@
+import asyncio
+import struct
+import time
+import uuid
+from config import NOTIFY_CHAR_UUID
+from protocol import FRAME_METRICS, MEASUREMENT_TRANSACTIONS, TRANSACTION_OFFSET
+
+# Format de capture:
+#   en-tête  : b'WKRC' + version (u8)
+#   UUID     : type 0, index (u8), UUID (16 bytes) - déclaré une fois par caractéristique
+#   trame    : type 1 (écriture) ou 2 (notification), index UUID (u8),
+#              temps depuis le début en µs (u64), longueur (u16), données
+MAGIC = b'WKRC'
+VERSION = 1
+RECORD_UUID = 0
+RECORD_WRITE = 1
+RECORD_NOTIFY = 2
+
+HEADER = struct.Struct('<4sB')
+UUID_RECORD = struct.Struct('<BB16s')
+FRAME_RECORD = struct.Struct('<BBQH')
+
+
+class CaptureWriter:
+    """Enregistrement binaire compact du trafic BLE d'une bague
+
+    Brancher sur Wakering: ring.recorder = CaptureWriter("session.wkr")
+    Un enregistrement = un struct.pack + l'écriture dans le tampon du fichier.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION))
+        self.uuids = {}  # {uuid str: index}
+        self.start = time.monotonic()
+        self.records = 0
+
+    def _uuid_index(self, char_uuid):
+        index = self.uuids.get(char_uuid)
+        if index is None:
+            index = self.uuids[char_uuid] = len(self.uuids)
+            self.file.write(UUID_RECORD.pack(RECORD_UUID, index, uuid.UUID(char_uuid).bytes))
+        return index
+
+    def _record(self, kind, char_uuid, data):
+        elapsed_us = int((time.monotonic() - self.start) * 1_000_000)
+        self.file.write(FRAME_RECORD.pack(kind, self._uuid_index(char_uuid), elapsed_us, len(data)))
+        self.file.write(data)
+        self.records += 1
+
+    def record_write(self, char_uuid, data):
+        self._record(RECORD_WRITE, char_uuid, data)
+
+    def record_notify(self, char_uuid, data):
+        self._record(RECORD_NOTIFY, char_uuid, data)
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+def read_capture(path):
+    """Lire une capture: liste de (type, uuid, secondes, données)"""
+    with open(path, 'rb') as f:
+        content = f.read()
+
+    magic, version = HEADER.unpack_from(content)
+    if magic != MAGIC:
+        raise ValueError(f"{path}: pas une capture Wakering")
+    if version != VERSION:
+        raise ValueError(f"{path}: version de capture {version} non supportée")
+
+    view = memoryview(content)
+    offset = HEADER.size
+    uuids = {}
+    records = []
+    while offset < len(content):
+        kind = content[offset]
+        if kind == RECORD_UUID:
+            _, index, raw_uuid = UUID_RECORD.unpack_from(view, offset)
+            uuids[index] = str(uuid.UUID(bytes=raw_uuid))
+            offset += UUID_RECORD.size
+        else:
+            _, index, elapsed_us, length = FRAME_RECORD.unpack_from(view, offset)
+            offset += FRAME_RECORD.size
+            records.append((kind, uuids[index], elapsed_us / 1_000_000, bytes(view[offset:offset + length])))
+            offset += length
+    return records
+
+
+async def replay(path, ring, realtime=True, speed=1.0, metrics=FRAME_METRICS):
+    """Rejouer les notifications d'une capture dans ring.notification_handler
+
+    Sans matériel: les écritures enregistrées ne sont pas renvoyées, les
+    mesures `metrics` sont marquées actives le temps du rejeu pour que
+    les trames soient décodées, stockées et poussées aux flux.
+    realtime=False rejoue aussi vite que possible (bancs d'essai).
+    Retourne le nombre de notifications rejouées.
+    """
+    records = read_capture(path)
+    activated = [m for m in metrics if m not in ring.active_measurements]
+    for metric in activated:
+        ring.active_measurements[metric] = asyncio.Event()
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    count = 0
+    try:
+        for kind, char_uuid, elapsed, data in records:
+            if kind != RECORD_NOTIFY:
+                continue
+            if realtime:
+                delay = start + elapsed / speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            ring.notification_handler(char_uuid, bytearray(data))
+            count += 1
+    finally:
+        for metric in activated:
+            ring.active_measurements.pop(metric, None)
+    return count
+
+
+def replay_into_analyzer(path, analyzer):
+    """Décoder toutes les notifications d'une capture avec un DataAnalyzer
+
+    Retourne la liste des (métrique, valeur) décodées, dans l'ordre.
+    """
+    decoded = []
+    for kind, char_uuid, elapsed, data in read_capture(path):
+        if kind == RECORD_NOTIFY and char_uuid == NOTIFY_CHAR_UUID:
+            hint = MEASUREMENT_TRANSACTIONS.get(data[TRANSACTION_OFFSET]) if len(data) > TRANSACTION_OFFSET else None
+            result = analyzer.analyze(data, hint)
+            if result:
+                analyzer.store_data(result[0], data, result[1])
+                decoded.append(result)
+    return decoded
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Afficher le contenu d'une capture
+    for kind, char_uuid, elapsed, data in read_capture(sys.argv[1]):
+        direction = '>' if kind == RECORD_WRITE else '<'
+        print(f"{elapsed:10.3f}s {direction} {char_uuid[4:8]} {data.hex(' ').upper()}")
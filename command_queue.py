@@ -0,0 +1,193 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+# Voies de priorité: la plus petite valeur passe en premier
+PRIORITY_ALARM = 0  # Vibrations (alarmes, menu)
+PRIORITY_CONTROL = 1  # Authentification, dissociation
+PRIORITY_MEASUREMENT = 2  # Démarrage/arrêt des mesures
+PRIORITY_BULK = 3  # Programmation des alarmes de la bague
+
+LANES = {
+    PRIORITY_ALARM: 'alarm',
+    PRIORITY_CONTROL: 'control',
+    PRIORITY_MEASUREMENT: 'measurement',
+    PRIORITY_BULK: 'bulk',
+}
+
+
+class Command:
+    """Écriture en attente dans la file"""
+
+    __slots__ = ('priority', 'char_uuid', 'data', 'expires', 'key', 'future', 'enqueued', 'waiters', 'started')
+
+    def __init__(self, priority, char_uuid, data, expires, key, future):
+        self.priority = priority
+        self.char_uuid = char_uuid
+        self.data = data
+        self.expires = expires  # Échéance monotone, None = pas de limite
+        self.key = key  # Clé de regroupement des doublons
+        self.future = future
+        self.enqueued = time.monotonic()
+        self.waiters = 1
+        self.started = False
+
+    def cancel(self):
+        """Retirer la commande si elle n'est pas encore partie (résultat False)"""
+        if self.started or self.future.done():
+            return False
+        self.future.set_result(False)
+        return True
+
+
+class CommandQueue:
+    """File d'écriture unique d'une bague, par voies de priorité
+
+    Une seule tâche possède la caractéristique: elle prend la commande
+    la plus prioritaire (puis la plus ancienne) et l'écrit. Seule
+    l'écriture GATT occupe la file; l'attente de l'acquittement reste
+    chez l'appelant. Une vibration d'alarme attend donc au plus
+    l'écriture en cours, quel que soit le nombre de commandes en attente.
+
+    Une commande non partie avant son échéance est abandonnée. Une
+    commande avec une clé déjà en attente est regroupée avec elle: un
+    seul envoi (les dernières données, la meilleure priorité) dont le
+    résultat revient à tous les appelants.
+    """
+
+    def __init__(self, write, metrics=None):
+        self.write = write  # Coroutine write(char_uuid, data): l'écriture GATT
+        self.metrics = metrics
+        self.heap = []  # [(priorité, ordre, commande)] - entrées périmées ignorées
+        self.keyed = {}  # {clé: commande en attente}
+        self.order = itertools.count()
+        self.ready = None
+        self.task = None
+
+    def __len__(self):
+        return sum(1 for priority, _, command in self.heap
+                   if priority == command.priority and not command.future.done())
+
+    def pending(self):
+        """Nombre de commandes en attente par voie"""
+        counts = dict.fromkeys(LANES.values(), 0)
+        for priority, _, command in self.heap:
+            if priority == command.priority and not command.future.done():
+                counts[LANES[priority]] += 1
+        return counts
+
+    def submit(self, char_uuid, data, priority=PRIORITY_CONTROL, deadline=None, key=None):
+        """Mettre une écriture en file; retourne la Command (future du résultat)
+
+        deadline: secondes max avant le départ, key: regroupement des doublons.
+        """
+        loop = asyncio.get_running_loop()
+        expires = time.monotonic() + deadline if deadline is not None else None
+
+        command = self.keyed.get(key) if key is not None else None
+        if command is not None and not command.future.done():
+            # Doublon: mêmes données au plus tard, meilleure priorité
+            command.char_uuid = char_uuid
+            command.data = data
+            command.waiters += 1
+            if command.expires is not None:
+                command.expires = None if expires is None else max(command.expires, expires)
+            if priority < command.priority:
+                command.priority = priority
+                heapq.heappush(self.heap, (priority, next(self.order), command))
+                self._wake()
+            if self.metrics:
+                self.metrics.commands_coalesced.value += 1
+            return command
+
+        command = Command(priority, char_uuid, data, expires, key, loop.create_future())
+        if key is not None:
+            self.keyed[key] = command
+        heapq.heappush(self.heap, (priority, next(self.order), command))
+        self.start()
+        self._wake()
+        return command
+
+    async def send(self, char_uuid, data, priority=PRIORITY_CONTROL, deadline=None, key=None):
+        """Écrire via la file; True une fois écrit, False si abandonné
+
+        L'annulation de l'appelant retire la commande si personne d'autre
+        ne l'attend et qu'elle n'est pas encore partie.
+        """
+        command = self.submit(char_uuid, data, priority, deadline, key)
+        try:
+            return await asyncio.shield(command.future)
+        except asyncio.CancelledError:
+            command.waiters -= 1
+            if command.waiters <= 0 and command.cancel():
+                self._dropped()
+            raise
+
+    def clear(self):
+        """Abandonner toutes les commandes en attente (déconnexion)"""
+        for _, _, command in self.heap:
+            if command.cancel():
+                self._dropped()
+        self.heap.clear()
+        self.keyed.clear()
+
+    def _wake(self):
+        if self.ready:
+            self.ready.set()
+
+    def _dropped(self):
+        if self.metrics:
+            self.metrics.commands_dropped.value += 1
+
+    def _next(self):
+        """Commande suivante encore valide, ou None"""
+        while self.heap:
+            priority, _, command = heapq.heappop(self.heap)
+            if priority != command.priority or command.future.done():
+                continue  # Entrée périmée (priorité relevée) ou annulée
+            if command.key is not None and self.keyed.get(command.key) is command:
+                del self.keyed[command.key]
+            if command.expires is not None and time.monotonic() > command.expires:
+                command.cancel()
+                self._dropped()
+                continue
+            return command
+        return None
+
+    async def run(self):
+        """Tâche d'écriture: vider la file par priorité"""
+        ready = self.ready = asyncio.Event()
+        while True:
+            command = self._next()
+            if command is None:
+                ready.clear()
+                await ready.wait()
+                continue
+
+            command.started = True
+            if self.metrics:
+                self.metrics.queue_wait.observe(time.monotonic() - command.enqueued)
+            try:
+                result = await self.write(command.char_uuid, command.data)
+            except asyncio.CancelledError:
+                # File arrêtée pendant l'écriture: résultat inconnu
+                command.future.set_result(False)
+                raise
+            except Exception as e:
+                command.future.set_exception(e)
+            else:
+                command.future.set_result(result)
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if not self.task or self.task.done() or self.task.get_loop() is not loop:
+            self.task = loop.create_task(self.run())
+        return self.task
+
+    def stop(self):
+        """Arrêter la tâche d'écriture et abandonner la file"""
+        self.clear()
+        if self.task and not self.task.done():
+            self.task.cancel()
+        self.task = None
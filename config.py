@@ -1,3 +1,5 @@
+import os
+
 # Configuration de la bague
 RING_ADDRESS = "38501439-08EC-00D8-9D8C-08A9FF1B1ACB"
 SERVICE_UUID = "0000fe02-0000-1000-8000-00805f9b34fb"
@@ -5,36 +7,141 @@ WRITE_CHAR_UUID = "00000101-0000-1000-8000-00805f9b34fb"
 NOTIFY_CHAR_UUID = "0000010a-0000-1000-8000-00805f9b34fb"
 HEARTRATE_WRITE_UUID = "00000131-0000-1000-8000-00805f9b34fb"
 
-# Commandes
+# Commandes: trame 00 <longueur> 83 40 <flag> <transaction> <payload> <checksum>
+# Seul le payload est écrit ici (hex espacé); longueur et checksum (CRC-16)
+# sont calculés par protocol.CommandFactory. {date} = date courante.
 COMMANDS = {
-    'heartrate': "00 06 83 40 01 62 31 51 01 01 94 73",
-    'heartrate_stop': "00 04 83 40 01 63 81 17 57 70",
-    'o2': "00 06 83 40 00 1F 31 51 02 01 C1 20",
-    'temperature': "00 06 83 40 00 34 31 51 06 01 0D E4",
-    'steps': "00 0A 83 40 00 9F 33 33 19 06 0C 03 24 22 79 1B",
-    'unbind': "00 05 83 40 00 2f 10 09 02 15 25"
+    'heartrate': {'flag': 0x01, 'transaction': 0x62, 'payload': "31 51 01 01"},
+    'heartrate_stop': {'flag': 0x01, 'transaction': 0x63, 'payload': "81 17"},
+    'o2': {'flag': 0x00, 'transaction': 0x1F, 'payload': "31 51 02 01"},
+    'temperature': {'flag': 0x00, 'transaction': 0x34, 'payload': "31 51 06 01"},
+    'steps': {'flag': 0x00, 'transaction': 0x9F, 'payload': "33 33 {date}"},
+    'unbind': {'flag': 0x00, 'transaction': 0x2F, 'payload': "10 09 02"}
 }
 
 # Types de vibrations
 VIBRATIONS = {
-    "1": {"name": "💡 Tips", "data": "00 06 83 40 01 2d 16 10 01 ff d6 5c"},
-    "2": {"name": "🏥 Alerte santé", "data": "00 06 83 40 01 2e 16 10 02 ff 83 0f"},
-    "3": {"name": "⏰ Alarme", "data": "00 06 83 40 01 2f 16 10 03 ff b0 3e"},
-    "4": {"name": "📞 Appel", "data": "00 06 83 40 01 30 16 10 04 ff 29 a9"},
-    "5": {"name": "📅 Rappel", "data": "00 06 83 40 01 31 16 10 06 ff 4f cb"}
+    "1": {"name": "💡 Tips", "flag": 0x01, "transaction": 0x2D, "payload": "16 10 01 ff"},
+    "2": {"name": "🏥 Alerte santé", "flag": 0x01, "transaction": 0x2E, "payload": "16 10 02 ff"},
+    "3": {"name": "⏰ Alarme", "flag": 0x01, "transaction": 0x2F, "payload": "16 10 03 ff"},
+    "4": {"name": "📞 Appel", "flag": 0x01, "transaction": 0x30, "payload": "16 10 04 ff"},
+    "5": {"name": "📅 Rappel", "flag": 0x01, "transaction": 0x31, "payload": "16 10 06 ff"}
 }
 
-# Séquence d'authentification
+# Séquence d'authentification (payloads; transaction = position, flag 00)
 AUTH_PACKETS = [
-    "00 46 83 40 00 00 30 30 01 19 06 07 05 23 10 02 01 00 30 30 30 30 30 30 30 30 31 66 30 63 39 62 38 35 30 30 30 30 30 30 30 30 36 36 33 65 66 62 31 33 3b 32 2e 30 2e 33 3b 41 31 30 31 33 44 30 30 43 4e 31 32 31 38 48 45 3b d6 1f",
-    "00 05 83 40 00 01 70 71 01 3f dd",
-    "00 09 83 40 00 02 80 83 af 3c 01 19 01 f2 4b",
-    "00 05 83 40 00 03 81 1c 02 a6 aa",
-    "00 18 83 40 00 04 24 02 02 04 38 07 80 00 53 00 41 00 4d 00 53 00 55 00 4e 00 47 3b ed a2",
-    "00 04 83 40 00 05 39 01 b2 23",
-    "00 04 83 40 00 06 96 10 bd 73",
-    "00 0b 83 40 00 07 38 38 03 19 06 07 05 23 11 31 90",
-    "00 0b 83 40 00 08 38 38 04 19 06 07 05 23 11 28 d4",
-    "00 0b 83 40 00 09 38 38 02 19 06 07 05 23 11 89 f1",
-    "00 0b 83 40 00 0a 38 38 01 19 06 07 05 23 11 51 73"
-]
\ No newline at end of file
+    # Identifiant ASCII "000000001f0c9b8500000000663efb13;2.0.3;A1013D00CN1218HE;"
+    "30 30 01 {date} 02 01 00 30 30 30 30 30 30 30 30 31 66 30 63 39 62 38 35 30 30 30 30 30 30 30 30 36 36 33 65 66 62 31 33 3b 32 2e 30 2e 33 3b 41 31 30 31 33 44 30 30 43 4e 31 32 31 38 48 45 3b",
+    "70 71 01",
+    "80 83 af 3c 01 19 01",
+    "81 1c 02",
+    "24 02 02 04 38 07 80 00 53 00 41 00 4d 00 53 00 55 00 4e 00 47 3b",  # "SAMSUNG" en UTF-16
+    "39 01",
+    "96 10",
+    "38 38 03 {date}",
+    "38 38 04 {date}",
+    "38 38 02 {date}",
+    "38 38 01 {date}"
+]
+
+# Flotte de bagues
+RING_ADDRESSES = [RING_ADDRESS]
+FLEET_CONCURRENCY = 8
+
+# Découverte
+SCAN_TIMEOUT = 10.0  # Durée max du scan (arrêté dès que la bague est vue)
+DIRECT_CONNECT_TIMEOUT = 5.0  # Connexion directe depuis le cache
+DEVICE_CACHE_FILE = "last_device.json"
+
+# Acquittements (attente max de la réponse de la bague, en secondes)
+ACK_TIMEOUT = 0.5
+AUTH_ACK_TIMEOUT = 1.3
+UNBIND_ACK_TIMEOUT = 3.0
+ALARM_ACK_TIMEOUT = 2.0  # Paquets d'alarme: la transaction est abandonnée sans réponse
+
+# Gabarits de commandes (protocol.CommandFactory)
+COMMAND_CACHE_SIZE = 1024  # Paquets rendus gardés en cache
+
+# File de commandes (command_queue.py)
+COMMAND_DEADLINE = 10.0  # Écriture abandonnée si elle n'est pas partie après 10 s
+
+# Reconnexion automatique
+RECONNECT_BACKOFF = [0.0, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0]  # Délais successifs (s)
+RECONNECT_ATTEMPTS = 20
+RECONNECT_WAIT_TIMEOUT = 10.0  # Attente max d'une écriture pendant la reconnexion
+
+# Tampons d'échantillons (par métrique, les plus anciens sont écrasés)
+SAMPLE_BUFFER_CAPACITY = 4096
+
+# Historique des mesures sur disque
+SAMPLE_DB_FILE = "samples.db"
+SAMPLE_STORE_BATCH = 500  # Échantillons max par transaction
+SAMPLE_STORE_FLUSH_INTERVAL = 1.0  # Secondes
+SAMPLE_STORE_QUEUE_SIZE = 100000
+
+# Flux d'échantillons (Wakering.stream)
+STOP_COMMANDS = {'heartrate': 'heartrate_stop'}  # Commande d'arrêt par mesure
+STREAM_QUEUE_SIZE = 256
+STREAM_OVERFLOW = 'drop_oldest'  # ou 'drop_newest'
+
+# Mesures adaptatives: arrêt dès que la lecture est stable
+ADAPTIVE_MEASURE = True  # Utilisé par le menu
+CONVERGENCE_RULES = {
+    # window échantillons consécutifs à ±tolerance de leur moyenne
+    'heartrate': {'window': 5, 'tolerance': 3, 'min_duration': 5.0},
+    'o2': {'window': 5, 'tolerance': 1, 'min_duration': 5.0},
+    'temperature': {'window': 5, 'tolerance': 0.2, 'min_duration': 5.0},
+}
+
+# Mesures simultanées (Wakering.measure_many)
+# heartrate et o2 ont la même disposition de trame: l'écho de l'octet de
+# transaction les distingue. False si la bague ne le reprend pas: l'une après l'autre
+PARALLEL_SHARED_LAYOUTS = True
+
+# Métriques d'exécution (Prometheus)
+METRICS_HTTP_PORT = None  # ex. 9108 pour servir http://127.0.0.1:9108/metrics
+METRICS_FILE = None  # ex. "wakering.prom" pour le collecteur textfile
+METRICS_FILE_INTERVAL = 15.0  # Secondes
+METRICS_RATE_WINDOW = 10  # Secondes, fenêtre de notifications_per_second
+
+# Journalisation
+LOG_LEVEL = "INFO"  # "DEBUG" affiche chaque trame en hexadécimal
+FRAME_CAPTURE_SIZE = 256  # Dernières trames brutes gardées en mémoire
+
+# Capture du trafic BLE (capture.py)
+CAPTURE_FILE = None  # ex. "session.wkr" pour enregistrer chaque session
+
+# Bague simulée (simulator.py)
+SIM_NOTIFY_INTERVAL = 1.0  # Secondes entre deux trames de mesure
+SIM_LATENCY = 0.02  # Délai moyen d'une réponse (secondes)
+SIM_JITTER = 0.01  # Variation ± du délai
+SIM_DROP_RATE = 0.0  # Probabilité de perdre une notification
+SIM_MEASURE_DURATION = 60.0  # Arrêt automatique d'une mesure sans commande stop
+
+# Bancs d'essai (benchmark.py)
+BENCH_BASELINE_FILE = "benchmark_baseline.json"
+BENCH_TOLERANCE = 1.5  # Régression si p50 > 1.5 x baseline
+
+# Planificateur d'alarmes (alarm_scheduler.py)
+ALARM_GRACE_PERIOD = 300.0  # Retard max (s) pour rattraper une échéance manquée
+ALARM_MAX_SLEEP = 60.0  # Réveil au moins toutes les 60 s (changement d'heure système)
+
+# Alarmes sur disque (alarm_store.py)
+ALARM_FILE = "alarms.json"  # Instantané; journal dans alarms.json.journal
+ALARM_JOURNAL_COMPACT = 500  # Lignes de journal avant compaction
+
+# Alarmes confiées à la bague (alarm_sync.py)
+ALARM_OFFLOAD = True  # Programmer les alarmes de l'hôte dans les emplacements de la bague
+RING_ALARM_SLOTS = 5  # Emplacements d'alarme du firmware
+RING_ALARM_FILE = "ring_alarms.json"  # Contenu connu des emplacements, par bague
+ALARM_SYNC_DELAY = 1.0  # Regroupement des modifications avant synchronisation (s)
+
+# Console interactive (console.py)
+CONSOLE_STATUS_BAR = True  # Barre de statut en haut du terminal
+CONSOLE_STATUS_INTERVAL = 1.0  # Rafraîchissement (s)
+
+# Démon et socket de contrôle (daemon.py)
+# Socket Unix JSON-RPC: répertoire d'exécution de l'utilisateur, sinon son dossier personnel
+DAEMON_SOCKET = os.path.join(os.environ.get('XDG_RUNTIME_DIR') or os.path.expanduser('~'), "wakering.sock")
+DAEMON_SOCKET_MODE = 0o600  # Accès réservé à l'utilisateur du démon
+DAEMON_RETRY_INTERVAL = 60.0  # Nouvelle tentative pour les bagues en échec (s)
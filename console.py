@@ -0,0 +1,140 @@
+import asyncio
+import codecs
+import os
+import shutil
+import sys
+import threading
+from config import CONSOLE_STATUS_BAR, CONSOLE_STATUS_INTERVAL
+
+YES = ('o', 'oui', 'y', 'yes')
+
+
+class AsyncConsole:
+    """Saisie clavier sans bloquer la boucle asyncio
+
+    L'entrée standard est lue par la boucle elle-même (add_reader, sans
+    thread) ou, si ce n'est pas possible (Windows, entrée non
+    sélectionnable), par un thread de lecture. Pendant qu'une question
+    attend sa réponse, alarmes, notifications et reconnexions continuent.
+
+    Dans un terminal, la première ligne de l'écran sert de barre de
+    statut, redessinée toutes les interval secondes depuis status()
+    sans toucher à la saisie en cours (zone de défilement en dessous).
+    """
+
+    def __init__(self, status=None, interval=CONSOLE_STATUS_INTERVAL, stdin=None, stdout=None):
+        self.status = status  # Fonction -> ligne de statut (données en direct)
+        self.interval = interval
+        self.stdin = stdin or sys.stdin
+        self.stdout = stdout or sys.stdout
+        self.lines = None
+        self.buffer = ''
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.fd = None
+        self.thread = None
+        self.status_task = None
+        self.rows = None
+
+    # --- Lecture -----------------------------------------------------------------
+
+    def start(self):
+        """Commencer à lire l'entrée standard (idempotent)"""
+        if self.lines is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self.lines = asyncio.Queue()
+        try:
+            fd = self.stdin.fileno()
+            loop.add_reader(fd, self._readable)
+            self.fd = fd
+        except (AttributeError, ValueError, OSError, NotImplementedError):
+            # Pas de lecture par la boucle: thread dédié
+            self.thread = threading.Thread(target=self._read_thread, args=(loop,), daemon=True)
+            self.thread.start()
+
+    def _readable(self):
+        data = os.read(self.fd, 4096)
+        if not data:
+            asyncio.get_running_loop().remove_reader(self.fd)
+            self.fd = None
+            self.lines.put_nowait(None)  # Fin de l'entrée
+            return
+        self.buffer += self.decoder.decode(data)
+        *complete, self.buffer = self.buffer.split('\n')
+        for line in complete:
+            self.lines.put_nowait(line.rstrip('\r'))
+
+    def _read_thread(self, loop):
+        while True:
+            line = self.stdin.readline()
+            loop.call_soon_threadsafe(self.lines.put_nowait, line.rstrip('\r\n') if line else None)
+            if not line:
+                return
+
+    async def input(self, prompt=''):
+        """Équivalent asynchrone de input(); EOFError en fin d'entrée"""
+        self.start()
+        self.stdout.write(prompt)
+        self.stdout.flush()
+        line = await self.lines.get()
+        if line is None:
+            self.lines.put_nowait(None)  # Les questions suivantes échouent aussi
+            raise EOFError
+        return line
+
+    async def confirm(self, prompt):
+        """Question oui/non (non par défaut)"""
+        return (await self.input(prompt)).strip().lower() in YES
+
+    # --- Barre de statut -------------------------------------------------------
+
+    @property
+    def live(self):
+        return self.status_task is not None
+
+    def show_status(self):
+        """Afficher la barre de statut (terminal uniquement)"""
+        if self.status is None or self.live or not CONSOLE_STATUS_BAR or not self.stdout.isatty():
+            return
+        self.status_task = asyncio.ensure_future(self._redraw_loop())
+
+    async def _redraw_loop(self):
+        while True:
+            self.redraw()
+            await asyncio.sleep(self.interval)
+
+    def redraw(self):
+        columns, rows = shutil.get_terminal_size()
+        try:
+            line = self.status()
+        except Exception as e:
+            line = f"⚠️ Statut indisponible: {e}"
+        output = []
+        if rows != self.rows:
+            # Ligne 1 réservée, défilement des lignes 2 à rows
+            output.append(f"\0337\033[2;{rows}r\0338")
+            if self.rows is None:
+                output.append(f"\n\033[{rows};1H")
+            self.rows = rows
+        # Curseur sauvegardé/restauré: la saisie en cours n'est pas touchée
+        output.append(f"\0337\033[1;1H\033[2K{line[:max(columns - 2, 0)]}\0338")
+        self.stdout.write(''.join(output))
+        self.stdout.flush()
+
+    def hide_status(self):
+        if self.status_task:
+            self.status_task.cancel()
+            self.status_task = None
+        if self.rows is not None:
+            # Rendre tout l'écran au défilement
+            self.stdout.write("\0337\033[r\033[1;1H\033[2K\0338")
+            self.stdout.flush()
+            self.rows = None
+
+    def stop(self):
+        """Arrêter la lecture et la barre de statut"""
+        self.hide_status()
+        if self.fd is not None:
+            asyncio.get_running_loop().remove_reader(self.fd)
+            self.fd = None
+            self.lines = None
@@ -0,0 +1,39 @@
+from collections import deque
+from statistics import pvariance
+from config import CONVERGENCE_RULES
+
+
+class ConvergenceRule:
+    """Règle d'arrêt anticipé d'une mesure
+
+    La lecture est stable quand les `window` derniers échantillons restent
+    à ±tolerance de leur moyenne, ou, si max_variance est donné, quand leur
+    variance passe sous ce seuil. Jamais avant min_duration secondes.
+    """
+
+    def __init__(self, window=5, tolerance=2.0, max_variance=None, min_duration=0.0):
+        self.window = window
+        self.tolerance = tolerance
+        self.max_variance = max_variance
+        self.min_duration = min_duration
+        self.values = deque(maxlen=window)
+
+    @classmethod
+    def for_metric(cls, metric):
+        """Règle par défaut d'une métrique (CONVERGENCE_RULES)"""
+        return cls(**CONVERGENCE_RULES.get(metric, {}))
+
+    def reset(self):
+        self.values.clear()
+
+    def update(self, value):
+        """Ajouter un échantillon; True si la lecture est stable"""
+        self.values.append(value)
+        if len(self.values) < self.window:
+            return False
+
+        if self.max_variance is not None:
+            return pvariance(self.values) <= self.max_variance
+
+        mean = sum(self.values) / len(self.values)
+        return all(abs(v - mean) <= self.tolerance for v in self.values)
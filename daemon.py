@@ -0,0 +1,625 @@
+import argparse
+import asyncio
+import inspect
+import itertools
+import json
+import os
+import signal
+import socket
+import sys
+import time
+from config import (RING_ADDRESSES, VIBRATIONS, ADAPTIVE_MEASURE, ALARM_OFFLOAD, DAEMON_SOCKET,
+                    DAEMON_SOCKET_MODE, DAEMON_RETRY_INTERVAL)
+from alarm_manager import AlarmManager
+from alarm_sync import AlarmSync
+from beta_alarm import AlarmManager as RingAlarmManager
+from fleet import RingFleet
+from sample_store import SampleStore
+from metrics import start_exporters, stop_exporters, snapshot
+from frame_log import setup_logging
+
+# Codes d'erreur JSON-RPC 2.0 (-32000..-32099: erreurs du serveur)
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+RING_UNAVAILABLE = -32000
+REQUEST_CANCELLED = -32800
+
+# Valeur retournée par measure: dernier résultat décodé par l'analyseur
+MEASURE_VALUES = {
+    'heartrate': 'current_bpm',
+    'o2': 'current_o2',
+    'temperature': 'current_temperature',
+    'steps': 'current_steps',
+}
+
+
+class RpcError(Exception):
+    """Erreur renvoyée au client dans la réponse JSON-RPC"""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _encode(message):
+    return (json.dumps(message, ensure_ascii=False) + '\n').encode()
+
+
+def _error(request_id, code, message):
+    return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}}
+
+
+class Client:
+    """Connexion d'un client sur le socket de contrôle"""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.lock = asyncio.Lock()  # Une ligne JSON à la fois
+        self.calls = {}  # {id de requête: tâche} pour cancel
+        self.cancelled = set()
+        self.tasks = set()
+
+    async def send(self, message):
+        async with self.lock:
+            if self.writer.is_closing():
+                return
+            try:
+                self.writer.write(_encode(message))
+                await self.writer.drain()
+            except (ConnectionError, BrokenPipeError):
+                pass  # Client parti: ses tâches sont annulées par la boucle de lecture
+
+
+class Call:
+    """Contexte d'une requête: client d'origine et id (notifications de flux)"""
+
+    def __init__(self, client, request_id):
+        self.client = client
+        self.id = request_id
+
+    async def notify(self, method, params):
+        await self.client.send({'jsonrpc': '2.0', 'method': method, 'params': params})
+
+
+class WakeringDaemon:
+    """Démon headless: une connexion chaude partagée par tous les clients
+
+    Le démon possède les bagues (RingFleet: scan, connexion et
+    authentification une seule fois) et le gestionnaire d'alarmes de la
+    première bague. Scripts, tâches cron et tableaux de bord lui parlent
+    en JSON-RPC 2.0 sur un socket Unix, une requête JSON par ligne. Les
+    requêtes d'un même client sont traitées en parallèle: une mesure en
+    cours ne bloque ni status ni vibrate, et toutes les écritures passent
+    par la file de commandes de la bague.
+
+    Deux mesures simultanées d'une même métrique partagent la même
+    mesure; plusieurs flux d'une même métrique partagent le même
+    abonnement. Une bague en échec est retentée toutes les retry secondes.
+    """
+
+    def __init__(self, addresses=RING_ADDRESSES, path=DAEMON_SOCKET, store=None, transport=None,
+                 retry=DAEMON_RETRY_INTERVAL):
+        self.path = path
+        self.retry = retry
+        self.fleet = RingFleet(addresses, store=store, transport=transport)
+        self.primary = addresses[0]
+        # Alarmes de l'hôte: déclenchées sur la première bague
+        self.alarm_manager = AlarmManager(self.fleet.rings[self.primary])
+        self.alarm_sync = None
+        if ALARM_OFFLOAD:
+            self.alarm_sync = AlarmSync(self.alarm_manager, RingAlarmManager(self.fleet.rings[self.primary]))
+            self.alarm_manager.sync = self.alarm_sync
+        self.server = None
+        self.clients = set()
+        self.measuring = {}  # {(adresse, métrique): tâche} partagées entre clients
+        self.started = None
+        self.stopping = None
+        self.methods = {
+            'status': self.rpc_status,
+            'rings': self.rpc_rings,
+            'metrics': self.rpc_metrics,
+            'vibrate': self.rpc_vibrate,
+            'measure': self.rpc_measure,
+            'stream': self.rpc_stream,
+            'cancel': self.rpc_cancel,
+            'alarms.list': self.rpc_alarms_list,
+            'alarms.add': self.rpc_alarms_add,
+            'alarms.remove': self.rpc_alarms_remove,
+            'alarms.toggle': self.rpc_alarms_toggle,
+            'alarms.sync': self.rpc_alarms_sync,
+        }
+
+    # --- Cycle de vie ------------------------------------------------------------
+
+    async def start(self):
+        """Ouvrir le socket puis connecter les bagues
+
+        Le socket est ouvert d'abord: status répond pendant la connexion.
+        """
+        self.started = time.time()
+        self.stopping = asyncio.Event()
+        _remove_stale_socket(self.path)
+        self.server = await asyncio.start_unix_server(self._serve_client, sock=_bind_socket(self.path))
+        print(f"🛰️ Démon à l'écoute sur {self.path}")
+
+        await self.fleet.start()
+        self.alarm_manager.start_monitoring()
+        if self.alarm_sync:
+            self.alarm_sync.request()
+
+    async def run(self):
+        """Servir jusqu'à stop() (SIGINT/SIGTERM), en retentant les bagues en échec"""
+        await self.start()
+        while not self.stopping.is_set():
+            try:
+                await asyncio.wait_for(self.stopping.wait(), self.retry)
+            except asyncio.TimeoutError:
+                # Reconnexion automatique abandonnée: la bague repasse par le scan
+                self.fleet.check_links()
+                if self.fleet.failed:
+                    await self.fleet.retry_failed()
+
+    def stop(self):
+        if self.stopping:
+            self.stopping.set()
+
+    async def close(self):
+        """Fermer les clients, le socket, les alarmes puis les bagues"""
+        server, self.server = self.server, None
+        if server is None:
+            return  # Jamais démarré (socket déjà pris): rien à fermer, alarmes intactes
+        server.close()
+        for client in list(self.clients):
+            for task in list(client.tasks):
+                task.cancel()
+            client.writer.close()
+        await server.wait_closed()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        for task in list(self.measuring.values()):
+            task.cancel()
+        if self.alarm_manager.running:
+            self.alarm_manager.stop_monitoring()
+        try:
+            await self.alarm_manager.close()
+        finally:
+            await self.fleet.stop()
+
+    # --- Protocole -----------------------------------------------------------------
+
+    async def _serve_client(self, reader, writer):
+        client = Client(writer)
+        self.clients.add(client)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    break  # Ligne trop longue ou connexion coupée
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    await client.send(_error(None, PARSE_ERROR, "JSON invalide"))
+                    continue
+
+                request_id = message.get('id') if isinstance(message, dict) else None
+                if request_id is not None:
+                    if isinstance(request_id, bool) or not isinstance(request_id, (str, int, float)):
+                        await client.send(_error(None, INVALID_REQUEST, "id doit être une chaîne ou un nombre"))
+                        continue
+                    if request_id in client.calls:
+                        # cancel et la réponse désignent la requête par son id
+                        await client.send(_error(request_id, INVALID_REQUEST, f"id déjà en cours: {request_id!r}"))
+                        continue
+
+                task = asyncio.ensure_future(self._dispatch(client, message))
+                if request_id is not None:
+                    client.calls[request_id] = task
+                client.tasks.add(task)
+                task.add_done_callback(client.tasks.discard)
+        finally:
+            # Client parti: ses requêtes en cours (flux compris) s'arrêtent
+            for task in list(client.tasks):
+                task.cancel()
+            self.clients.discard(client)
+            writer.close()
+
+    async def _dispatch(self, client, message):
+        request_id = message.get('id') if isinstance(message, dict) else None
+        try:
+            if not isinstance(message, dict) or message.get('jsonrpc') != '2.0' \
+                    or not isinstance(message.get('method'), str):
+                raise RpcError(INVALID_REQUEST, "Requête JSON-RPC 2.0 invalide")
+
+            handler = self.methods.get(message['method'])
+            if handler is None:
+                raise RpcError(METHOD_NOT_FOUND, f"Méthode inconnue: {message['method']}")
+
+            params = message.get('params', {})
+            args, kwargs = (params, {}) if isinstance(params, list) else ((), params)
+            if not isinstance(kwargs, dict):
+                raise RpcError(INVALID_PARAMS, "params doit être un objet ou une liste")
+            call = Call(client, request_id)
+            try:
+                inspect.signature(handler).bind(call, *args, **kwargs)
+            except TypeError as e:
+                raise RpcError(INVALID_PARAMS, str(e))
+
+            response = {'jsonrpc': '2.0', 'id': request_id, 'result': await handler(call, *args, **kwargs)}
+        except RpcError as e:
+            response = _error(request_id, e.code, e.message)
+        except asyncio.CancelledError:
+            if request_id not in client.cancelled:
+                raise  # Client parti ou démon arrêté: pas de réponse
+            response = _error(request_id, REQUEST_CANCELLED, "Requête annulée")
+        except Exception as e:
+            response = _error(request_id, INTERNAL_ERROR, str(e))
+        finally:
+            if request_id is not None and client.calls.get(request_id) is asyncio.current_task():
+                del client.calls[request_id]
+            client.cancelled.discard(request_id)
+
+        if request_id is not None:
+            await client.send(response)
+
+    def _ring(self, address=None):
+        """Bague ciblée (première par défaut), connectée ou en reconnexion"""
+        address = self.primary if address is None else address
+        ring = self.fleet.rings.get(address)
+        if ring is None:
+            ring = next((r for a, r in self.fleet.rings.items() if a.upper() == str(address).upper()), None)
+        if ring is None:
+            raise RpcError(INVALID_PARAMS, f"Bague inconnue: {address}")
+
+        connected = ring.client and ring.client.is_connected
+        reconnecting = ring.reconnect_task and not ring.reconnect_task.done()
+        if not connected and not reconnecting:
+            raise RpcError(RING_UNAVAILABLE, f"Bague non connectée: {ring.address}")
+        return ring
+
+    # --- Méthodes --------------------------------------------------------------------
+
+    async def rpc_status(self, call):
+        """État du démon, des bagues et des alarmes"""
+        self.fleet.check_links()
+        rings = {}
+        for address, info in self.fleet.get_status_info()['rings'].items():
+            ring = self.fleet.rings[address]
+            analyzer = ring.analyzer
+            rings[address] = dict(
+                info,
+                connected=bool(ring.client and ring.client.is_connected),
+                authenticated=ring.is_authenticated,
+                status=ring.status_line(),
+                measuring=sorted(ring.active_measurements),
+                queue=ring.commands.pending(),
+                values={metric: getattr(analyzer, attribute) for metric, attribute in MEASURE_VALUES.items()},
+            )
+        return {
+            'uptime': time.time() - self.started,
+            'clients': len(self.clients),
+            'rings': rings,
+            'alarms': self.alarm_manager.get_status_info(),
+        }
+
+    async def rpc_rings(self, call):
+        """Adresses des bagues et leur état dans la flotte"""
+        return dict(self.fleet.states)
+
+    async def rpc_metrics(self, call, ring=None):
+        """Métriques d'exécution (toutes les bagues, ou une seule)"""
+        if ring is None:
+            return snapshot()
+        return self._ring(ring).metrics.snapshot()
+
+    async def rpc_vibrate(self, call, type="1", ring=None):
+        """Vibration (types de VIBRATIONS), voie prioritaire de la file"""
+        vib_type = str(type)
+        if vib_type not in VIBRATIONS:
+            raise RpcError(INVALID_PARAMS, f"Vibration inconnue: {vib_type}")
+        if not await self._ring(ring).send_vibration(vib_type):
+            raise RpcError(RING_UNAVAILABLE, f"Vibration {vib_type} non acquittée")
+        return True
+
+    async def rpc_measure(self, call, metric, duration=20, adaptive=ADAPTIVE_MEASURE, ring=None):
+        """Mesure ponctuelle; les demandes simultanées partagent la même mesure"""
+        if metric not in MEASURE_VALUES:
+            raise RpcError(INVALID_PARAMS, f"Métrique inconnue: {metric}")
+        duration = _number(int, 'duration', duration)
+        target = self._ring(ring)
+
+        key = (target.address, metric)
+        task = self.measuring.get(key)
+        if task is None:
+            task = asyncio.ensure_future(target.measure(metric, duration, countdown=False, adaptive=bool(adaptive)))
+            self.measuring[key] = task
+            task.add_done_callback(lambda _: self.measuring.pop(key, None))
+        # Un client qui abandonne n'arrête pas la mesure des autres
+        ok = await asyncio.shield(task)
+        return {
+            'ok': ok,
+            'metric': metric,
+            'value': getattr(target.analyzer, MEASURE_VALUES[metric]) if ok else None,
+            'converged_after': target.convergence_times.get(metric) if ok else None,
+        }
+
+    async def rpc_stream(self, call, metric, count=None, duration=None, ring=None):
+        """Flux d'échantillons: une notification 'sample' par échantillon
+
+        Se termine après count échantillons, duration secondes, cancel ou
+        la déconnexion du client; le résultat donne le nombre envoyé.
+        """
+        if metric not in MEASURE_VALUES:
+            raise RpcError(INVALID_PARAMS, f"Métrique inconnue: {metric}")
+        count = _number(int, 'count', count) if count is not None else None
+        duration = _number(float, 'duration', duration) if duration is not None else None
+        target = self._ring(ring)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + duration if duration is not None else None
+        sent = 0
+        try:
+            async with target.stream(metric) as samples:
+                while count is None or sent < count:
+                    timeout = None if deadline is None else deadline - loop.time()
+                    if timeout is not None and timeout <= 0:
+                        break
+                    sample = await samples.get(timeout)
+                    if sample is None:
+                        break
+                    await call.notify('sample', {
+                        'id': call.id,
+                        'ring': target.address,
+                        'metric': sample.metric,
+                        'value': sample.value,
+                        'timestamp': sample.timestamp,
+                    })
+                    sent += 1
+        except ConnectionError as e:
+            raise RpcError(RING_UNAVAILABLE, str(e))
+        return {'samples': sent, 'dropped': samples.dropped}
+
+    async def rpc_cancel(self, call, id):
+        """Annuler une requête en cours de ce client (flux, mesure)"""
+        task = call.client.calls.get(id)
+        if task is None or task.done():
+            return False
+        call.client.cancelled.add(id)
+        task.cancel()
+        return True
+
+    async def rpc_alarms_list(self, call):
+        """Alarmes de l'hôte (on_ring: confiée à un emplacement de la bague)"""
+        return [dict(alarm, on_ring=alarm['id'] in self.alarm_manager.offloaded)
+                for alarm in self.alarm_manager.alarms]
+
+    async def rpc_alarms_add(self, call, hour, minute, label=None, enabled=True):
+        """Nouvelle alarme quotidienne; retourne son id"""
+        if not isinstance(hour, int) or not isinstance(minute, int) \
+                or not (0 <= hour <= 23) or not (0 <= minute <= 59):
+            raise RpcError(INVALID_PARAMS, "Heure invalide")
+        return self.alarm_manager.add_alarm(hour, minute, label or f"Alarme {hour:02d}:{minute:02d}",
+                                            bool(enabled))
+
+    async def rpc_alarms_remove(self, call, id):
+        if not self.alarm_manager.remove_alarm(id):
+            raise RpcError(INVALID_PARAMS, f"Alarme {id} introuvable")
+        return True
+
+    async def rpc_alarms_toggle(self, call, id):
+        """Activer/désactiver; retourne le nouvel état"""
+        if not self.alarm_manager.toggle_alarm(id):
+            raise RpcError(INVALID_PARAMS, f"Alarme {id} introuvable")
+        return self.alarm_manager.store.get(id)['enabled']
+
+    async def rpc_alarms_sync(self, call):
+        """Synchroniser tout de suite les emplacements de la bague"""
+        if self.alarm_sync is None:
+            raise RpcError(INVALID_REQUEST, "ALARM_OFFLOAD désactivé")
+        self._ring()
+        return await self.alarm_sync.sync()
+
+
+def _number(kind, name, value):
+    """Paramètre numérique (int ou float), INVALID_PARAMS sinon"""
+    try:
+        if isinstance(value, bool):
+            raise TypeError
+        return kind(value)
+    except (TypeError, ValueError, OverflowError):
+        raise RpcError(INVALID_PARAMS, f"{name} invalide: {value!r}")
+
+
+def _bind_socket(path, mode=DAEMON_SOCKET_MODE):
+    """Socket Unix lié à path, créé directement avec les droits mode
+
+    Le umask est restreint pendant bind(): le socket n'existe jamais avec
+    des droits plus larges, même le temps d'un chmod.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    previous = os.umask(0o777 & ~mode)
+    try:
+        sock.bind(path)
+    except OSError:
+        sock.close()
+        raise
+    finally:
+        os.umask(previous)
+    return sock
+
+
+def _remove_stale_socket(path):
+    """Supprimer un socket laissé par un démon arrêté; erreur si un démon écoute"""
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)  # Personne n'écoute
+    else:
+        raise RuntimeError(f"Un démon écoute déjà sur {path}")
+    finally:
+        probe.close()
+
+
+class DaemonClient:
+    """Client asynchrone du démon
+
+    async with DaemonClient() as daemon:
+        await daemon.call('vibrate', type="3")
+        await daemon.call('stream', metric='heartrate', count=10, on_notification=print)
+    """
+
+    def __init__(self, path=DAEMON_SOCKET):
+        self.path = path
+        self.reader = None
+        self.writer = None
+        self.ids = itertools.count(1)
+        self.pending = {}  # {id: future de la réponse}
+        self.listeners = {}  # {id: callback des notifications de la requête}
+        self.task = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_unix_connection(self.path)
+        self.task = asyncio.ensure_future(self._read())
+        return self
+
+    async def close(self):
+        if self.task:
+            self.task.cancel()
+        if self.writer:
+            self.writer.close()
+
+    async def __aenter__(self):
+        return await self.connect()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _read(self):
+        try:
+            while line := await self.reader.readline():
+                message = json.loads(line)
+                if 'method' in message:
+                    listener = self.listeners.get(message.get('params', {}).get('id'))
+                    if listener:
+                        listener(message['params'])
+                    continue
+                future = self.pending.pop(message.get('id'), None)
+                if future and not future.done():
+                    future.set_result(message)
+        finally:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Démon déconnecté"))
+
+    async def call(self, method, on_notification=None, **params):
+        """Appel JSON-RPC; retourne result ou lève RpcError"""
+        request_id = next(self.ids)
+        future = self.pending[request_id] = asyncio.get_running_loop().create_future()
+        if on_notification:
+            self.listeners[request_id] = on_notification
+        try:
+            self.writer.write(_encode({'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params}))
+            await self.writer.drain()
+            response = await future
+        finally:
+            self.pending.pop(request_id, None)
+            self.listeners.pop(request_id, None)
+        if 'error' in response:
+            raise RpcError(response['error']['code'], response['error']['message'])
+        return response['result']
+
+
+def _parse_params(pairs):
+    """clé=valeur -> dict (valeurs JSON si possible: 3, true, [1, 2])"""
+    params = {}
+    for pair in pairs:
+        key, _, value = pair.partition('=')
+        try:
+            params[key] = json.loads(value)
+        except ValueError:
+            params[key] = value
+    return params
+
+
+async def serve(path, simulate=0):
+    setup_logging()
+    print("🔧 === WAKERING DÉMON ===")
+    transport = None
+    addresses = RING_ADDRESSES
+    if simulate:
+        from simulator import SimulatedTransport
+        transport = SimulatedTransport.fleet(simulate)
+        addresses = transport.addresses
+
+    store = SampleStore()
+    store.start()
+    exporters = start_exporters()
+    daemon = WakeringDaemon(addresses, path, store, transport)
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, daemon.stop)
+        except (NotImplementedError, RuntimeError):
+            pass
+    try:
+        await daemon.run()
+    finally:
+        await daemon.close()
+        store.close()
+        stop_exporters(exporters)
+        print("✅ Démon arrêté")
+
+
+async def call(path, method, params):
+    async with DaemonClient(path) as daemon:
+        def on_notification(notification):
+            print(json.dumps(notification, ensure_ascii=False), flush=True)
+
+        try:
+            result = await daemon.call(method, on_notification, **params)
+        except RpcError as e:
+            print(f"❌ {e.message} ({e.code})", file=sys.stderr)
+            return 1
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Démon Wakering (JSON-RPC sur socket Unix)")
+    parser.add_argument('--socket', default=DAEMON_SOCKET, help="chemin du socket de contrôle")
+    commands = parser.add_subparsers(dest='command')
+    serve_parser = commands.add_parser('serve', help="lancer le démon (défaut)")
+    serve_parser.add_argument('--simulate', type=int, default=0, metavar='N', help="N bagues simulées")
+    call_parser = commands.add_parser('call', help="appeler une méthode du démon")
+    call_parser.add_argument('method')
+    call_parser.add_argument('params', nargs='*', help="clé=valeur")
+    args = parser.parse_args()
+
+    if args.command == 'call':
+        try:
+            sys.exit(asyncio.run(call(args.socket, args.method, _parse_params(args.params))))
+        except (ConnectionError, FileNotFoundError) as e:
+            print(f"❌ Démon injoignable sur {args.socket}: {e}", file=sys.stderr)
+            sys.exit(2)
+    try:
+        asyncio.run(serve(args.socket, getattr(args, 'simulate', 0)))
+    except RuntimeError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,96 +1,89 @@
+import logging
 import time
+from collections import namedtuple
+from config import SAMPLE_BUFFER_CAPACITY
+from protocol import decode_frame, FRAME_SCHEMA, FRAME_METRICS, FRAME_DISPLAY
+from sample_buffer import SampleBuffer, NAN
+from frame_log import logger
+
+# Échantillon décodé, tel que publié par Wakering.stream()
+Sample = namedtuple('Sample', ['timestamp', 'metric', 'value', 'raw'])
 
 class DataAnalyzer:
-    def __init__(self):
-        self.heartrate_data = []
-        self.o2_data = []
-        self.temperature_data = []
-        self.steps_data = []
-        self.current_bpm = None
-        self.current_o2 = None
-        self.current_temperature = None
-        self.current_steps = None
+    def __init__(self, capacity=SAMPLE_BUFFER_CAPACITY, sink=None):
+        self.sink = sink  # Appelé avec (métrique, timestamp, trame, valeur), ex. SampleStore
+        self.samples = {
+            entry['metric']: SampleBuffer(capacity, frame_size=entry['length'])
+            for entry in FRAME_SCHEMA
+        }
+        self.latest = {metric: None for metric in FRAME_METRICS}
+        self.heartrate_data = self.samples['heartrate']
+        self.o2_data = self.samples['o2']
+        self.temperature_data = self.samples['temperature']
+        self.steps_data = self.samples['steps']
+
+    @property
+    def current_bpm(self):
+        return self.latest['heartrate']
+
+    @property
+    def current_o2(self):
+        return self.latest['o2']
+
+    @property
+    def current_temperature(self):
+        return self.latest['temperature']
+
+    @property
+    def current_steps(self):
+        return self.latest['steps']
 
     def clear_data(self, data_type):
         """Vider les données d'un type spécifique"""
-        if data_type == 'heartrate':
-            self.heartrate_data.clear()
-            self.current_bpm = None
-        elif data_type == 'o2':
-            self.o2_data.clear()
-            self.current_o2 = None
-        elif data_type == 'temperature':
-            self.temperature_data.clear()
-            self.current_temperature = None
-        elif data_type == 'steps':
-            self.steps_data.clear()
-            self.current_steps = None
+        if data_type in self.samples:
+            self.samples[data_type].clear()
+            self.latest[data_type] = None
+
+    def analyze(self, raw_data, hint=None):
+        """Décoder une trame selon FRAME_SCHEMA (protocol.py)
+
+        Retourne (métrique, valeur) ou None si la trame n'est pas reconnue.
+        """
+        decoded = decode_frame(raw_data, hint)
+        if decoded is None:
+            return None
+
+        metric, value = decoded
+        self.latest[metric] = value
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(FRAME_DISPLAY[metric].format(value))
+        return decoded
 
     def analyze_heartrate(self, raw_data):
         """Analyse BPM à l'offset 14 des trames de 17 bytes"""
-        if len(raw_data) == 17:
-            expected_header = [0x00, 0x0B, 0x21, 0x40]
-            if list(raw_data[:4]) == expected_header and raw_data[8] == 0x19 and raw_data[9] == 0x06:
-                bpm_value = raw_data[14]
-                if 40 <= bpm_value <= 200:
-                    self.current_bpm = bpm_value
-                    print(f"💓 ✅ BPM: {bpm_value}")
-                    return bpm_value
-        return None
+        decoded = self.analyze(raw_data, 'heartrate')
+        return decoded[1] if decoded else None
 
     def analyze_o2(self, raw_data):
         """Analyse O2 à l'offset 14 des trames de 17 bytes"""
-        if len(raw_data) == 17:
-            expected_header = [0x00, 0x0B, 0x21, 0x40]
-            if list(raw_data[:4]) == expected_header and raw_data[8] == 0x19 and raw_data[9] == 0x06:
-                o2_value = raw_data[14]
-                if 80 <= o2_value <= 100:
-                    self.current_o2 = o2_value
-                    print(f"🫁 ✅ O2: {o2_value}%")
-                    return o2_value
-        return None
+        decoded = self.analyze(raw_data, 'o2')
+        return decoded[1] if decoded else None
 
     def analyze_temperature(self, raw_data):
         """Analyse température sur 2 bytes (offsets 14-15) des trames de 20 bytes"""
-        if len(raw_data) == 20:
-            expected_header = [0x00, 0x0E, 0x21, 0x40]
-            if list(raw_data[:4]) == expected_header and raw_data[8] == 0x19 and raw_data[9] == 0x06:
-                temp_raw = (raw_data[14] << 8) | raw_data[15]
-                temp_celsius = temp_raw / 10.0
-                if 30.0 <= temp_celsius <= 45.0:
-                    self.current_temperature = temp_celsius
-                    print(f"🌡️ ✅ Température: {temp_celsius:.1f}°C")
-                    return temp_celsius
-        return None
+        decoded = self.analyze(raw_data, 'temperature')
+        return decoded[1] if decoded else None
 
     def analyze_steps(self, raw_data):
         """Analyse des pas aux positions 16-17 des trames de 28 bytes"""
-        if len(raw_data) == 28:
-            expected_header = [0x00, 0x16, 0x21, 0x40]
-            if list(raw_data[:4]) == expected_header:
-                # Position 16 = multiples de 256, Position 17 = reste (0-255)
-                multiples_256 = raw_data[16]  # Nombre de fois qu'on a dépassé 255
-                remainder = raw_data[17]      # Reste (0-255)
-                steps_value = (multiples_256 * 256) + remainder
-                
-                if 0 <= steps_value <= 65535:
-                    self.current_steps = steps_value
-                    print(f"🚶 ✅ Pas: {steps_value}")
-                    return steps_value
-        return None
+        decoded = self.analyze(raw_data, 'steps')
+        return decoded[1] if decoded else None
 
-    def store_data(self, data_type, raw_data):
-        """Stocker les données reçues"""
-        data_entry = {
-            'timestamp': time.time(),
-            'raw': raw_data
-        }
-                
-        if data_type == 'heartrate':
-            self.heartrate_data.append(data_entry)
-        elif data_type == 'o2':
-            self.o2_data.append(data_entry)
-        elif data_type == 'temperature':
-            self.temperature_data.append(data_entry)
-        elif data_type == 'steps':
-            self.steps_data.append(data_entry)
\ No newline at end of file
+    def store_data(self, data_type, raw_data, value=NAN):
+        """Stocker les données reçues (tampon circulaire, mémoire constante)"""
+        timestamp = time.time()
+        if data_type in self.samples:
+            self.samples[data_type].append(timestamp, raw_data, value)
+            if self.sink:
+                self.sink(data_type, timestamp, raw_data, value)
+        return timestamp
@@ -0,0 +1,48 @@
+import json
+import os
+from config import DEVICE_CACHE_FILE
+
+
+def _load_cache(cache_file=DEVICE_CACHE_FILE):
+    """Charger le cache des derniers appareils résolus"""
+    try:
+        if os.path.exists(cache_file):
+            with open(cache_file, 'r') as f:
+                return json.load(f)
+    except Exception as e:
+        print(f"⚠️ Cache appareils illisible: {e}")
+    return {}
+
+
+def _write_cache(cache, cache_file=DEVICE_CACHE_FILE):
+    """Réécrire le cache de manière atomique"""
+    try:
+        tmp_file = cache_file + ".tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp_file, cache_file)
+    except Exception as e:
+        print(f"⚠️ Sauvegarde cache appareils impossible: {e}")
+
+
+def load_cached_device(address, cache_file=DEVICE_CACHE_FILE):
+    """Adresse du dernier appareil résolu pour cette bague (ou None)"""
+    entry = _load_cache(cache_file).get(address.upper())
+    return entry['address'] if entry else None
+
+
+def save_cached_device(address, device, cache_file=DEVICE_CACHE_FILE):
+    """Mémoriser l'appareil résolu pour un démarrage à chaud"""
+    cache = _load_cache(cache_file)
+    cache[address.upper()] = {
+        'address': getattr(device, 'address', device),
+        'name': getattr(device, 'name', None)
+    }
+    _write_cache(cache, cache_file)
+
+
+def forget_cached_device(address, cache_file=DEVICE_CACHE_FILE):
+    """Oublier l'appareil d'une bague (connexion directe en échec)"""
+    cache = _load_cache(cache_file)
+    if cache.pop(address.upper(), None) is not None:
+        _write_cache(cache, cache_file)
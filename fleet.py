@@ -0,0 +1,220 @@
+import asyncio
+import time
+from config import RING_ADDRESSES, FLEET_CONCURRENCY, SCAN_TIMEOUT
+from device_cache import load_cached_device
+from sample_store import SampleStore
+from metrics import start_exporters, stop_exporters
+from frame_log import setup_logging
+from wakering import Wakering
+from transport import BleakTransport
+
+
+# États possibles d'une bague dans la flotte
+STATE_PENDING = 'pending'
+STATE_CONNECTING = 'connecting'
+STATE_AUTHENTICATING = 'authenticating'
+STATE_READY = 'ready'
+STATE_FAILED = 'failed'
+
+
+class RingFleet:
+    def __init__(self, addresses, concurrency=FLEET_CONCURRENCY, store=None, transport=None):
+        self.transport = transport or BleakTransport()
+        self.rings = {address: Wakering(address, store, self.transport) for address in addresses}
+        self.concurrency = max(1, concurrency)
+        self.states = {address: STATE_PENDING for address in addresses}
+        self.errors = {}
+        self.durations = {}
+
+    async def discover(self, addresses, timeout=SCAN_TIMEOUT):
+        """Scan unique partagé, arrêté dès que toutes les bagues sont vues
+
+        Retourne {adresse: appareil} pour les bagues trouvées.
+        """
+        print(f"🔍 Recherche de {len(addresses)} bague(s)...")
+        wanted = {address.upper(): address for address in addresses}
+        found = {}
+        all_found = asyncio.Event()
+
+        def on_detection(device, advertisement_data):
+            address = wanted.get(device.address.upper())
+            if address and address not in found:
+                found[address] = device
+                if len(found) == len(wanted):
+                    all_found.set()
+
+        scanner = self.transport.scanner(on_detection)
+        await scanner.start()
+        try:
+            await asyncio.wait_for(all_found.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            await scanner.stop()
+
+        print(f"📡 {len(found)}/{len(addresses)} bague(s) trouvée(s)")
+        return found
+
+    async def _bring_up(self, address, device, semaphore, direct=False):
+        """Connexion + authentification d'une bague
+
+        direct : device est l'adresse du cache, un échec de connexion
+        remet la bague en attente pour le scan au lieu de l'abandonner.
+        """
+        ring = self.rings[address]
+        async with semaphore:
+            start = time.monotonic()
+            try:
+                self.states[address] = STATE_CONNECTING
+                if direct:
+                    if not await ring.connect_direct(device):
+                        self.states[address] = STATE_PENDING
+                        return False
+                elif not await ring.connect(device):
+                    raise RuntimeError("connexion impossible")
+
+                self.states[address] = STATE_AUTHENTICATING
+                if not await ring.authenticate():
+                    raise RuntimeError("authentification refusée")
+
+                self.states[address] = STATE_READY
+            except Exception as e:
+                self.states[address] = STATE_FAILED
+                self.errors[address] = str(e)
+                print(f"❌ {address}: {e}")
+            finally:
+                self.durations[address] = time.monotonic() - start
+
+        return self.states[address] == STATE_READY
+
+    async def _scan_and_bring_up(self, addresses, semaphore):
+        """Scan partagé puis connexion des bagues trouvées"""
+        if not addresses:
+            return
+
+        devices = await self.discover(addresses)
+        for address in addresses:
+            if address not in devices:
+                self.states[address] = STATE_FAILED
+                self.errors[address] = "bague non trouvée"
+
+        await asyncio.gather(*(
+            self._bring_up(address, device, semaphore)
+            for address, device in devices.items()
+        ))
+
+    async def start(self):
+        """Scan, connexion et authentification de toutes les bagues en parallèle"""
+        start = time.monotonic()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        # Démarrage à chaud: connexion directe aux bagues en cache,
+        # scan uniquement pour les autres
+        cached = {}
+        for address in self.rings if self.transport.cache_devices else ():
+            cached_address = load_cached_device(address)
+            if cached_address:
+                cached[address] = cached_address
+        uncached = [address for address in self.rings if address not in cached]
+
+        await asyncio.gather(
+            *(self._bring_up(address, device, semaphore, direct=True)
+              for address, device in cached.items()),
+            self._scan_and_bring_up(uncached, semaphore)
+        )
+
+        # Cache périmé: rattrapage par un second scan
+        stale = [address for address in cached if self.states[address] == STATE_PENDING]
+        await self._scan_and_bring_up(stale, semaphore)
+
+        print(f"🎉 Flotte prête: {len(self.ready)}/{len(self.rings)} "
+              f"en {time.monotonic() - start:.1f}s")
+        return not self.failed
+
+    def check_links(self):
+        """Bagues prêtes dont le lien est perdu sans reconnexion en cours
+
+        Wakering abandonne sa reconnexion après RECONNECT_ATTEMPTS: la
+        bague passe en échec pour que retry_failed la reprenne.
+        """
+        lost = []
+        for address in self.ready:
+            ring = self.rings[address]
+            connected = ring.client and ring.client.is_connected
+            reconnecting = ring.reconnect_task and not ring.reconnect_task.done()
+            if not connected and not reconnecting:
+                self.states[address] = STATE_FAILED
+                self.errors[address] = "connexion perdue"
+                lost.append(address)
+        return lost
+
+    async def retry_failed(self):
+        """Nouvelle tentative (scan partagé) pour les bagues en échec"""
+        failed = self.failed
+        for address in failed:
+            self.states[address] = STATE_PENDING
+            self.errors.pop(address, None)
+        await self._scan_and_bring_up(failed, asyncio.Semaphore(self.concurrency))
+        return not self.failed
+
+    async def stop(self):
+        """Déconnecter toutes les bagues"""
+        await asyncio.gather(
+            *(ring.disconnect() for ring in self.rings.values()),
+            return_exceptions=True
+        )
+
+    @property
+    def ready(self):
+        """Adresses des bagues connectées et authentifiées"""
+        return [a for a, state in self.states.items() if state == STATE_READY]
+
+    @property
+    def failed(self):
+        """Adresses des bagues en échec"""
+        return [a for a, state in self.states.items() if state == STATE_FAILED]
+
+    def get_status_info(self):
+        """Obtenir l'état détaillé de la flotte"""
+        return {
+            'total': len(self.rings),
+            'ready': len(self.ready),
+            'failed': len(self.failed),
+            'rings': {
+                address: {
+                    'state': self.states[address],
+                    'error': self.errors.get(address),
+                    'duration': self.durations.get(address)
+                }
+                for address in self.rings
+            }
+        }
+
+    def print_status(self):
+        """Afficher l'état de la flotte"""
+        print(f"\n🛰️ === FLOTTE ({len(self.ready)}/{len(self.rings)} prêtes) ===")
+        for address, state in self.states.items():
+            icon = "✅" if state == STATE_READY else "❌" if state == STATE_FAILED else "⏳"
+            duration = self.durations.get(address)
+            timing = f" ({duration:.1f}s)" if duration is not None else ""
+            error = f" - {self.errors[address]}" if address in self.errors else ""
+            print(f"{icon} {address} [{state}]{timing}{error}")
+
+
+async def main():
+    setup_logging()
+    store = SampleStore()
+    store.start()
+    exporters = start_exporters()
+    fleet = RingFleet(RING_ADDRESSES, store=store)
+    try:
+        await fleet.start()
+        fleet.print_status()
+    finally:
+        await fleet.stop()
+        store.close()
+        stop_exporters(exporters)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,66 @@
+import logging
+import time
+from collections import deque
+from config import LOG_LEVEL, FRAME_CAPTURE_SIZE
+
+logger = logging.getLogger('wakering')
+
+DIRECTION_IN = '<'   # Notification reçue
+DIRECTION_OUT = '>'  # Écriture
+
+
+class HexDump:
+    """Hexadécimal paresseux: formaté seulement si le message est émis
+
+    logger.debug("📨 %s", HexDump(data)) ne coûte qu'une allocation
+    quand le niveau DEBUG est désactivé.
+    """
+
+    __slots__ = ('data',)
+
+    def __init__(self, data):
+        self.data = data
+
+    def __str__(self):
+        return self.data.hex(' ').upper()
+
+
+class FrameCapture:
+    """Dernières trames brutes en mémoire, pour le débogage post-mortem
+
+    Un append dans un deque borné par trame, aucun formatage: le
+    hexadécimal n'est produit qu'au moment du dump().
+    """
+
+    def __init__(self, size=FRAME_CAPTURE_SIZE):
+        self.frames = deque(maxlen=size)
+
+    def __len__(self):
+        return len(self.frames)
+
+    def record(self, direction, data):
+        self.frames.append((time.monotonic(), direction, bytes(data)))
+
+    def clear(self):
+        self.frames.clear()
+
+    def dump(self):
+        """Lignes lisibles, de la plus ancienne à la plus récente"""
+        if not self.frames:
+            return []
+        last = self.frames[-1][0]
+        return [
+            f"{timestamp - last:+9.3f}s {direction} {HexDump(data)}"
+            for timestamp, direction, data in self.frames
+        ]
+
+    def log_dump(self, level=logging.ERROR):
+        """Envoyer les trames capturées dans le journal"""
+        if logger.isEnabledFor(level):
+            for line in self.dump():
+                logger.log(level, "🧾 %s", line)
+
+
+def setup_logging(level=LOG_LEVEL):
+    """Journal console au format des messages existants"""
+    logging.basicConfig(format='%(message)s', level=level)
@@ -1,14 +1,24 @@
 import asyncio
 from wakering import Wakering
 from menu import MenuManager
-from config import RING_ADDRESS
+from config import RING_ADDRESS, CAPTURE_FILE
+from sample_store import SampleStore
+from metrics import start_exporters, stop_exporters
+from frame_log import setup_logging
+from capture import CaptureWriter
 
 async def main():
+    setup_logging()
     print("🔧 === WAKERING ===")
     print("🚀 Connexion + Authentification + Menu")
     print("⚠️ Bague allumée et en mode pairing requis\n")
     
-    ring = Wakering(RING_ADDRESS)
+    store = SampleStore()
+    store.start()
+    exporters = start_exporters()
+    ring = Wakering(RING_ADDRESS, store)
+    if CAPTURE_FILE:
+        ring.recorder = CaptureWriter(CAPTURE_FILE)
     menu = MenuManager(ring)
     
     try:
@@ -23,8 +33,7 @@ async def main():
         auth_success = await ring.authenticate()
         
         if not auth_success:
-            confirm = input("❓ Continuer sans auth? (o/N): ").strip().lower()
-            if confirm not in ['o', 'oui', 'y', 'yes']:
+            if not await menu.console.confirm("❓ Continuer sans auth? (o/N): "):
                 return
         
         print("\n🎉 Prêt!")
@@ -33,13 +42,27 @@ async def main():
         # Menu interactif
         await menu.main_menu()
         
-    except KeyboardInterrupt:
+    except (KeyboardInterrupt, EOFError):
+        print("\n⚠️ Interruption")
+    except asyncio.CancelledError:
+        # Ctrl+C: asyncio.run annule la tâche principale. Nettoyer (finally)
+        # puis laisser l'annulation se propager
         print("\n⚠️ Interruption")
+        raise
     except Exception as e:
         print(f"❌ Erreur: {e}")
+        ring.frames.log_dump()
     finally:
+        menu.console.stop()
         await ring.disconnect()
+        store.close()
+        stop_exporters(exporters)
+        if ring.recorder:
+            ring.recorder.close()
         print("✅ Terminé")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass  # Second Ctrl+C pendant la fermeture: déjà signalé
\ No newline at end of file
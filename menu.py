@@ -1,12 +1,30 @@
 import asyncio
-from config import VIBRATIONS
+from config import VIBRATIONS, ADAPTIVE_MEASURE, ALARM_OFFLOAD
 from alarm_manager import AlarmManager
+from alarm_sync import AlarmSync
+from beta_alarm import AlarmManager as RingAlarmManager
+from console import AsyncConsole
 
 
 class MenuManager:
    def __init__(self, ring):
        self.ring = ring
        self.alarm_manager = AlarmManager(ring)
+       self.alarm_sync = None
+       if ALARM_OFFLOAD:
+           # Alarmes reportées dans les emplacements de la bague
+           self.alarm_sync = AlarmSync(self.alarm_manager, RingAlarmManager(ring))
+           self.alarm_manager.sync = self.alarm_sync
+       # Saisie sans bloquer la boucle: les alarmes sonnent pendant qu'on tape
+       self.console = AsyncConsole(status=self.status_line)
+      
+   def status_line(self):
+       """Barre de statut de la console (données en direct)"""
+       status = self.alarm_manager.get_status_info()
+       line = f"🕐 {status['current_time']} | {self.ring.status_line()}"
+       if status['next_alarm']:
+           line += f" | ⏰ {status['next_alarm']}"
+       return line
       
    async def vibration_menu(self):
        """Menu des vibrations"""
@@ -15,7 +33,10 @@ class MenuManager:
            print(f"{key}. {vib['name']}")
        print("0. 🔙 Retour")
       
-       choice = input("\n👉 Choix (0-5): ").strip()
+       try:
+           choice = (await self.console.input("\n👉 Choix (0-5): ")).strip()
+       except EOFError:
+           return
       
        if choice == "0":
            return
@@ -44,32 +65,37 @@ class MenuManager:
            print("4. 📋 Actualiser la liste")
            print("5. 🧪 Créer alarme de test (+1min)")
            print("6. 📳 Test vibration alarme")
+           if self.alarm_sync:
+               print("7. 💍 Synchroniser avec la bague")
            print("0. 🔙 Retour")
           
-           choice = input("\n👉 Choix (0-6): ").strip()
+           try:
+               choice = (await self.console.input("\n👉 Choix (0-7): ")).strip()
+           except EOFError:
+               break
           
            if choice == "0":
                break
            elif choice == "1":
-               self.alarm_manager.create_alarm_interactive()
+               await self.alarm_manager.create_alarm_interactive(self.console)
            elif choice == "2":
                try:
                    if not self.alarm_manager.alarms:
                        print("❌ Aucune alarme à supprimer")
                        continue
-                   alarm_id = int(input("ID de l'alarme à supprimer: "))
+                   alarm_id = int(await self.console.input("ID de l'alarme à supprimer: "))
                    self.alarm_manager.remove_alarm(alarm_id)
-               except (ValueError, KeyboardInterrupt):
+               except (ValueError, EOFError):
                    print("❌ Opération annulée")
            elif choice == "3":
                try:
                    if not self.alarm_manager.alarms:
                        print("❌ Aucune alarme à modifier")
                        continue
-                   alarm_id = int(input("ID de l'alarme à modifier: "))
+                   alarm_id = int(await self.console.input("ID de l'alarme à modifier: "))
                    if not self.alarm_manager.toggle_alarm(alarm_id):
                        print("❌ Alarme introuvable")
-               except (ValueError, KeyboardInterrupt):
+               except (ValueError, EOFError):
                    print("❌ Opération annulée")
            elif choice == "4":
                continue  # Rafraîchit automatiquement
@@ -78,6 +104,9 @@ class MenuManager:
            elif choice == "6":
                print("📳 Test de vibration d'alarme...")
                await self.ring.send_vibration("3")
+           elif choice == "7" and self.alarm_sync:
+               done = await self.alarm_sync.sync()
+               print(f"✅ {done} emplacement(s) mis à jour")
            else:
                print("❌ Option invalide")
           
@@ -87,10 +116,14 @@ class MenuManager:
        """Menu principal"""
        # Démarrer la surveillance des alarmes
        self.alarm_manager.start_monitoring()
+       if self.alarm_sync and self.ring.is_authenticated:
+           self.alarm_sync.request()  # En arrière-plan
+       self.console.show_status()
       
        try:
            while True:
-               self.ring.print_status()
+               if not self.console.live:
+                   self.ring.print_status()
                print("\n🎛️ === MENU ===")
                print("1. 📳 Vibrations")
                print("2. 💓 Fréquence cardiaque")
@@ -99,27 +132,32 @@ class MenuManager:
                print("5. 🚶 Nombre de pas")
                print("6. ⏰ Alarmes")
                print("7. 🔓 Unbind")
+               print("8. 🩺 Bilan complet (mesures simultanées)")
                print("0. 🚪 Quitter")
               
-               choice = input("\n👉 Choix (0-7): ").strip()
+               try:
+                   choice = (await self.console.input("\n👉 Choix (0-8): ")).strip()
+               except EOFError:
+                   choice = "0"  # Fin de l'entrée standard
               
                if choice == "1":
                    await self.vibration_menu()
                elif choice == "2":
-                   await self.ring.measure('heartrate')
+                   await self.ring.measure('heartrate', adaptive=ADAPTIVE_MEASURE)
                elif choice == "3":
-                   await self.ring.measure('o2')
+                   await self.ring.measure('o2', adaptive=ADAPTIVE_MEASURE)
                elif choice == "4":
-                   await self.ring.measure('temperature')
+                   await self.ring.measure('temperature', adaptive=ADAPTIVE_MEASURE)
                elif choice == "5":
                    await self.ring.measure('steps')
                elif choice == "6":
                    await self.alarm_menu()
                elif choice == "7":
-                   confirm = input("⚠️ Confirmer unbind? (o/N): ").strip().lower()
-                   if confirm in ['o', 'oui', 'y', 'yes']:
+                   if await self.console.confirm("⚠️ Confirmer unbind? (o/N): "):
                        if await self.ring.unbind():
                            break
+               elif choice == "8":
+                   await self.ring.measure_many(['heartrate', 'o2', 'temperature', 'steps'], adaptive=ADAPTIVE_MEASURE)
                elif choice == "0":
                    print("👋 Au revoir!")
                    break
@@ -130,4 +168,6 @@ class MenuManager:
       
        finally:
            # Arrêter la surveillance des alarmes lors de la sortie
-           self.alarm_manager.stop_monitoring()
\ No newline at end of file
+           self.alarm_manager.stop_monitoring()
+           self.console.hide_status()
+           await self.alarm_manager.close()
\ No newline at end of file
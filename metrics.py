@@ -0,0 +1,295 @@
+import asyncio
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import METRICS_HTTP_PORT, METRICS_FILE, METRICS_FILE_INTERVAL, METRICS_RATE_WINDOW
+
+# Bornes des histogrammes (secondes)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+AUTH_BUCKETS = (0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0)
+LAG_BUCKETS = (0.01, 0.1, 0.5, 1.0, 2.0, 5.0, 30.0, 60.0)
+
+
+class Counter:
+    """Compteur monotone"""
+
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class RateWindow:
+    """Débit sur une fenêtre glissante fixe, par seaux d'une seconde
+
+    Seul add() écrit: la lecture ne déplace pas la fenêtre, plusieurs
+    lecteurs concurrents voient donc la même valeur.
+    """
+
+    __slots__ = ('window', 'seconds', 'counts')
+
+    def __init__(self, window):
+        self.window = window
+        self.seconds = [-1] * window
+        self.counts = [0] * window
+
+    def add(self, now, amount=1):
+        second = int(now)
+        slot = second % self.window
+        if self.seconds[slot] != second:
+            self.seconds[slot] = second
+            self.counts[slot] = 0
+        self.counts[slot] += amount
+
+    def rate(self, now, span=None):
+        """Événements/s sur les dernières secondes complètes (span <= window)"""
+        second = int(now)
+        span = min(self.window, span or self.window)
+        total = sum(count for stamp, count in zip(self.seconds, self.counts)
+                    if second - span <= stamp < second)
+        return total / span
+
+
+class Histogram:
+    """Histogramme à bornes fixes (cumulé seulement à l'export)"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Dernière case: +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'buckets': dict(zip(self.buckets + (float('inf'),), self.counts))
+        }
+
+
+class RingMetrics:
+    """Compteurs et histogrammes d'une bague
+
+    L'enregistrement se limite à des incréments d'entiers, assez peu
+    coûteux pour rester actif en permanence.
+    """
+
+    def __init__(self, ring):
+        self.ring = ring
+        self.notifications = Counter()
+        self.bytes_in = Counter()
+        self.bytes_out = Counter()
+        self.writes = Counter()
+        self.write_errors = Counter()
+        self.write_latency = Histogram(LATENCY_BUCKETS)
+        self.queue_wait = Histogram(LATENCY_BUCKETS)
+        self.commands_dropped = Counter()
+        self.commands_coalesced = Counter()
+        self.auth_duration = Histogram(AUTH_BUCKETS)
+        self.alarm_lag = Histogram(LAG_BUCKETS)
+        self.decode_hits = {}  # {métrique: Counter}
+        self.decode_misses = {}  # {(longueur, header): Counter}
+        self.notification_window = RateWindow(METRICS_RATE_WINDOW)
+        self.created = time.monotonic()
+
+    def decode_hit(self, metric):
+        counter = self.decode_hits.get(metric)
+        if counter is None:
+            counter = self.decode_hits[metric] = Counter()
+        counter.value += 1
+
+    def decode_miss(self, frame_type):
+        counter = self.decode_misses.get(frame_type)
+        if counter is None:
+            counter = self.decode_misses[frame_type] = Counter()
+        counter.value += 1
+
+    def notification(self):
+        self.notifications.value += 1
+        self.notification_window.add(time.monotonic())
+
+    def notification_rate(self):
+        """Notifications/s sur la fenêtre glissante (sans effet de bord)
+
+        Pour Prometheus, préférer rate(wakering_notifications_total[...]).
+        """
+        now = time.monotonic()
+        return self.notification_window.rate(now, max(1, int(now - self.created)))
+
+    def snapshot(self):
+        """Vue dict de toutes les mesures (API pull)"""
+        return {
+            'ring': self.ring,
+            'uptime': time.monotonic() - self.created,
+            'notifications': self.notifications.value,
+            'notifications_per_second': self.notification_rate(),
+            'bytes_in': self.bytes_in.value,
+            'bytes_out': self.bytes_out.value,
+            'writes': self.writes.value,
+            'write_errors': self.write_errors.value,
+            'write_latency': self.write_latency.snapshot(),
+            'queue_wait': self.queue_wait.snapshot(),
+            'commands_dropped': self.commands_dropped.value,
+            'commands_coalesced': self.commands_coalesced.value,
+            'auth_duration': self.auth_duration.snapshot(),
+            'alarm_lag': self.alarm_lag.snapshot(),
+            'decode_hits': {metric: c.value for metric, c in self.decode_hits.items()},
+            'decode_misses': {_frame_label(key): c.value for key, c in self.decode_misses.items()}
+        }
+
+
+REGISTRY = {}  # {adresse: RingMetrics}
+
+
+def ring_metrics(ring):
+    """RingMetrics d'une bague (créé au premier appel)"""
+    metrics = REGISTRY.get(ring)
+    if metrics is None:
+        metrics = REGISTRY[ring] = RingMetrics(ring)
+    return metrics
+
+
+def snapshot(registry=REGISTRY):
+    """Mesures de toutes les bagues"""
+    return {ring: metrics.snapshot() for ring, metrics in registry.items()}
+
+
+def _frame_label(frame_type):
+    length, header = frame_type
+    return f"{length}:{header:08X}"
+
+
+def _labels(**labels):
+    return ','.join(f'{key}="{value}"' for key, value in labels.items())
+
+
+def _render_histogram(lines, name, histogram, ring):
+    cumulative = 0
+    for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+        cumulative += count
+        le = '+Inf' if bound == float('inf') else repr(bound)
+        lines.append(f'{name}_bucket{{{_labels(ring=ring, le=le)}}} {cumulative}')
+    lines.append(f'{name}_sum{{{_labels(ring=ring)}}} {histogram.sum}')
+    lines.append(f'{name}_count{{{_labels(ring=ring)}}} {histogram.count}')
+
+
+def render_prometheus(registry=REGISTRY):
+    """Export au format texte Prometheus"""
+    counters = [
+        ('wakering_notifications_total', 'Notifications reçues', 'notifications'),
+        ('wakering_bytes_in_total', 'Octets reçus', 'bytes_in'),
+        ('wakering_bytes_out_total', 'Octets écrits', 'bytes_out'),
+        ('wakering_writes_total', 'Écritures GATT', 'writes'),
+        ('wakering_write_errors_total', "Écritures en échec", 'write_errors'),
+        ('wakering_commands_dropped_total', "Commandes abandonnées (échéance, annulation)", 'commands_dropped'),
+        ('wakering_commands_coalesced_total', "Commandes regroupées avec un doublon en attente", 'commands_coalesced'),
+    ]
+    histograms = [
+        ('wakering_write_latency_seconds', "Latence de write_data (acquittement inclus)", 'write_latency'),
+        ('wakering_queue_wait_seconds', "Attente dans la file de commandes", 'queue_wait'),
+        ('wakering_auth_duration_seconds', "Durée de l'authentification", 'auth_duration'),
+        ('wakering_alarm_trigger_lag_seconds', "Retard de déclenchement des alarmes", 'alarm_lag'),
+    ]
+
+    lines = []
+    for name, help_text, attribute in counters:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for ring, metrics in list(registry.items()):
+            lines.append(f'{name}{{{_labels(ring=ring)}}} {getattr(metrics, attribute).value}')
+
+    for name, help_text, attribute in histograms:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for ring, metrics in list(registry.items()):
+            _render_histogram(lines, name, getattr(metrics, attribute), ring)
+
+    lines.append('# HELP wakering_decode_hits_total Trames décodées par métrique')
+    lines.append('# TYPE wakering_decode_hits_total counter')
+    for ring, metrics in list(registry.items()):
+        for metric, counter in list(metrics.decode_hits.items()):
+            lines.append(f'wakering_decode_hits_total{{{_labels(ring=ring, metric=metric)}}} {counter.value}')
+
+    lines.append('# HELP wakering_decode_misses_total Trames non décodées par type (longueur:header)')
+    lines.append('# TYPE wakering_decode_misses_total counter')
+    for ring, metrics in list(registry.items()):
+        for frame_type, counter in list(metrics.decode_misses.items()):
+            labels = _labels(ring=ring, frame=_frame_label(frame_type))
+            lines.append(f'wakering_decode_misses_total{{{labels}}} {counter.value}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def write_prometheus(path, registry=REGISTRY):
+    """Écrire l'export dans un fichier (collecteur textfile), remplacement atomique"""
+    _write_text(path, render_prometheus(registry))
+
+
+async def export_periodically(path, interval, registry=REGISTRY):
+    """Tâche asyncio: réécrire le fichier d'export toutes les interval secondes"""
+    loop = asyncio.get_running_loop()
+    while True:
+        # Rendu dans la boucle (lecture cohérente), écriture disque hors boucle
+        text = render_prometheus(registry)
+        await loop.run_in_executor(None, _write_text, path, text)
+        await asyncio.sleep(interval)
+
+
+def _write_text(path, text):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def start_http_server(port, host='127.0.0.1', registry=REGISTRY):
+    """Servir /metrics en HTTP local dans un thread dédié"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = render_prometheus(registry).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True)
+    thread.start()
+    print(f"📈 Métriques sur http://{host}:{port}/metrics")
+    return server
+
+
+def start_exporters(http_port=METRICS_HTTP_PORT, path=METRICS_FILE, interval=METRICS_FILE_INTERVAL):
+    """Démarrer les exports configurés; retourne (serveur HTTP, tâche fichier)"""
+    server = start_http_server(http_port) if http_port else None
+    task = asyncio.ensure_future(export_periodically(path, interval)) if path else None
+    return server, task
+
+
+def stop_exporters(exporters):
+    """Arrêter les exports démarrés par start_exporters"""
+    server, task = exporters
+    if server:
+        server.shutdown()
+    if task:
+        task.cancel()
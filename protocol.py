@@ -0,0 +1,312 @@
+import re
+import struct
+from datetime import datetime
+from config import COMMANDS, VIBRATIONS, AUTH_PACKETS, COMMAND_CACHE_SIZE
+
+# Trame: 00 <longueur> 83 40 <flag> <transaction> <payload...> <checksum 2 bytes>
+TRANSACTION_OFFSET = 5
+PAYLOAD_OFFSET = 6
+FRAME_MAGIC = b'\x83\x40'
+
+U8 = struct.Struct('B')
+U16_BE = struct.Struct('>H')
+U16_LE = struct.Struct('<H')
+ALARM_SETTINGS = struct.Struct('BBBB')  # masque jours, heure, minute, état
+
+
+def to_bytes(data):
+    """Convertir une commande (hex espacé, bytes ou bytearray) en bytes"""
+    if isinstance(data, str):
+        return bytes.fromhex(data.replace(' ', ''))
+    return bytes(data)
+
+
+def _crc16_table(poly=0x1021):
+    table = []
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            crc = (crc << 1) ^ poly if crc & 0x8000 else crc << 1
+        table.append(crc & 0xFFFF)
+    return tuple(table)
+
+
+CRC16_TABLE = _crc16_table()
+
+
+def crc16(data, crc=0xFFFF, table=CRC16_TABLE):
+    """CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF): une lecture de table par octet"""
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFF) ^ table[(crc >> 8) ^ byte]
+    return crc
+
+
+def checksum(packet):
+    """Checksum d'une trame: CRC-16 du payload, big endian"""
+    return U16_BE.pack(crc16(memoryview(packet)[PAYLOAD_OFFSET:]))
+
+
+def additive_checksum(packet):
+    """Checksum des paquets d'alarme: somme des octets de toute la trame, 16 bits little endian"""
+    return U16_LE.pack(sum(packet) & 0xFFFF)
+
+
+# Checksum d'un gabarit (clé 'checksum', 'crc16' par défaut):
+# fonction(trame sans checksum) -> 2 octets
+FRAME_CHECKSUMS = {'crc16': checksum, 'additive': additive_checksum}
+
+
+def encode_date(moment=None):
+    """Date embarquée dans les commandes: aa mm jj hh mm ss"""
+    moment = moment or datetime.now()
+    return bytes((moment.year - 2000, moment.month, moment.day, moment.hour, moment.minute, moment.second))
+
+
+# Champs variables des payloads: {nom} ou {nom:largeur en octets}
+FIELD_PATTERN = re.compile(r'\{(\w+)(?::(\d+))?\}')
+FIELD_WIDTHS = {'date': 6}
+
+
+def compile_template(payload):
+    """Découper un payload en [bytes fixes | (champ, largeur)]"""
+    segments = []
+    position = 0
+    for match in FIELD_PATTERN.finditer(payload):
+        if payload[position:match.start()].strip():
+            segments.append(to_bytes(payload[position:match.start()]))
+        name = match.group(1)
+        width = int(match.group(2)) if match.group(2) else FIELD_WIDTHS.get(name, 1)
+        segments.append((name, width))
+        position = match.end()
+    if payload[position:].strip():
+        segments.append(to_bytes(payload[position:]))
+    return segments
+
+
+def _field(value, width):
+    if isinstance(value, int):
+        return value.to_bytes(width, 'big')
+    return bytes(value[:width]).ljust(width, b'\x00')
+
+
+class CommandFactory:
+    """Commandes rendues depuis leurs gabarits
+
+    Un gabarit donne le flag, la transaction par défaut et le payload
+    avec ses champs variables; l'en-tête, la longueur et le checksum
+    (CRC-16 par table, ou somme additive des paquets d'alarme) sont
+    calculés. Les paquets rendus sont gardés en
+    cache par (nom, transaction, valeurs des champs): une commande
+    répétée ne coûte qu'une recherche dans un dict. {date} vaut la date
+    courante si elle n'est pas fournie.
+    """
+
+    def __init__(self, templates, cache_size=COMMAND_CACHE_SIZE):
+        self.templates = {}
+        self.cache = {}
+        self.cache_size = cache_size
+        for name, template in templates.items():
+            self.register(name, template['payload'], template.get('flag', 0), template.get('transaction', 0),
+                          template.get('checksum', 'crc16'))
+
+    def register(self, name, payload, flag=0, transaction=0, checksum='crc16'):
+        segments = compile_template(payload)
+        fields = tuple(segment[0] for segment in segments if isinstance(segment, tuple))
+        self.templates[name] = (flag, transaction, segments, fields, FRAME_CHECKSUMS[checksum])
+
+    def __contains__(self, name):
+        return name in self.templates
+
+    def render(self, name, transaction=None, **values):
+        """Paquet complet de la commande name (bytes)"""
+        flag, default_transaction, segments, fields, frame_checksum = self.templates[name]
+        if 'date' in fields and values.get('date') is None:
+            values['date'] = encode_date()
+        key = (name, transaction, *(values.get(field) for field in fields))
+        packet = self.cache.get(key)
+        if packet is None:
+            payload = b''.join(
+                segment if isinstance(segment, bytes) else _field(values[segment[0]], segment[1])
+                for segment in segments
+            )
+            header = U16_BE.pack(len(payload) + 2) + FRAME_MAGIC + bytes((
+                flag, (default_transaction if transaction is None else transaction) & 0xFF
+            ))
+            packet = header + payload
+            packet += frame_checksum(packet)
+            if len(self.cache) >= self.cache_size:
+                del self.cache[next(iter(self.cache))]  # Le plus ancien
+            self.cache[key] = packet
+        return packet
+
+
+# Paquets d'alarme (beta_alarm), relevés dans l'app officielle. Leur
+# checksum est la somme additive de toute la trame, pas le CRC-16.
+# La date s'arrête à la minute (aa mm jj hh mm), l'octet suivant est fixe.
+ALARM_CONFIG_LENGTH = 55
+ALARM_NAME_OFFSET = 48
+ALARM_CHECKSUM_OFFSET = 53
+ALARM_STAGE_OFFSET = 13  # Paquets courts: 0x21 initialisation, 0x38 finalisation
+ALARM_TEMPLATES = {
+    # 34 <commande: 34 création, 35 suppression> <date> 38 01 05 <réglages> ... <nom UTF-16>
+    'alarm_config': {'payload': "34 {command} {date:5} 38 01 05 {settings:4}" + " 00" * 28 + " {label:5}",
+                     'checksum': 'additive'},
+    'alarm_init': {'payload': "34 35 {date:5} 21", 'checksum': 'additive'},
+    'alarm_final': {'payload': "34 35 {date:5} 38", 'checksum': 'additive'},
+    'alarm_closure': {'payload': "81 17", 'checksum': 'additive'},
+}
+
+COMMAND_FACTORY = CommandFactory({
+    **COMMANDS,
+    **{f'vibration_{key}': vib for key, vib in VIBRATIONS.items()},
+    **{f'auth_{index}': {'payload': payload, 'transaction': index} for index, payload in enumerate(AUTH_PACKETS)},
+    **ALARM_TEMPLATES,
+})
+
+
+def auth_sequence(date=None):
+    """Paquets d'authentification, tous à la même date"""
+    date = date or encode_date()
+    return [COMMAND_FACTORY.render(f'auth_{index}', date=date) for index in range(len(AUTH_PACKETS))]
+
+
+# Commandes rendues une fois au chargement (date du chargement pour {date}):
+# opcodes et transactions de référence. Les envois passent par COMMAND_FACTORY.
+COMMAND_PACKETS = {name: COMMAND_FACTORY.render(name) for name in COMMANDS}
+VIBRATION_PACKETS = {key: COMMAND_FACTORY.render(f'vibration_{key}') for key in VIBRATIONS}
+AUTH_SEQUENCE = auth_sequence()
+
+
+def with_transaction(packet, transaction):
+    """Copie d'une commande avec un autre octet de transaction
+
+    Le CRC-16 ne couvre que le payload (offset 6+), il reste valide. Pas
+    pour les paquets d'alarme, dont la somme couvre toute la trame.
+    """
+    patched = bytearray(packet)
+    U8.pack_into(patched, TRANSACTION_OFFSET, transaction & 0xFF)
+    return bytes(patched)
+
+
+def build_alarm_config(transaction, day_mask, hour, minute, enabled, name_utf16, command=0x34, date=None):
+    """Paquet de configuration d'alarme (55 bytes), à la date courante par défaut"""
+    return COMMAND_FACTORY.render(
+        'alarm_config', transaction, command=command, date=date,
+        settings=ALARM_SETTINGS.pack(day_mask, hour, minute, 0x01 if enabled else 0x00),
+        label=bytes(name_utf16)
+    )
+
+
+# Trames de mesure reçues en notification. Ajouter une métrique = ajouter une entrée.
+#   length  : taille de la trame
+#   header  : 4 premiers octets (big endian)
+#   match   : octets fixes supplémentaires {offset: valeur}
+#   offset / format : position et format struct de la valeur
+#   divisor : la valeur brute est divisée par ce facteur
+#   range   : bornes de validité (incluses)
+#   display : affichage de la valeur décodée
+FRAME_SCHEMA = [
+    {'metric': 'heartrate', 'length': 17, 'header': 0x000B2140, 'match': {8: 0x19, 9: 0x06},
+     'offset': 14, 'format': 'B', 'divisor': 1, 'range': (40, 200),
+     'display': "💓 ✅ BPM: {}"},
+    {'metric': 'o2', 'length': 17, 'header': 0x000B2140, 'match': {8: 0x19, 9: 0x06},
+     'offset': 14, 'format': 'B', 'divisor': 1, 'range': (80, 100),
+     'display': "🫁 ✅ O2: {}%"},
+    {'metric': 'temperature', 'length': 20, 'header': 0x000E2140, 'match': {8: 0x19, 9: 0x06},
+     'offset': 14, 'format': '>H', 'divisor': 10.0, 'range': (30.0, 45.0),
+     'display': "🌡️ ✅ Température: {:.1f}°C"},
+    # Position 16 = multiples de 256, position 17 = reste (0-255)
+    {'metric': 'steps', 'length': 28, 'header': 0x00162140, 'match': {},
+     'offset': 16, 'format': '>H', 'divisor': 1, 'range': (0, 65535),
+     'display': "🚶 ✅ Pas: {}"},
+]
+
+FRAME_HEADER = struct.Struct('>I')
+
+
+def compile_frame_schema(schema):
+    """Compiler le schéma en table {(longueur, header): [décodeurs]}"""
+    decoders = {}
+    for entry in schema:
+        decoder = (
+            entry['metric'],
+            struct.Struct(entry['format']),
+            entry['offset'],
+            tuple(entry['match'].items()),
+            entry['divisor'],
+            entry['range'][0],
+            entry['range'][1],
+        )
+        decoders.setdefault((entry['length'], entry['header']), []).append(decoder)
+    return decoders
+
+
+FRAME_DECODERS = compile_frame_schema(FRAME_SCHEMA)
+FRAME_METRICS = [entry['metric'] for entry in FRAME_SCHEMA]
+FRAME_DISPLAY = {entry['metric']: entry['display'] for entry in FRAME_SCHEMA}
+
+# Les trames d'une mesure reprennent l'octet de transaction de sa commande de démarrage
+MEASUREMENT_TRANSACTIONS = {
+    COMMAND_PACKETS[metric][TRANSACTION_OFFSET]: metric for metric in FRAME_METRICS
+}
+
+# Métriques de même disposition de trame (heartrate / o2): seul l'octet de
+# transaction les distingue. {métrique: autres métriques de même disposition}
+SHARED_LAYOUTS = {
+    metric: frozenset(other for other, _, _, _, _, _, _ in candidates if other != metric)
+    for candidates in FRAME_DECODERS.values() if len(candidates) > 1
+    for metric, _, _, _, _, _, _ in candidates
+}
+
+
+def decode_frame(data, hint=None, decoders=FRAME_DECODERS):
+    """Décoder une trame en un seul passage
+
+    Retourne (métrique, valeur) ou None. hint départage les métriques
+    qui partagent la même disposition (heartrate / o2).
+    """
+    length = len(data)
+    if length < 4:
+        return None
+
+    view = memoryview(data)
+    candidates = decoders.get((length, FRAME_HEADER.unpack_from(view)[0]))
+    if not candidates:
+        return None
+
+    for metric, value_struct, offset, match, divisor, low, high in candidates:
+        if hint is not None and metric != hint:
+            continue
+        for position, expected in match:
+            if view[position] != expected:
+                break
+        else:
+            value = value_struct.unpack_from(view, offset)[0]
+            if divisor != 1:
+                value = value / divisor
+            if low <= value <= high:
+                return metric, value
+    return None
+
+
+def encode_frame(metric, value, transaction=None, schema=FRAME_SCHEMA):
+    """Trame de mesure portant value (inverse de decode_frame)
+
+    Utilisé par le simulateur et les bancs d'essai. transaction vaut par
+    défaut l'octet de la commande de démarrage de la mesure.
+    """
+    for entry in schema:
+        if entry['metric'] == metric:
+            break
+    else:
+        raise ValueError(f"Métrique inconnue: {metric}")
+
+    frame = bytearray(entry['length'])
+    FRAME_HEADER.pack_into(frame, 0, entry['header'])
+    for position, expected in entry['match'].items():
+        frame[position] = expected
+    struct.pack_into(entry['format'], frame, entry['offset'], round(value * entry['divisor']))
+    if transaction is None:
+        transaction = COMMAND_PACKETS[metric][TRANSACTION_OFFSET]
+    U8.pack_into(frame, TRANSACTION_OFFSET, transaction)
+    return bytes(frame)
@@ -0,0 +1,80 @@
+from array import array
+
+NAN = float('nan')
+
+
+class SampleBuffer:
+    """Tampon circulaire de capacité fixe pour les trames d'une métrique
+
+    Horodatages et valeurs décodées dans des array('d'), trames brutes
+    copiées dans une zone contiguë de capacity × frame_size octets.
+    Ajout et éviction en O(1), mémoire allouée une seule fois.
+    """
+
+    def __init__(self, capacity, frame_size=32):
+        self.capacity = capacity
+        self.frame_size = frame_size
+        self.timestamps = array('d', bytes(8 * capacity))
+        self.values = array('d', [NAN]) * capacity
+        self.lengths = array('H', bytes(2 * capacity))
+        self.raw = bytearray(capacity * frame_size)
+        self.start = 0  # Index du plus ancien échantillon
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, timestamp, raw_data, value=NAN):
+        """Ajouter un échantillon, en écrasant le plus ancien si plein"""
+        if self.count < self.capacity:
+            index = (self.start + self.count) % self.capacity
+            self.count += 1
+        else:
+            index = self.start
+            self.start = (self.start + 1) % self.capacity
+
+        length = min(len(raw_data), self.frame_size)
+        offset = index * self.frame_size
+        self.raw[offset:offset + length] = raw_data[:length]
+        self.timestamps[index] = timestamp
+        self.values[index] = value
+        self.lengths[index] = length
+        return index
+
+    def clear(self):
+        """Vider le tampon (sans réallocation)"""
+        self.start = 0
+        self.count = 0
+
+    def _index(self, position):
+        return (self.start + position) % self.capacity
+
+    def frame(self, position):
+        """Trame brute de l'échantillon (0 = le plus ancien)"""
+        index = self._index(position)
+        offset = index * self.frame_size
+        return bytes(self.raw[offset:offset + self.lengths[index]])
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += self.count
+        if not 0 <= position < self.count:
+            raise IndexError("index hors du tampon")
+        index = self._index(position)
+        return {
+            'timestamp': self.timestamps[index],
+            'raw': self.frame(position),
+            'value': self.values[index]
+        }
+
+    def __iter__(self):
+        for position in range(self.count):
+            yield self[position]
+
+    def ordered(self, column):
+        """Copie chronologique d'une colonne (timestamps, values, lengths)"""
+        data = getattr(self, column)
+        end = self.start + self.count
+        if end <= self.capacity:
+            return data[self.start:end]
+        return data[self.start:] + data[:end - self.capacity]
@@ -0,0 +1,154 @@
+import pathlib
+import queue
+import sqlite3
+import threading
+from config import (
+    SAMPLE_DB_FILE, SAMPLE_STORE_BATCH, SAMPLE_STORE_FLUSH_INTERVAL, SAMPLE_STORE_QUEUE_SIZE
+)
+
+_STOP = object()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    ring TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    value REAL,
+    raw BLOB
+);
+CREATE INDEX IF NOT EXISTS samples_ring_metric_time ON samples (ring, metric, timestamp);
+"""
+
+
+class SampleStore:
+    """Historique des échantillons sur disque (SQLite en mode WAL)
+
+    put() ne fait qu'empiler dans une file mémoire: l'écriture sur disque
+    se fait par lots dans un thread dédié, la boucle BLE ne bloque jamais.
+    """
+
+    def __init__(self, path=SAMPLE_DB_FILE, batch_size=SAMPLE_STORE_BATCH,
+                 flush_interval=SAMPLE_STORE_FLUSH_INTERVAL, queue_size=SAMPLE_STORE_QUEUE_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.thread = None
+        self.reader = None  # Connexion de lecture (lecture seule), ouverte une fois
+        self.reader_lock = threading.Lock()  # query() peut venir de plusieurs threads
+        self.dropped = 0  # Échantillons perdus (file pleine)
+        self.written = 0
+
+    def start(self):
+        """Démarrer le thread d'écriture"""
+        if self.thread and self.thread.is_alive():
+            return
+        # Créer le schéma avant toute requête de lecture
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+        self.thread = threading.Thread(target=self._run, name="sample-store", daemon=True)
+        self.thread.start()
+
+    def close(self):
+        """Vider la file puis arrêter le thread d'écriture"""
+        if self.thread and self.thread.is_alive():
+            self.queue.put(_STOP)
+            self.thread.join()
+        with self.reader_lock:
+            if self.reader:
+                self.reader.close()
+                self.reader = None
+
+    def put(self, ring, metric, timestamp, raw, value=None):
+        """Empiler un échantillon (non bloquant)"""
+        if value != value:  # NaN: trame non décodée
+            value = None
+        try:
+            self.queue.put_nowait((ring, metric, timestamp, value, bytes(raw)))
+        except queue.Full:
+            self.dropped += 1
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _run(self):
+        """Boucle du thread: regrouper les échantillons et écrire par lots"""
+        conn = self._connect()
+        running = True
+        try:
+            while running:
+                try:
+                    item = self.queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    continue
+
+                batch = []
+                while True:
+                    if item is _STOP:
+                        running = False
+                        break
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    try:
+                        item = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+
+                if batch:
+                    try:
+                        with conn:
+                            conn.executemany(
+                                "INSERT INTO samples (ring, metric, timestamp, value, raw) VALUES (?, ?, ?, ?, ?)",
+                                batch
+                            )
+                        self.written += len(batch)
+                    except sqlite3.Error as e:
+                        print(f"❌ Erreur écriture historique: {e}")
+        finally:
+            conn.close()
+
+    def query(self, ring, metric, start=None, end=None, limit=None):
+        """Échantillons d'une bague et d'une métrique, par ordre chronologique
+
+        Retourne une liste de (timestamp, value, raw). Lecture synchrone:
+        depuis la boucle asyncio, passer par run_in_executor.
+        """
+        sql = "SELECT timestamp, value, raw FROM samples WHERE ring = ? AND metric = ?"
+        params = [ring, metric]
+        if start is not None:
+            sql += " AND timestamp >= ?"
+            params.append(start)
+        if end is not None:
+            sql += " AND timestamp < ?"
+            params.append(end)
+        sql += " ORDER BY timestamp"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self.reader_lock:
+            try:
+                if self.reader is None:
+                    uri = pathlib.Path(self.path).absolute().as_uri() + "?mode=ro"
+                    self.reader = sqlite3.connect(uri, uri=True, check_same_thread=False)
+                return self.reader.execute(sql, params).fetchall()
+            except sqlite3.OperationalError:
+                # Base ou table pas encore créée (start() pas appelé): aucun échantillon
+                if self.reader is None:
+                    return []
+                if not self._has_schema():
+                    self.reader.close()
+                    self.reader = None
+                    return []
+                raise
+
+    def _has_schema(self):
+        return self.reader.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'samples'").fetchone() is not None
@@ -0,0 +1,91 @@
+import asyncio
+from config import STREAM_QUEUE_SIZE, STREAM_OVERFLOW
+
+OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest')
+
+
+class SampleStream:
+    """Itérateur asynchrone des échantillons décodés d'une métrique
+
+    async with ring.stream('heartrate') as samples:
+        async for sample in samples:
+            ...
+
+    La mesure est lancée à la première lecture si elle ne tourne pas déjà,
+    et arrêtée (commande stop) à la fermeture ou à l'annulation.
+    """
+
+    def __init__(self, ring, metric, maxsize=STREAM_QUEUE_SIZE, overflow=STREAM_OVERFLOW):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Politique de débordement inconnue: {overflow}")
+        self.ring = ring
+        self.metric = metric
+        self.overflow = overflow
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+        self.started = False  # Mesure lancée par ce flux (à arrêter en sortie)
+        self.subscribed = False
+        self.closed = False
+
+    def push(self, sample):
+        """Appelé par notification_handler pour chaque échantillon décodé"""
+        if self.queue.full():
+            self.dropped += 1
+            if self.overflow == 'drop_newest':
+                return
+            self.queue.get_nowait()
+        self.queue.put_nowait(sample)
+
+    async def get(self, timeout=None):
+        """Prochain échantillon, ou None après timeout secondes sans échantillon
+
+        asyncio.wait plutôt que wait_for: un échantillon arrivé au même
+        tour que l'annulation du lecteur ne l'efface pas.
+        """
+        if timeout is None:
+            return await self.queue.get()
+        if not self.queue.empty():
+            return self.queue.get_nowait()
+        getter = asyncio.ensure_future(self.queue.get())
+        try:
+            await asyncio.wait((getter,), timeout=timeout)
+        finally:
+            if not getter.done():
+                getter.cancel()  # L'échantillon éventuel reste dans la file
+        return getter.result() if getter.done() else None
+
+    async def start(self):
+        """S'abonner et lancer la mesure si nécessaire"""
+        if self.subscribed or self.closed:
+            return
+        self.subscribed = True
+        self.started = await self.ring.subscribe(self)
+
+    async def aclose(self):
+        """Se désabonner et arrêter la mesure lancée par ce flux"""
+        if self.closed:
+            return
+        self.closed = True
+        if self.subscribed:
+            await self.ring.unsubscribe(self, stop=self.started)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.closed:
+            raise StopAsyncIteration
+        await self.start()
+        try:
+            return await self.queue.get()
+        except asyncio.CancelledError:
+            # Annulation du consommateur: arrêter la mesure en arrière-plan
+            asyncio.ensure_future(self.aclose())
+            raise
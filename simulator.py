@@ -0,0 +1,370 @@
+import asyncio
+import random
+import time
+from config import (
+    RING_ADDRESS, NOTIFY_CHAR_UUID, RING_ALARM_SLOTS, SIM_NOTIFY_INTERVAL,
+    SIM_LATENCY, SIM_JITTER, SIM_DROP_RATE, SIM_MEASURE_DURATION
+)
+from protocol import (
+    COMMAND_PACKETS, VIBRATION_PACKETS, AUTH_SEQUENCE, TRANSACTION_OFFSET,
+    PAYLOAD_OFFSET, ALARM_SETTINGS, ALARM_CONFIG_LENGTH, ALARM_NAME_OFFSET,
+    ALARM_CHECKSUM_OFFSET, ALARM_STAGE_OFFSET, FRAME_METRICS, COMMAND_FACTORY,
+    checksum, additive_checksum, encode_frame
+)
+
+# Une commande se reconnaît à ses deux premiers octets de payload
+MEASURE_OPCODE = COMMAND_PACKETS['heartrate'][PAYLOAD_OFFSET:PAYLOAD_OFFSET + 2]
+STEPS_OPCODE = COMMAND_PACKETS['steps'][PAYLOAD_OFFSET:PAYLOAD_OFFSET + 2]
+STOP_OPCODE = COMMAND_PACKETS['heartrate_stop'][PAYLOAD_OFFSET:PAYLOAD_OFFSET + 2]  # Aussi la clôture des alarmes
+UNBIND_OPCODE = COMMAND_PACKETS['unbind'][PAYLOAD_OFFSET:PAYLOAD_OFFSET + 2]
+VIBRATION_OPCODE = VIBRATION_PACKETS['1'][PAYLOAD_OFFSET:PAYLOAD_OFFSET + 2]
+ALARM_OPCODE = COMMAND_FACTORY.render('alarm_init')[PAYLOAD_OFFSET]
+ALARM_DELETE = 0x35
+ALARM_INIT_STAGE = COMMAND_FACTORY.render('alarm_init')[ALARM_STAGE_OFFSET]
+
+# Authentification: paquets reconnus à leur en-tête, opcode compris (la date varie)
+AUTH_PREFIXES = [packet[:PAYLOAD_OFFSET + 2] for packet in AUTH_SEQUENCE]
+
+# Type de mesure (octet 8 de la commande de démarrage) -> métrique
+MEASURE_KINDS = {
+    COMMAND_PACKETS[metric][PAYLOAD_OFFSET + 2]: metric
+    for metric in FRAME_METRICS
+    if COMMAND_PACKETS[metric][PAYLOAD_OFFSET:PAYLOAD_OFFSET + 2] == MEASURE_OPCODE
+}
+
+# Valeurs simulées: (valeur initiale, pas max de la marche aléatoire, bornes)
+VITALS = {
+    'heartrate': (72, 2, (50, 110)),
+    'o2': (97, 1, (92, 100)),
+    'temperature': (36.6, 0.1, (36.0, 37.5)),
+}
+
+
+class SimulatedDevice:
+    """Appareil annoncé par le scan simulé (mêmes attributs qu'un BLEDevice)"""
+
+    def __init__(self, address, name):
+        self.address = address
+        self.name = name
+
+
+class SimulatedRing:
+    """Bague simulée en mémoire, à la place du matériel
+
+    Acquitte chaque écriture dont le checksum est valide (octet de
+    transaction repris), suit la séquence AUTH_PACKETS, émet des trames de mesure au format de
+    FRAME_SCHEMA toutes les notify_interval secondes, enregistre les
+    vibrations et les alarmes programmées par beta_alarm.
+
+    Les réponses sont planifiées par call_later (pas de tâche par
+    trame): plusieurs centaines de bagues tiennent dans une boucle.
+    """
+
+    def __init__(self, address=RING_ADDRESS, name=None, notify_interval=SIM_NOTIFY_INTERVAL,
+                 latency=SIM_LATENCY, jitter=SIM_JITTER, drop_rate=SIM_DROP_RATE,
+                 measure_duration=SIM_MEASURE_DURATION, require_auth=True, seed=None):
+        self.device = SimulatedDevice(address, name or f"SIM {address[-4:]}")
+        self.notify_interval = notify_interval
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.measure_duration = measure_duration
+        self.require_auth = require_auth
+        self.random = random.Random(seed)
+
+        self.client = None  # SimulatedClient connecté
+        self.auth_progress = 0
+        self.measurements = {}  # {métrique: timer de la prochaine trame}
+        self.values = {metric: start for metric, (start, _, _) in VITALS.items()}
+        self.steps = self.random.randint(0, 5000)
+        self.vibrations = []  # [(temps monotone, type)]
+        self.alarms = {}  # {nom utf-16: {'day_mask', 'hour', 'minute', 'enabled'}}
+        self.staged_alarms = []  # Configurations en attente de finalisation
+        self.alarm_transaction = False  # Initialisation reçue, finalisation attendue
+        self.writes = 0
+        self.bad_checksums = 0
+        self.notifications = 0
+        self.dropped = 0
+
+    @property
+    def address(self):
+        return self.device.address
+
+    @property
+    def authenticated(self):
+        return self.auth_progress == len(AUTH_PREFIXES)
+
+    # --- Émission -----------------------------------------------------------
+
+    def _delay(self):
+        return max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+
+    def _notify(self, data):
+        """Planifier une notification après la latence simulée (ou la perdre)"""
+        if self.drop_rate and self.random.random() < self.drop_rate:
+            self.dropped += 1
+            return
+        asyncio.get_running_loop().call_later(self._delay(), self._deliver, self.client, data)
+
+    def _deliver(self, client, data):
+        # Client déconnecté entre-temps: la trame est perdue
+        if client is self.client and client.is_connected:
+            self.notifications += 1
+            client.deliver(NOTIFY_CHAR_UUID, bytearray(data))
+
+    def _ack(self, data):
+        # 00 05 83 40 <flag> <transaction> <opcode 2 bytes> <statut 00> <checksum>
+        frame = bytes((0x00, 0x05)) + data[2:PAYLOAD_OFFSET + 2] + bytes(1)
+        self._notify(frame + checksum(frame))
+
+    # --- Mesures ------------------------------------------------------------
+
+    def _next_value(self, metric):
+        _, step, (low, high) = VITALS[metric]
+        value = self.values[metric] + self.random.uniform(-step, step)
+        self.values[metric] = min(high, max(low, value))
+        return self.values[metric]
+
+    def _start_measurement(self, metric, transaction):
+        self._stop_measurement(metric)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.measure_duration
+        self.measurements[metric] = loop.call_later(
+            self._delay(), self._emit_measurement, metric, transaction, deadline
+        )
+
+    def _emit_measurement(self, metric, transaction, deadline):
+        loop = asyncio.get_running_loop()
+        if loop.time() >= deadline:
+            self.measurements.pop(metric, None)
+            return
+        self._notify(encode_frame(metric, self._next_value(metric), transaction))
+        self.measurements[metric] = loop.call_later(
+            self.notify_interval, self._emit_measurement, metric, transaction, deadline
+        )
+
+    def _stop_measurement(self, metric=None):
+        for name in [metric] if metric else list(self.measurements):
+            timer = self.measurements.pop(name, None)
+            if timer:
+                timer.cancel()
+
+    # --- Alarmes (beta_alarm) -----------------------------------------------
+
+    def _alarm_packet(self, data):
+        if len(data) == ALARM_CONFIG_LENGTH:
+            day_mask, hour, minute, enabled = ALARM_SETTINGS.unpack_from(data, 16)
+            name = bytes(data[ALARM_NAME_OFFSET:ALARM_CHECKSUM_OFFSET]).rstrip(b'\x00')
+            settings = {'day_mask': day_mask, 'hour': hour, 'minute': minute, 'enabled': bool(enabled)}
+            self.staged_alarms.append((data[PAYLOAD_OFFSET + 1], name, settings))
+        elif data[ALARM_STAGE_OFFSET] == ALARM_INIT_STAGE:
+            self.alarm_transaction = True
+            self.staged_alarms.clear()
+        else:
+            self._commit_alarms()
+
+    def _commit_alarms(self):
+        """Finalisation: appliquer les configurations reçues"""
+        for command, name, settings in self.staged_alarms:
+            if command == ALARM_DELETE:
+                self.alarms.pop(name, None)
+            elif name in self.alarms or len(self.alarms) < RING_ALARM_SLOTS:
+                self.alarms[name] = settings
+        self.staged_alarms.clear()
+        self.alarm_transaction = False
+
+    # --- Écritures ----------------------------------------------------------
+
+    @staticmethod
+    def _checksum_valid(data):
+        frame, trailer = data[:-2], bytes(data[-2:])
+        if data[PAYLOAD_OFFSET] == ALARM_OPCODE:
+            return additive_checksum(frame) == trailer
+        if data[PAYLOAD_OFFSET:PAYLOAD_OFFSET + 2] == STOP_OPCODE:
+            # Arrêt de mesure (CRC-16) ou clôture des alarmes (somme)
+            return trailer in (checksum(frame), additive_checksum(frame))
+        return checksum(frame) == trailer
+
+    def handle_write(self, char_uuid, data):
+        """Réaction de la bague à une écriture GATT"""
+        self.writes += 1
+        if len(data) < PAYLOAD_OFFSET + 2:
+            return
+        if not self._checksum_valid(data):
+            self.bad_checksums += 1
+            return  # Paquet corrompu: pas de réponse
+
+        # Séquence d'authentification, dans l'ordre
+        prefix = data[:PAYLOAD_OFFSET + 2]
+        if self.auth_progress < len(AUTH_PREFIXES) and prefix == AUTH_PREFIXES[self.auth_progress]:
+            self.auth_progress += 1
+        elif prefix == AUTH_PREFIXES[0]:
+            self.auth_progress = 1
+        self._ack(data)
+
+        if self.require_auth and not self.authenticated:
+            return
+
+        opcode = data[PAYLOAD_OFFSET:PAYLOAD_OFFSET + 2]
+        transaction = data[TRANSACTION_OFFSET]
+        if opcode == MEASURE_OPCODE and data[PAYLOAD_OFFSET + 2] in MEASURE_KINDS:
+            self._start_measurement(MEASURE_KINDS[data[PAYLOAD_OFFSET + 2]], transaction)
+        elif opcode == STEPS_OPCODE:
+            self.steps += self.random.randint(0, 20)
+            self._notify(encode_frame('steps', self.steps, transaction))
+        elif opcode == STOP_OPCODE:
+            self._stop_measurement()
+            if self.alarm_transaction:
+                self._commit_alarms()
+        elif opcode == VIBRATION_OPCODE:
+            self.vibrations.append((time.monotonic(), data[PAYLOAD_OFFSET + 2]))
+        elif opcode == UNBIND_OPCODE:
+            self.auth_progress = 0
+            self.alarms.clear()
+        elif data[PAYLOAD_OFFSET] == ALARM_OPCODE:
+            self._alarm_packet(data)
+
+    # --- Lien ---------------------------------------------------------------
+
+    def drop_link(self):
+        """Simuler une perte de lien (test des reconnexions)"""
+        if self.client:
+            self.client.lost()
+
+
+class SimulatedClient:
+    """Client GATT simulé: même interface que BleakClient pour Wakering"""
+
+    def __init__(self, ring, disconnected_callback=None):
+        self.ring = ring
+        self.address = ring.address
+        self.disconnected_callback = disconnected_callback
+        self.is_connected = False
+        self.handlers = {}  # {uuid: callback(sender, data)}
+
+    async def connect(self, timeout=None):
+        await asyncio.sleep(self.ring._delay())
+        if self.ring.client and self.ring.client.is_connected:
+            raise ConnectionError(f"{self.address} déjà connectée")
+        self.ring.client = self
+        self.is_connected = True
+        return True
+
+    async def disconnect(self):
+        if self.is_connected:
+            self.lost()
+        return True
+
+    def lost(self):
+        self.is_connected = False
+        self.ring._stop_measurement()
+        if self.ring.client is self:
+            self.ring.client = None
+        if self.disconnected_callback:
+            self.disconnected_callback(self)
+
+    async def start_notify(self, char_uuid, callback):
+        self.handlers[char_uuid] = callback
+
+    async def write_gatt_char(self, char_uuid, data, response=False):
+        if not self.is_connected:
+            raise ConnectionError(f"{self.address} non connectée")
+        self.ring.handle_write(char_uuid, bytes(data))
+        await asyncio.sleep(0)
+
+    def deliver(self, char_uuid, data):
+        callback = self.handlers.get(char_uuid)
+        if callback:
+            callback(char_uuid, data)
+
+
+class SimulatedTransport:
+    """Transport simulé pour Wakering et RingFleet
+
+    ring = Wakering(address, transport=SimulatedTransport([SimulatedRing(address)]))
+    """
+
+    cache_devices = False  # Ne pas mélanger les bagues simulées au cache réel
+
+    def __init__(self, rings=None):
+        rings = rings if rings is not None else [SimulatedRing()]
+        self.rings = {ring.address.upper(): ring for ring in rings}
+
+    @classmethod
+    def fleet(cls, count, **settings):
+        """count bagues simulées, adresses SIM-0001..."""
+        return cls([SimulatedRing(f"SIM-{i:04d}", **settings) for i in range(1, count + 1)])
+
+    @property
+    def addresses(self):
+        return [ring.address for ring in self.rings.values()]
+
+    async def find_device(self, match, timeout):
+        await asyncio.sleep(0)
+        for ring in self.rings.values():
+            if match(ring.device):
+                return ring.device
+        return None
+
+    def scanner(self, detection_callback):
+        return SimulatedScanner(self, detection_callback)
+
+    def client(self, target, disconnected_callback):
+        address = target if isinstance(target, str) else target.address
+        ring = self.rings.get(address.upper())
+        if ring is None:
+            raise ConnectionError(f"Bague simulée inconnue: {address}")
+        return SimulatedClient(ring, disconnected_callback)
+
+
+class SimulatedScanner:
+    """Scan simulé: chaque bague s'annonce après un délai d'annonce aléatoire"""
+
+    def __init__(self, transport, detection_callback):
+        self.transport = transport
+        self.detection_callback = detection_callback
+        self.timers = []
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        for ring in self.transport.rings.values():
+            self.timers.append(loop.call_later(ring._delay(), self.detection_callback, ring.device, None))
+
+    async def stop(self):
+        for timer in self.timers:
+            timer.cancel()
+        self.timers.clear()
+
+
+async def load_test(count, duration, **settings):
+    """Flotte de count bagues simulées: connexion, authentification, mesure"""
+    from fleet import RingFleet
+    from metrics import snapshot
+
+    transport = SimulatedTransport.fleet(count, **settings)
+    fleet = RingFleet(transport.addresses, concurrency=count, transport=transport)
+    try:
+        await fleet.start()
+        start = time.monotonic()
+        await asyncio.gather(*(
+            fleet.rings[address].measure('heartrate', duration=duration, countdown=False)
+            for address in fleet.ready
+        ))
+        elapsed = time.monotonic() - start
+
+        stats = snapshot()
+        notifications = sum(stats[address]['notifications'] for address in fleet.ready)
+        print(f"📊 {len(fleet.ready)} bague(s), {notifications} notifications "
+              f"en {elapsed:.1f}s ({notifications / elapsed:.0f}/s)")
+    finally:
+        await fleet.stop()
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python simulator.py [nombre de bagues] [durée de mesure] [intervalle]
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    duration = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    interval = float(sys.argv[3]) if len(sys.argv) > 3 else SIM_NOTIFY_INTERVAL
+    asyncio.run(load_test(count, duration, notify_interval=interval))
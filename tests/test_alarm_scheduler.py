@@ -0,0 +1,57 @@
+import unittest
+from datetime import datetime
+from alarm_scheduler import AlarmScheduler, next_occurrence
+
+
+def at(hour, minute, second=0, day=15):
+    return datetime(2025, 1, day, hour, minute, second).timestamp()
+
+
+def alarm(alarm_id, hour, minute, enabled=True):
+    return {'id': alarm_id, 'hour': hour, 'minute': minute, 'enabled': enabled, 'label': alarm_id}
+
+
+class AlarmSchedulerTest(unittest.TestCase):
+    """Échéances: délai de grâce à l'ajout, pas de double déclenchement"""
+
+    def setUp(self):
+        self.scheduler = AlarmScheduler(fire=None, grace=300)
+
+    def fired(self, now):
+        groups, missed = self.scheduler.pop_due(now)
+        return [(deadline, [a['id'] for a in alarms]) for deadline, alarms in groups], missed
+
+    def test_next_occurrence_is_strictly_after(self):
+        self.assertEqual(next_occurrence(7, 30, at(7, 29)), at(7, 30))
+        self.assertEqual(next_occurrence(7, 30, at(7, 30)), at(7, 30, day=16))
+
+    def test_added_during_its_minute_fires(self):
+        now = at(7, 30, 10)
+        self.scheduler.schedule(alarm('a', 7, 30), now)
+        self.assertEqual(self.scheduler.next_deadline()[0], at(7, 30))
+        self.assertEqual(self.fired(now), ([(at(7, 30), ['a'])], []))
+        self.assertEqual(self.scheduler.next_deadline()[0], at(7, 30, day=16))
+
+    def test_loaded_within_grace_fires(self):
+        self.scheduler.load([alarm('a', 7, 30), alarm('b', 7, 20)], at(7, 30, 10))
+        self.assertEqual(self.fired(at(7, 30, 10)), ([(at(7, 30), ['a'])], []))
+        self.assertEqual(self.scheduler.deadlines['b'], at(7, 20, day=16))  # Hors délai
+
+    def test_fired_alarm_not_refired_on_edit_or_reload(self):
+        self.scheduler.load([alarm('a', 7, 30)], at(7, 0))
+        self.assertEqual(self.fired(at(7, 30, 1)), ([(at(7, 30), ['a'])], []))
+        self.scheduler.schedule(alarm('a', 7, 30), at(7, 31))  # Libellé modifié
+        self.scheduler.load([alarm('a', 7, 30)], at(7, 32))  # Resynchronisation
+        self.assertEqual(self.fired(at(7, 33)), ([], []))
+        self.assertEqual(self.scheduler.next_deadline()[0], at(7, 30, day=16))
+
+    def test_disabled_then_enabled_after_firing(self):
+        self.scheduler.schedule(alarm('a', 7, 30), at(7, 0))
+        self.fired(at(7, 30))
+        self.scheduler.schedule(alarm('a', 7, 30, enabled=False), at(7, 31))
+        self.scheduler.schedule(alarm('a', 7, 30), at(7, 32))
+        self.assertEqual(self.fired(at(7, 32)), ([], []))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from alarm_store import AlarmStore
+
+
+class AlarmStoreJournalTest(unittest.TestCase):
+    """Journal + instantané: rechargement et arrêts brutaux"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "alarms.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def open_store(self):
+        return AlarmStore(self.path).load()
+
+    def test_reload_replays_journal(self):
+        store = self.open_store()
+        first = store.add(7, 30, "Réveil")
+        second = store.add(8, 0)
+        store.update(first['id'], enabled=False)
+        store.delete(second['id'])
+
+        reloaded = self.open_store()
+        self.assertEqual(list(reloaded), [dict(first, enabled=False)])
+        self.assertEqual(reloaded.add(9, 0)['id'], 3)  # Ids jamais réutilisés
+
+    def test_torn_tail_is_cut_before_next_append(self):
+        store = self.open_store()
+        kept = store.add(6, 45, "Avant l'arrêt")
+        with open(store.journal_path, 'a', encoding='utf-8') as f:
+            f.write('{"op": "put", "alarm": {"id": 2, "ho')  # Arrêt pendant l'écriture
+
+        store = self.open_store()
+        self.assertEqual(list(store), [kept])
+        added = store.add(7, 0, "Après l'arrêt")
+        store.delete(kept['id'])
+
+        reloaded = self.open_store()
+        self.assertEqual(list(reloaded), [added])
+        with open(store.journal_path, 'rb') as f:
+            for line in f:
+                json.loads(line)  # Plus de fragment dans le journal
+
+    def test_bad_record_is_cut_like_torn_tail(self):
+        store = self.open_store()
+        kept = store.add(6, 45)
+        with open(store.journal_path, 'a', encoding='utf-8') as f:
+            f.write('{"op": "put", "alarm": {"hour": 7}}\n[1, 2]\n')  # JSON valide, sans id
+
+        store = self.open_store()
+        self.assertEqual(list(store), [kept])
+        added = store.add(7, 0)
+        self.assertEqual(list(self.open_store()), [kept, added])
+
+    def test_failed_append_is_retried(self):
+        store = self.open_store()
+        first = store.add(6, 0)
+        size = os.path.getsize(store.journal_path)
+        with mock.patch('alarm_store.os.fsync', side_effect=OSError(28, "No space left on device")):
+            second = store.add(7, 0)
+        self.assertEqual(len(store.pending), 1)
+        self.assertEqual(os.path.getsize(store.journal_path), size)  # Pas de fragment
+
+        third = store.add(8, 0)  # L'écriture suivante reprend la ligne en attente
+        self.assertEqual(store.pending, [])
+        self.assertEqual(list(self.open_store()), [first, second, third])
+
+    def test_close_surfaces_unwritten_changes(self):
+        async def scenario():
+            store = self.open_store()
+            with mock.patch('alarm_store.os.fsync', side_effect=OSError(5, "Input/output error")):
+                alarm = store.add(5, 15)
+                self.assertFalse(await store.flush())
+                self.assertEqual(len(store.pending), 1)
+                with self.assertRaises(OSError):
+                    await store.close()
+            return alarm
+
+        asyncio.run(scenario())
+        self.assertEqual(list(self.open_store()), [])
+
+    def test_compaction_keeps_state(self):
+        async def scenario():
+            store = self.open_store()
+            alarm = store.add(5, 15)
+            await store.close()
+            return alarm
+
+        alarm = asyncio.run(scenario())
+        self.assertEqual(os.path.getsize(self.path + ".journal"), 0)
+        self.assertEqual(list(self.open_store()), [alarm])
+
+
+if __name__ == "__main__":
+    unittest.main()
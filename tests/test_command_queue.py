@@ -0,0 +1,71 @@
+import asyncio
+import unittest
+from command_queue import CommandQueue, PRIORITY_ALARM, PRIORITY_MEASUREMENT, PRIORITY_BULK
+
+
+class CommandQueueTest(unittest.IsolatedAsyncioTestCase):
+    """File d'écriture: priorités, regroupement, échéances, annulation"""
+
+    async def asyncSetUp(self):
+        self.written = []
+        self.gate = asyncio.Event()  # Bloque la première écriture
+        self.gate_first = True
+        self.queue = CommandQueue(self.write)
+
+    async def asyncTearDown(self):
+        self.queue.stop()
+
+    async def write(self, char_uuid, data):
+        if self.gate_first:
+            self.gate_first = False
+            await self.gate.wait()
+        self.written.append(data)
+        return True
+
+    async def test_priority_order(self):
+        first = asyncio.ensure_future(self.queue.send(None, b'bulk-1', PRIORITY_BULK))
+        await asyncio.sleep(0)  # bulk-1 part et bloque l'écrivain
+        sends = [asyncio.ensure_future(self.queue.send(None, data, priority))
+                 for data, priority in ((b'bulk-2', PRIORITY_BULK),
+                                        (b'measure', PRIORITY_MEASUREMENT),
+                                        (b'alarm', PRIORITY_ALARM))]
+        await asyncio.sleep(0)
+        self.gate.set()
+        self.assertEqual(await asyncio.gather(first, *sends), [True] * 4)
+        self.assertEqual(self.written, [b'bulk-1', b'alarm', b'measure', b'bulk-2'])
+
+    async def test_coalesce_keeps_latest_data_once(self):
+        blocker = asyncio.ensure_future(self.queue.send(None, b'blocker'))
+        await asyncio.sleep(0)
+        sends = [asyncio.ensure_future(self.queue.send(None, data, key='vibration'))
+                 for data in (b'v1', b'v2', b'v3')]
+        await asyncio.sleep(0)
+        self.gate.set()
+        self.assertEqual(await asyncio.gather(blocker, *sends), [True] * 4)
+        self.assertEqual(self.written, [b'blocker', b'v3'])
+
+    async def test_deadline_drops_stale_command(self):
+        blocker = asyncio.ensure_future(self.queue.send(None, b'blocker'))
+        await asyncio.sleep(0)
+        stale = asyncio.ensure_future(self.queue.send(None, b'stale', deadline=0.01))
+        await asyncio.sleep(0.05)
+        self.gate.set()
+        self.assertEqual(await asyncio.gather(blocker, stale), [True, False])
+        self.assertEqual(self.written, [b'blocker'])
+
+    async def test_cancelled_caller_removes_command(self):
+        blocker = asyncio.ensure_future(self.queue.send(None, b'blocker'))
+        await asyncio.sleep(0)
+        cancelled = asyncio.ensure_future(self.queue.send(None, b'cancelled'))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        self.gate.set()
+        await blocker
+        await asyncio.sleep(0)
+        self.assertEqual(self.written, [b'blocker'])
+        self.assertEqual(len(self.queue), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import asyncio
+import json
+import os
+import stat
+import tempfile
+import unittest
+from daemon import WakeringDaemon, INVALID_REQUEST, REQUEST_CANCELLED
+from simulator import SimulatedTransport
+
+
+class DaemonSocketTest(unittest.IsolatedAsyncioTestCase):
+    """Socket de contrôle: droits et ids de requête en double"""
+
+    async def asyncSetUp(self):
+        # Fichiers d'alarmes du démon dans un dossier temporaire
+        self.directory = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.directory.name)
+        self.path = os.path.join(self.directory.name, "wakering.sock")
+        transport = SimulatedTransport.fleet(1, latency=0.001)
+        self.daemon = WakeringDaemon(transport.addresses, self.path, transport=transport)
+        self.umask = os.umask(0o022)
+        await self.daemon.start()
+        self.reader, self.writer = await asyncio.open_unix_connection(self.path)
+
+    async def asyncTearDown(self):
+        self.writer.close()
+        await self.daemon.close()
+        os.umask(self.umask)
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+
+    async def send(self, request_id, method, **params):
+        message = {'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params}
+        self.writer.write((json.dumps(message) + '\n').encode())
+        await self.writer.drain()
+
+    async def response(self):
+        while True:
+            message = json.loads(await asyncio.wait_for(self.reader.readline(), 5))
+            if 'id' in message:  # Les notifications de flux n'ont pas d'id
+                return message
+
+    def test_socket_mode(self):
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+
+    async def test_duplicate_id_rejected(self):
+        await self.send(1, 'stream', metric='heartrate')
+        await self.send(1, 'status')
+        rejected = await self.response()
+        self.assertEqual((rejected['id'], rejected['error']['code']), (1, INVALID_REQUEST))
+
+        await self.send(2, 'cancel', id=1)  # Le flux d'origine reste annulable
+        responses = {}
+        for _ in range(2):
+            message = await self.response()
+            responses[message['id']] = message
+        self.assertEqual(responses[2]['result'], True)
+        self.assertEqual(responses[1]['error']['code'], REQUEST_CANCELLED)
+
+    async def test_invalid_id_type_rejected(self):
+        await self.send([1], 'status')
+        rejected = await self.response()
+        self.assertEqual((rejected['id'], rejected['error']['code']), (None, INVALID_REQUEST))
+        await self.send(3, 'status')
+        self.assertIn('result', await self.response())  # Connexion toujours servie
+
+
+if __name__ == "__main__":
+    unittest.main()
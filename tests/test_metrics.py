@@ -0,0 +1,39 @@
+import unittest
+from unittest import mock
+from metrics import RateWindow, RingMetrics
+
+
+class RateWindowTest(unittest.TestCase):
+    """Débit glissant: lecture sans effet de bord"""
+
+    def test_readers_do_not_reset_window(self):
+        window = RateWindow(10)
+        for second in range(100, 110):
+            for _ in range(5):
+                window.add(second + 0.5)
+        first = window.rate(110.2)
+        self.assertEqual(first, 5.0)
+        self.assertEqual(window.rate(110.7), first)  # Second lecteur: même valeur
+
+    def test_old_seconds_leave_window(self):
+        window = RateWindow(10)
+        window.add(100.0, 50)
+        self.assertEqual(window.rate(101.0), 5.0)
+        self.assertEqual(window.rate(111.0), 0.0)
+        window.add(115.0, 10)  # Réutilise le seau de la seconde 105
+        self.assertEqual(window.rate(116.0), 1.0)
+
+    def test_snapshot_rate_is_stable(self):
+        metrics = RingMetrics("AA:BB")
+        with mock.patch('metrics.time.monotonic', return_value=metrics.created + 3.5):
+            for _ in range(30):
+                metrics.notification()
+        with mock.patch('metrics.time.monotonic', return_value=metrics.created + 4.5):
+            rates = [metrics.snapshot()['notifications_per_second'] for _ in range(3)]
+        self.assertEqual(metrics.notifications.value, 30)
+        self.assertTrue(rates[0] > 0)
+        self.assertEqual(len(set(rates)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+from protocol import (
+    COMMAND_FACTORY, crc16, checksum, additive_checksum, with_transaction, build_alarm_config,
+    decode_frame, encode_frame
+)
+
+# Paquets capturés avant le passage aux gabarits (référence octet pour octet)
+CAPTURED = {
+    'heartrate': "00 06 83 40 01 62 31 51 01 01 94 73",
+    'heartrate_stop': "00 04 83 40 01 63 81 17 57 70",
+    'o2': "00 06 83 40 00 1F 31 51 02 01 C1 20",
+    'temperature': "00 06 83 40 00 34 31 51 06 01 0D E4",
+    'unbind': "00 05 83 40 00 2f 10 09 02 15 25",
+    'vibration_1': "00 06 83 40 01 2d 16 10 01 ff d6 5c",
+    'vibration_3': "00 06 83 40 01 2f 16 10 03 ff b0 3e",
+    'vibration_5': "00 06 83 40 01 31 16 10 06 ff 4f cb",
+    'auth_1': "00 05 83 40 00 01 70 71 01 3f dd",
+    'auth_4': "00 18 83 40 00 04 24 02 02 04 38 07 80 00 53 00 41 00 4d 00 53 00 55 00 4e 00 47 3b ed a2",
+}
+
+CAPTURED_DATED = {
+    # (nom, date aa mm jj hh mm ss, paquet)
+    ('steps', "19 06 0C 03 24 22"): "00 0A 83 40 00 9F 33 33 19 06 0C 03 24 22 79 1B",
+    ('auth_7', "19 06 07 05 23 11"): "00 0b 83 40 00 07 38 38 03 19 06 07 05 23 11 31 90",
+    ('auth_10', "19 06 07 05 23 11"): "00 0b 83 40 00 0a 38 38 01 19 06 07 05 23 11 51 73",
+}
+
+# Paquets d'alarme de protocol.build_alarm_config / build_short_packet avant
+# le passage aux gabarits, date 19 06 0B 04 19 (somme additive, little endian)
+ALARM_DATE = bytes.fromhex("19 06 0B 04 19 00")
+LEGACY_ALARM_CONFIG = {
+    # (transaction, masque jours, heure, minute, active, nom, commande)
+    (0x12, 0x7F, 7, 30, True, "Réveil", 0x34):
+        "00 31 83 40 00 12 34 34 19 06 0b 04 19 38 01 05 7f 07 1e 01" + " 00" * 28 + " 52 00 e9 00 76 49 04",
+    (0x13, 0x15, 23, 5, False, "Sieste", 0x35):
+        "00 31 83 40 00 13 34 35 19 06 0b 04 19 38 01 05 15 17 05 00" + " 00" * 28 + " 53 00 69 00 65 47 03",
+}
+LEGACY_ALARM_SHORT = {
+    ('alarm_init', 0x12): "00 0a 83 40 00 12 34 35 19 06 0b 04 19 21 b0 01",
+    ('alarm_final', 0x14): "00 0a 83 40 00 14 34 35 19 06 0b 04 19 38 c9 01",
+    ('alarm_closure', 0x15): "00 04 83 40 00 15 81 17 74 01",
+}
+
+
+class Crc16Test(unittest.TestCase):
+    def test_check_value(self):
+        # Valeur de contrôle du catalogue CRC-16/CCITT-FALSE
+        self.assertEqual(crc16(b"123456789"), 0x29B1)
+
+    def test_empty(self):
+        self.assertEqual(crc16(b""), 0xFFFF)
+
+    def test_checksum_covers_payload_only(self):
+        packet = bytes.fromhex(CAPTURED['vibration_3'])
+        self.assertEqual(checksum(packet[:-2]), packet[-2:])
+        self.assertEqual(with_transaction(packet, 0x42)[-2:], packet[-2:])
+
+
+class CommandFactoryTest(unittest.TestCase):
+    def test_captured_packets(self):
+        for name, packet in CAPTURED.items():
+            with self.subTest(name=name):
+                self.assertEqual(COMMAND_FACTORY.render(name), bytes.fromhex(packet))
+
+    def test_captured_dated_packets(self):
+        for (name, date), packet in CAPTURED_DATED.items():
+            with self.subTest(name=name):
+                self.assertEqual(COMMAND_FACTORY.render(name, date=bytes.fromhex(date)), bytes.fromhex(packet))
+
+    def test_transaction_override(self):
+        packet = COMMAND_FACTORY.render('vibration_3', transaction=0x10)
+        self.assertEqual(packet[5], 0x10)
+        self.assertEqual(packet[6:], bytes.fromhex(CAPTURED['vibration_3'])[6:])
+
+
+class AlarmPacketTest(unittest.TestCase):
+    """Paquets d'alarme identiques à ceux d'avant les gabarits"""
+
+    def test_config_packets(self):
+        for (transaction, day_mask, hour, minute, enabled, name, command), packet in LEGACY_ALARM_CONFIG.items():
+            with self.subTest(name=name):
+                built = build_alarm_config(transaction, day_mask, hour, minute, enabled,
+                                           name.encode('utf-16le'), command, date=ALARM_DATE)
+                self.assertEqual(built, bytes.fromhex(packet))
+
+    def test_short_packets(self):
+        for (name, transaction), packet in LEGACY_ALARM_SHORT.items():
+            with self.subTest(name=name):
+                self.assertEqual(COMMAND_FACTORY.render(name, transaction, date=ALARM_DATE), bytes.fromhex(packet))
+
+    def test_init_and_final_differ_at_any_date(self):
+        init = COMMAND_FACTORY.render('alarm_init', 0x12)
+        final = COMMAND_FACTORY.render('alarm_final', 0x12)
+        self.assertEqual((init[13], final[13]), (0x21, 0x38))
+        self.assertEqual(init[-2:], additive_checksum(init[:-2]))
+
+    def test_closure_differs_from_measurement_stop(self):
+        # Même payload 81 17: seul le checksum sépare clôture et arrêt de mesure
+        closure = COMMAND_FACTORY.render('alarm_closure', 0x63)
+        stop = bytes.fromhex(CAPTURED['heartrate_stop'])
+        self.assertEqual(closure[6:8], stop[6:8])
+        self.assertEqual(stop[-2:], checksum(stop[:-2]))
+        self.assertEqual(closure[-2:], additive_checksum(closure[:-2]))
+
+
+class FrameTest(unittest.TestCase):
+    def test_round_trip(self):
+        for metric, value in (('heartrate', 72), ('o2', 97), ('temperature', 36.6), ('steps', 1234)):
+            with self.subTest(metric=metric):
+                self.assertEqual(decode_frame(encode_frame(metric, value), hint=metric), (metric, value))
+
+
+if __name__ == "__main__":
+    unittest.main()
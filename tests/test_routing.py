@@ -0,0 +1,45 @@
+import asyncio
+import unittest
+from protocol import encode_frame
+from simulator import SimulatedRing, SimulatedTransport
+from wakering import Wakering
+
+
+class RouteFrameTest(unittest.TestCase):
+    """Attribution des trames de mesure (octet de transaction, disposition)"""
+
+    def setUp(self):
+        sim = SimulatedRing()
+        self.ring = Wakering(sim.address, transport=SimulatedTransport([sim]))
+
+    def activate(self, *metrics):
+        self.ring.active_measurements = {metric: asyncio.Event() for metric in metrics}
+
+    def misses(self):
+        return sum(counter.value for counter in self.ring.metrics.decode_misses.values())
+
+    def test_transaction_selects_metric(self):
+        self.activate('heartrate', 'o2')
+        self.assertEqual(self.ring._route_frame(encode_frame('o2', 95)), ('o2', 95))
+        self.assertEqual(self.ring._route_frame(encode_frame('heartrate', 95)), ('heartrate', 95))
+
+    def test_frame_of_inactive_metric_is_dropped(self):
+        # o2 arrêtée mais la bague envoie encore: pas un échantillon heartrate
+        self.activate('heartrate')
+        self.ring.notification_handler(None, encode_frame('o2', 95))
+        self.assertIsNone(self.ring.analyzer.current_bpm)
+        self.assertEqual(self.misses(), 1)
+
+    def test_shared_layout_without_transaction_is_dropped(self):
+        self.activate('heartrate', 'o2')
+        self.assertIsNone(self.ring._route_frame(encode_frame('o2', 95, transaction=0)))
+
+    def test_layout_fallback_without_transaction(self):
+        self.activate('o2', 'temperature')
+        self.assertEqual(self.ring._route_frame(encode_frame('o2', 95, transaction=0)), ('o2', 95))
+        self.assertEqual(self.ring._route_frame(encode_frame('temperature', 36.5, transaction=0)),
+                         ('temperature', 36.5))
+
+
+if __name__ == "__main__":
+    unittest.main()
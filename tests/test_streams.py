@@ -0,0 +1,70 @@
+import asyncio
+import unittest
+from simulator import SimulatedRing, SimulatedTransport
+from wakering import Wakering
+
+
+class SubscribeTest(unittest.IsolatedAsyncioTestCase):
+    """Abonnements concurrents à une même métrique"""
+
+    async def asyncSetUp(self):
+        sim = SimulatedRing()
+        self.ring = Wakering(sim.address, transport=SimulatedTransport([sim]))
+        self.writes = []
+        self.result = True
+
+        async def write_data(data, *args, **kwargs):
+            self.writes.append(data)
+            await asyncio.sleep(0.01)  # Démarrage en cours pendant que d'autres arrivent
+            return self.result
+
+        self.ring.write_data = write_data
+
+    async def test_joiners_share_one_start(self):
+        streams = [self.ring.stream('heartrate') for _ in range(3)]
+        await asyncio.gather(*(stream.start() for stream in streams))
+        self.assertEqual(len(self.writes), 1)
+        self.assertEqual([stream.started for stream in streams], [True, False, False])
+        self.assertEqual(self.ring.streams['heartrate'], streams)
+
+    async def test_failed_start_fails_every_joiner(self):
+        self.result = False
+        streams = [self.ring.stream('heartrate') for _ in range(3)]
+        results = await asyncio.gather(*(stream.start() for stream in streams), return_exceptions=True)
+        self.assertTrue(all(isinstance(result, ConnectionError) for result in results))
+        self.assertNotIn('heartrate', self.ring.streams)
+        self.assertNotIn('heartrate', self.ring.active_measurements)
+
+    async def test_retry_after_failed_start(self):
+        self.result = False
+        with self.assertRaises(ConnectionError):
+            await self.ring.stream('o2').start()
+        self.result = True
+        stream = self.ring.stream('o2')
+        await stream.start()
+        self.assertTrue(stream.started)
+        self.assertIn('o2', self.ring.active_measurements)
+
+
+class SampleStreamGetTest(unittest.IsolatedAsyncioTestCase):
+    """Lecture avec délai: échantillon, None à l'échéance, annulation jamais perdue"""
+
+    async def asyncSetUp(self):
+        self.stream = Wakering(SimulatedRing().address).stream('heartrate')
+
+    async def test_timeout_then_sample(self):
+        self.assertIsNone(await self.stream.get(0.01))
+        asyncio.get_running_loop().call_later(0.01, self.stream.push, 'sample')
+        self.assertEqual(await self.stream.get(1), 'sample')
+
+    async def test_cancel_racing_sample(self):
+        reader = asyncio.ensure_future(self.stream.get(5))
+        await asyncio.sleep(0)
+        self.stream.push('sample')  # Échantillon et annulation au même tour
+        reader.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await reader
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import asyncio
+import unittest
+from simulator import SimulatedRing, SimulatedTransport
+from wakering import Wakering
+
+
+class WriteAckTest(unittest.IsolatedAsyncioTestCase):
+    """Attente de l'acquittement dans write_data"""
+
+    async def asyncSetUp(self):
+        sim = SimulatedRing(latency=0)
+        self.ring = Wakering(sim.address, transport=SimulatedTransport([sim]))
+        await self.ring.connect()
+
+        async def send(*args):
+            return True  # Écrit, pas de réponse: l'acquittement est donné par le test
+
+        self.ring.commands.send = send
+
+    async def asyncTearDown(self):
+        await self.ring.disconnect()
+
+    async def test_cancel_racing_ack_is_not_lost(self):
+        packet = bytes.fromhex("00 06 83 40 01 62 31 51 01 01 94 73")
+        write = asyncio.ensure_future(self.ring.write_data(packet, ack_timeout=5))
+        await asyncio.sleep(0)
+        self.ring.pending_acks[packet[5]].set_result(True)  # Réponse et annulation au même tour
+        write.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await write
+
+    async def test_missing_ack_with_require_ack(self):
+        packet = bytes.fromhex("00 06 83 40 01 62 31 51 01 01 94 73")
+        self.assertFalse(await self.ring.write_data(packet, ack_timeout=0.01, require_ack=True))
+        self.assertTrue(await self.ring.write_data(packet, ack_timeout=0.01))
+        self.assertNotIn(packet[5], self.ring.pending_acks)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+try:
+    from bleak import BleakClient, BleakScanner
+except ImportError:  # Simulateur seul (machine sans Bluetooth)
+    BleakClient = BleakScanner = None
+
+
+class BleakTransport:
+    """Transport par défaut: Bluetooth via bleak
+
+    Un transport fournit à Wakering et RingFleet le scan et les clients
+    GATT. Tout objet exposant les mêmes méthodes convient (voir
+    simulator.SimulatedTransport).
+    """
+
+    cache_devices = True  # Connexion directe via le cache des appareils
+
+    def _require_bleak(self):
+        if BleakClient is None:
+            raise RuntimeError("bleak n'est pas installé (pip install bleak)")
+
+    async def find_device(self, match, timeout):
+        """Premier appareil pour lequel match(device) est vrai, ou None"""
+        self._require_bleak()
+        return await BleakScanner.find_device_by_filter(
+            lambda device, adv: match(device), timeout=timeout
+        )
+
+    def scanner(self, detection_callback):
+        """Scanner avec start()/stop() appelant detection_callback(device, adv)"""
+        self._require_bleak()
+        return BleakScanner(detection_callback=detection_callback)
+
+    def client(self, target, disconnected_callback):
+        """Client GATT (connect, disconnect, start_notify, write_gatt_char, is_connected)"""
+        self._require_bleak()
+        return BleakClient(target, disconnected_callback=disconnected_callback)
@@ -1,89 +1,314 @@
 import asyncio
-import binascii
-from bleak import BleakClient, BleakScanner
+import logging
+import time
+from functools import partial
 from config import *
-from data_analyzer import DataAnalyzer
+from data_analyzer import DataAnalyzer, Sample
+from sample_stream import SampleStream
+from convergence import ConvergenceRule
+from protocol import (
+    to_bytes, COMMAND_FACTORY, auth_sequence,
+    TRANSACTION_OFFSET, MEASUREMENT_TRANSACTIONS, SHARED_LAYOUTS, FRAME_HEADER
+)
+from metrics import ring_metrics
+from frame_log import logger, HexDump, FrameCapture, DIRECTION_IN, DIRECTION_OUT
+from device_cache import load_cached_device, save_cached_device, forget_cached_device
+from transport import BleakTransport
+from command_queue import CommandQueue, PRIORITY_ALARM, PRIORITY_CONTROL, PRIORITY_MEASUREMENT
 
 
 
 
 class Wakering:
-   def __init__(self, address):
+   def __init__(self, address, store=None, transport=None):
        self.address = address
+       self.transport = transport or BleakTransport()  # ou simulator.SimulatedTransport
        self.client = None
-       self.analyzer = DataAnalyzer()
+       self.store = store  # SampleStore optionnel: historique sur disque
+       self.analyzer = DataAnalyzer(sink=partial(store.put, address) if store else None)
        self.is_authenticated = False
-       self.measuring_type = None  # 'heartrate', 'o2', 'temperature', 'steps', None
+       self.active_measurements = {}  # {'heartrate'|'o2'|'temperature'|'steps': événement valeur reçue}
+       self.streams = {}  # {métrique: [SampleStream]} abonnés aux échantillons décodés
+       self.starting = {}  # {métrique: future du démarrage en cours (succès)}
+       self.convergence_times = {}  # {métrique: secondes avant stabilisation (mode adaptatif)}
+       self.metrics = ring_metrics(address)
+       self.frames = FrameCapture()  # Dernières trames brutes (post-mortem)
+       self.recorder = None  # CaptureWriter optionnel: tout le trafic sur disque
+       self.alarm_sync = None  # AlarmSync optionnel: prévenue de l'authentification et de la dissociation
+       self.pending_acks = {}  # {transaction: future} résolus par notification_handler
+       self.commands = CommandQueue(self._write_gatt, self.metrics)  # Seul écrivain de la bague
+       self.device = None  # Dernier appareil connecté, cible des reconnexions
+       self.closing = False  # Déconnexion volontaire: pas de reconnexion
+       self.reconnect_task = None
 
 
 
 
-   async def connect(self):
-       """Se connecter à la bague"""
+   def matches(self, device):
+       """La bague recherchée: adresse configurée ou nom aizo/ring"""
+       return (device.address.upper() == self.address.upper() or
+               bool(device.name and ("aizo" in device.name.lower() or "ring" in device.name.lower())))
+
+
+
+
+   async def discover(self, timeout=SCAN_TIMEOUT):
+       """Scanner jusqu'à la première bague correspondante (arrêt immédiat)"""
        print(f"🔍 Recherche de la bague...")
-       devices = await BleakScanner.discover()
-       target_device = None
+       return await self.transport.find_device(self.matches, timeout)
+
+
+
+
+   async def _open(self, target_device, timeout=None):
+       """Ouvrir la connexion GATT et s'abonner aux notifications"""
+       try:
+           # Dans le try: une bague injoignable ne doit pas tuer la reconnexion
+           self.client = self.transport.client(target_device, self._on_disconnect)
+           if timeout:
+               await self.client.connect(timeout=timeout)
+           else:
+               await self.client.connect()
+           await self.client.start_notify(NOTIFY_CHAR_UUID, self.notification_handler)
+           self.device = target_device
+           self.closing = False
+           return True
+       except Exception as e:
+           print(f"❌ Erreur: {e}")
+           return False
+
+
+
+
+   async def connect_direct(self, cached_address):
+       """Connexion sans scan au dernier appareil connu"""
+       print(f"⚡ Connexion directe à {cached_address}...")
+       if await self._open(cached_address, DIRECT_CONNECT_TIMEOUT):
+           print("✅ Connecté")
+           return True
       
-       for device in devices:
-           if (device.address.upper() == self.address.upper() or
-               (device.name and ("aizo" in device.name.lower() or "ring" in device.name.lower()))):
-               target_device = device
-               break
+       print("⚠️ Connexion directe échouée")
+       if self.transport.cache_devices:
+           forget_cached_device(self.address)
+       return False
+
+
+
+
+   async def connect(self, device=None):
+       """Se connecter à la bague
+
+       device : appareil déjà résolu (ex. scan partagé d'une flotte),
+       sinon connexion directe au dernier appareil connu puis scan.
+       """
+       target_device = device
+       if target_device is None:
+           cached_address = load_cached_device(self.address) if self.transport.cache_devices else None
+           if cached_address and await self.connect_direct(cached_address):
+               return True
+          
+           target_device = await self.discover()
       
        if not target_device:
            print("❌ Bague non trouvée")
            return False
       
-       self.client = BleakClient(target_device)
-       try:
-           await self.client.connect()
-           await self.client.start_notify(NOTIFY_CHAR_UUID, self.notification_handler)
-           print("✅ Connecté")
-           return True
-       except Exception as e:
-           print(f"❌ Erreur: {e}")
+       if not await self._open(target_device):
            return False
+      
+       if self.transport.cache_devices:
+           save_cached_device(self.address, target_device)
+       print("✅ Connecté")
+       return True
+
+
+
+
+   def _on_disconnect(self, client):
+       """Callback Bleak: lien perdu, lancer la reconnexion supervisée"""
+       if self.closing or client is not self.client:
+           return
+      
+       print("\n⚠️ Connexion perdue, reconnexion...")
+       if not self.reconnect_task or self.reconnect_task.done():
+           self.reconnect_task = asyncio.ensure_future(self._reconnect())
+
+
+
+
+   async def _reconnect(self):
+       """Reconnexion avec backoff, réabonnement et ré-authentification"""
+       start = time.monotonic()
+       was_authenticated = self.is_authenticated
+       self.is_authenticated = False
+      
+       for attempt in range(RECONNECT_ATTEMPTS):
+           await asyncio.sleep(RECONNECT_BACKOFF[min(attempt, len(RECONNECT_BACKOFF) - 1)])
+           if self.closing:
+               return False
+          
+           # _open réabonne NOTIFY_CHAR_UUID sur le nouveau client
+           if not await self._open(self.device, DIRECT_CONNECT_TIMEOUT):
+               continue
+          
+           if was_authenticated and not await self.authenticate():
+               await self.client.disconnect()
+               continue
+          
+           # Reprendre les mesures en cours
+           for measure_type in list(self.active_measurements):
+               await self.write_data(COMMAND_FACTORY.render(measure_type),
+                                     self._measure_char_uuid(measure_type),
+                                     priority=PRIORITY_MEASUREMENT)
+          
+           print(f"✅ Reconnectée en {(time.monotonic() - start) * 1000:.0f} ms")
+           return True
+      
+       print(f"❌ Reconnexion impossible après {RECONNECT_ATTEMPTS} tentatives")
+       return False
 
 
 
 
    def notification_handler(self, sender, data):
        """Gestionnaire des notifications"""
-       hex_data = binascii.hexlify(data).decode('utf-8').upper()
-       formatted_hex = ' '.join([hex_data[i:i+2] for i in range(0, len(hex_data), 2)])
+       self.metrics.notification()
+       self.metrics.bytes_in.value += len(data)
+       self.frames.record(DIRECTION_IN, data)
+       if self.recorder:
+           self.recorder.record_notify(getattr(sender, 'uuid', None) or NOTIFY_CHAR_UUID, data)
       
-       if self.measuring_type:
-           print(f"📊 [{self.measuring_type.upper()}] {formatted_hex}")
-           self.analyzer.store_data(self.measuring_type, data)
-          
-           if self.measuring_type == 'heartrate':
-               self.analyzer.analyze_heartrate(data)
-           elif self.measuring_type == 'o2':
-               self.analyzer.analyze_o2(data)
-           elif self.measuring_type == 'temperature':
-               self.analyzer.analyze_temperature(data)
-           elif self.measuring_type == 'steps':
-               self.analyzer.analyze_steps(data)
+       # Acquittement: la réponse reprend l'octet de transaction (offset 5)
+       if len(data) > 5:
+           ack = self.pending_acks.pop(data[5], None)
+           if ack and not ack.done():
+               ack.set_result(data)
+      
+       decoded = self._route_frame(data) if self.active_measurements else None
+       if decoded:
+           metric = decoded[0]
+           self.metrics.decode_hit(metric)
+           if logger.isEnabledFor(logging.DEBUG):
+               logger.debug("📊 [%s] %s", metric.upper(), HexDump(data))
+           timestamp = self.analyzer.store_data(metric, data, decoded[1])
+           self.active_measurements[metric].set()
+           if metric in self.streams:
+               sample = Sample(timestamp, metric, decoded[1], bytes(data))
+               for stream in self.streams[metric]:
+                   stream.push(sample)
        else:
-           print(f"📨 {formatted_hex}")
+           if self.active_measurements and len(data) >= 4:
+               self.metrics.decode_miss((len(data), FRAME_HEADER.unpack_from(data)[0]))
+           if logger.isEnabledFor(logging.DEBUG):
+               logger.debug("📨 %s", HexDump(data))
+
+
+
+
+   def _route_frame(self, data):
+       """Attribuer une trame à une mesure active d'après son contenu
+
+       L'octet de transaction désigne la commande qui a lancé la mesure:
+       une trame qui nomme une mesure inactive (mesure arrêtée mais que la
+       bague envoie encore) est ignorée. Sans octet reconnu, la disposition
+       de la trame (FRAME_SCHEMA) suffit sauf entre heartrate et o2 qui
+       partagent la même: si les deux tournent, la trame est ignorée
+       (comptée non décodée) plutôt qu'attribuée au hasard.
+       """
+       metric = MEASUREMENT_TRANSACTIONS.get(data[TRANSACTION_OFFSET]) if len(data) > TRANSACTION_OFFSET else None
+       if metric is not None:
+           return self.analyzer.analyze(data, metric) if metric in self.active_measurements else None
+      
+       for metric in self.active_measurements:
+           if SHARED_LAYOUTS.get(metric, frozenset()) & self.active_measurements.keys():
+               continue  # Disposition partagée avec une autre mesure active
+           decoded = self.analyzer.analyze(data, metric)
+           if decoded:
+               return decoded
+       return None
+
+
 
 
+   async def _write_gatt(self, write_uuid, data_bytes):
+       """Écriture GATT proprement dite (tâche de la file de commandes)"""
+       await self.client.write_gatt_char(write_uuid, data_bytes)
+       self.metrics.writes.value += 1
+       self.frames.record(DIRECTION_OUT, data_bytes)
+       if self.recorder:
+           self.recorder.record_write(write_uuid, data_bytes)
+       self.metrics.bytes_out.value += len(data_bytes)
+       return True
 
 
-   async def write_data(self, data_hex, char_uuid=None):
-       """Écrire des données"""
+
+
+   async def write_data(self, data, char_uuid=None, ack_timeout=ACK_TIMEOUT, require_ack=False,
+                        priority=PRIORITY_CONTROL, deadline=COMMAND_DEADLINE, coalesce=None):
+       """Écrire des données (bytes, ou hex espacé pour compatibilité)
+
+       L'écriture passe par la file de commandes (self.commands) dans la
+       voie priority; abandonnée (False) si elle n'est pas partie après
+       deadline secondes. coalesce: clé regroupant les doublons en attente.
+       Rend la main dès que la bague répond avec le même octet de
+       transaction, ou après ack_timeout secondes sans réponse. Avec
+       require_ack, une réponse manquante retourne False.
+       """
        if not self.client or not self.client.is_connected:
-           return False
+           # Reconnexion en cours: attendre le retour du lien
+           if (not self.reconnect_task or self.reconnect_task.done() or
+                   asyncio.current_task() is self.reconnect_task):
+               return False
+           try:
+               await asyncio.wait_for(asyncio.shield(self.reconnect_task), RECONNECT_WAIT_TIMEOUT)
+           except asyncio.TimeoutError:
+               return False
+           if not self.client.is_connected:
+               return False
       
+       ack = None
+       transaction = None
        try:
-           data_bytes = bytes.fromhex(data_hex.replace(' ', ''))
+           data_bytes = data if isinstance(data, (bytes, bytearray)) else to_bytes(data)
            write_uuid = char_uuid or WRITE_CHAR_UUID
-           await self.client.write_gatt_char(write_uuid, data_bytes)
-           await asyncio.sleep(0.5)
+          
+           # Enregistrer l'attente avant l'écriture: la réponse peut arriver
+           # avant le retour de write_gatt_char
+           if ack_timeout and len(data_bytes) > 5 and data_bytes[5] not in self.pending_acks:
+               transaction = data_bytes[5]
+               ack = asyncio.get_running_loop().create_future()
+               self.pending_acks[transaction] = ack
+          
+           started = time.perf_counter()
+           if asyncio.current_task() is self.reconnect_task:
+               # Reconnexion (ré-authentification, reprise des mesures):
+               # la file attend le retour du lien, écriture directe
+               written = await self._write_gatt(write_uuid, data_bytes)
+           else:
+               written = await self.commands.send(write_uuid, data_bytes, priority, deadline, coalesce)
+           if not written:
+               return False
+          
+           if ack:
+               # asyncio.wait plutôt que wait_for: un acquittement arrivé au
+               # même tour que l'annulation de l'appelant ne l'efface pas
+               await asyncio.wait((ack,), timeout=ack_timeout)
+               if not ack.done() and require_ack:
+                   return False
+           elif ack_timeout:
+               # Transaction déjà en attente: pas de corrélation possible
+               if require_ack:
+                   return False
+               await asyncio.sleep(ack_timeout)
+           self.metrics.write_latency.observe(time.perf_counter() - started)
            return True
        except Exception as e:
+           self.metrics.write_errors.value += 1
            print(f"❌ Erreur d'écriture: {e}")
            return False
+       finally:
+           if ack and self.pending_acks.get(transaction) is ack:
+               del self.pending_acks[transaction]
 
 
 
@@ -91,40 +316,74 @@ class Wakering:
    async def authenticate(self):
        """Authentifier la bague"""
        print("🔐 Authentification...")
+       started = time.perf_counter()
        success_count = 0
       
-       for i, packet in enumerate(AUTH_PACKETS, 1):
-           if await self.write_data(packet):
+       # Paquets rendus à la date courante (horloge de la bague)
+       packets = auth_sequence()
+       for i, packet in enumerate(packets, 1):
+           if await self.write_data(packet, ack_timeout=AUTH_ACK_TIMEOUT):
                success_count += 1
-           await asyncio.sleep(0.8)
       
-       self.is_authenticated = success_count == len(AUTH_PACKETS)
+       self.is_authenticated = success_count == len(packets)
+       self.metrics.auth_duration.observe(time.perf_counter() - started)
        print(f"✅ Authentifiée" if self.is_authenticated else "❌ Échec auth")
+       if self.is_authenticated and self.alarm_sync:
+           # Contenu des emplacements revérifié à chaque (ré)authentification
+           self.alarm_sync.reload()
        return self.is_authenticated
 
 
 
 
-   async def measure(self, measure_type, duration=20):
-       """Effectuer une mesure"""
-       if measure_type not in COMMANDS:
+   def _measure_char_uuid(self, measure_type):
+       """Caractéristique d'écriture de la commande de mesure"""
+       return HEARTRATE_WRITE_UUID if measure_type in ['heartrate', 'o2', 'temperature'] else WRITE_CHAR_UUID
+
+
+
+
+   async def measure(self, measure_type, duration=20, countdown=True, adaptive=False, rule=None):
+       """Effectuer une mesure
+
+       Plusieurs mesures peuvent tourner en même temps (voir measure_many),
+       chacune reçoit ses trames via _route_frame. En mode adaptatif, la
+       mesure s'arrête dès que la lecture est stable (ConvergenceRule),
+       duration devenant la durée maximale.
+
+       La mesure est un abonné comme les flux (stream): si la métrique
+       tourne déjà, elle s'y joint, et en sortie elle ne l'arrête que si
+       plus personne ne l'écoute.
+       """
+       if measure_type not in MEASUREMENT_TRANSACTIONS.values():
            return False
       
        # Pour les pas, mesure instantanée
        if measure_type == 'steps':
            print(f"🚶 Récupération du nombre de pas...")
-           self.analyzer.clear_data(measure_type)
-           self.measuring_type = measure_type
-           
-           # Envoyer commande
-           success = await self.write_data(COMMANDS[measure_type])
-           if not success:
-               self.measuring_type = None
-               return False
-           
-           # Attendre la réponse (2-3 secondes max)
-           await asyncio.sleep(3)
-           self.measuring_type = None
+           received = self.active_measurements.get(measure_type)
+           if received is None:
+               self.analyzer.clear_data(measure_type)
+               received = self.active_measurements[measure_type] = asyncio.Event()
+               try:
+                   # Envoyer commande
+                   success = await self.write_data(COMMAND_FACTORY.render(measure_type), priority=PRIORITY_MEASUREMENT)
+                   if not success:
+                       return False
+                  
+                   # Attendre la réponse (3 secondes max)
+                   try:
+                       await asyncio.wait_for(received.wait(), 3)
+                   except asyncio.TimeoutError:
+                       pass
+               finally:
+                   del self.active_measurements[measure_type]
+           else:
+               # Demande déjà en cours: attendre sa réponse
+               try:
+                   await asyncio.wait_for(received.wait(), 3)
+               except asyncio.TimeoutError:
+                   pass
            
            # Afficher résultat
            if self.analyzer.current_steps is not None:
@@ -135,30 +394,42 @@ class Wakering:
                return False
        
        # Pour les autres mesures, fonctionnement normal
-       print(f"⏳ Mesure {measure_type}...")
-       self.analyzer.clear_data(measure_type)
-       self.measuring_type = measure_type
-      
-       # Envoyer commande de démarrage
-       char_uuid = HEARTRATE_WRITE_UUID if measure_type in ['heartrate', 'o2', 'temperature'] else WRITE_CHAR_UUID
-       success = await self.write_data(COMMANDS[measure_type], char_uuid)
-      
-       if not success:
-           self.measuring_type = None
-           return False
-      
-       # Attendre pendant la mesure
-       for i in range(duration):
-           await asyncio.sleep(1)
-           remaining = duration - i - 1
-           if remaining > 0:
-               print(f"⏱️ {remaining}s", end='\r')
+       if measure_type in self.active_measurements:
+           print(f"⏳ Mesure {measure_type} (déjà en cours)...")
+       else:
+           print(f"⏳ Mesure {measure_type}...")
+           self.analyzer.clear_data(measure_type)
       
-       # Arrêter la mesure si nécessaire
-       if measure_type == 'heartrate':
-           await self.write_data(COMMANDS['heartrate_stop'])
+       # Abonnement interne: lance la mesure si elle ne tourne pas déjà
+       samples = SampleStream(self, measure_type)
+       self.convergence_times.pop(measure_type, None)  # Pas de temps d'une mesure précédente
+       if adaptive:
+           rule = rule or ConvergenceRule.for_metric(measure_type)
+           rule.reset()
       
-       self.measuring_type = None
+       try:
+           start = time.monotonic()
+           try:
+               await samples.start()
+           except ConnectionError:
+               return False
+          
+           # Attendre pendant la mesure
+           for i in range(duration):
+               if adaptive:
+                   if await self._wait_converged(samples, rule, start, 1):
+                       elapsed = time.monotonic() - start
+                       self.convergence_times[measure_type] = elapsed
+                       print(f"\n⚡ {measure_type} stable après {elapsed:.1f}s")
+                       break
+               else:
+                   await asyncio.sleep(1)
+               remaining = duration - i - 1
+               if countdown and remaining > 0:
+                   print(f"⏱️ {remaining}s", end='\r')
+       finally:
+           # Arrêt (commande stop) seulement si aucun autre abonné n'écoute
+           await samples.aclose()
       
        # Afficher résultat
        if measure_type == 'heartrate':
@@ -172,7 +443,7 @@ class Wakering:
            unit = "°C"
       
        if result is not None:
-           print(f"\n🎯 Résultat: {result}{unit}")
+           print(f"\n🎯 Résultat {measure_type}: {result}{unit}")
            return True
        else:
            print(f"\n❌ Aucun résultat pour {measure_type}")
@@ -181,6 +452,123 @@ class Wakering:
 
 
 
+   async def _wait_converged(self, samples, rule, start, timeout):
+       """Consommer les échantillons pendant timeout secondes
+
+       True dès que la règle de convergence est satisfaite.
+       """
+       deadline = time.monotonic() + timeout
+       while True:
+           remaining = deadline - time.monotonic()
+           if remaining <= 0:
+               return False
+           sample = await samples.get(remaining)
+           if sample is None:
+               return False
+           if rule.update(sample.value) and time.monotonic() - start >= rule.min_duration:
+               return True
+
+
+
+
+   async def measure_many(self, measure_types, duration=20, adaptive=False):
+       """Lancer plusieurs mesures simultanément
+
+       Durée totale ≈ la plus longue mesure: les trames heartrate / o2 sont
+       attribuées par leur octet de transaction. PARALLEL_SHARED_LAYOUTS =
+       False (bague qui ne reprend pas cet octet) les fait passer l'une
+       après l'autre: ≈ 2 x duration (bague simulée, duration=3 non
+       adaptatif: 3,1 s en parallèle contre 6,1 s). Retourne {type: succès}.
+       """
+       chains = []
+       for measure_type in measure_types:
+           shared = SHARED_LAYOUTS.get(measure_type, frozenset()) if not PARALLEL_SHARED_LAYOUTS else frozenset()
+           chain = next((chain for chain in chains if shared.intersection(chain)), None)
+           if chain is None:
+               chains.append([measure_type])
+           else:
+               chain.append(measure_type)
+      
+       async def run(chain):
+           return [(measure_type, await self.measure(measure_type, duration, countdown=False, adaptive=adaptive))
+                   for measure_type in chain]
+      
+       results = dict(pair for pairs in await asyncio.gather(*(run(chain) for chain in chains)) for pair in pairs)
+       return {measure_type: results[measure_type] for measure_type in measure_types}
+
+
+
+
+   def stream(self, metric, maxsize=STREAM_QUEUE_SIZE, overflow=STREAM_OVERFLOW):
+       """Flux asynchrone des échantillons décodés (voir SampleStream)"""
+       if metric not in MEASUREMENT_TRANSACTIONS.values():
+           raise ValueError(f"Métrique inconnue: {metric}")
+       return SampleStream(self, metric, maxsize, overflow)
+
+
+
+
+   async def subscribe(self, stream):
+       """Abonner un flux; lance la mesure si elle ne tourne pas déjà
+
+       Retourne True si la mesure a été lancée pour ce flux. Un flux qui
+       arrive pendant le démarrage en attend l'issue: si la commande
+       échoue, tous les abonnés de la métrique reçoivent ConnectionError.
+       """
+       metric = stream.metric
+       self.streams.setdefault(metric, []).append(stream)
+       starting = self.starting.get(metric)
+       if starting is not None:
+           # Démarrage lancé par un autre abonné: partager son résultat
+           if not await asyncio.shield(starting):
+               raise ConnectionError(f"Impossible de lancer la mesure {metric}")
+           return False
+       if metric in self.active_measurements:
+           return False
+      
+       starting = self.starting[metric] = asyncio.get_running_loop().create_future()
+       self.active_measurements[metric] = asyncio.Event()
+       success = False
+       try:
+           success = await self.write_data(COMMAND_FACTORY.render(metric), self._measure_char_uuid(metric),
+                                           priority=PRIORITY_MEASUREMENT)
+       finally:
+           del self.starting[metric]
+           if not success:
+               # Échec ou annulation: aucun abonné de la métrique ne reste en attente
+               self.streams.pop(metric, None)
+               self.active_measurements.pop(metric, None)
+           starting.set_result(success)
+       if not success:
+           raise ConnectionError(f"Impossible de lancer la mesure {metric}")
+       return True
+
+
+
+
+   async def unsubscribe(self, stream, stop=False):
+       """Désabonner un flux et arrêter la mesure qu'il avait lancée"""
+       streams = self.streams.get(stream.metric, [])
+       if stream in streams:
+           streams.remove(stream)
+       if not streams:
+           self.streams.pop(stream.metric, None)
+       if not stop:
+           return
+      
+       if streams:
+           # D'autres flux lisent encore: leur transmettre l'arrêt
+           streams[0].started = True
+           return
+      
+       self.active_measurements.pop(stream.metric, None)
+       if stream.metric in STOP_COMMANDS:
+           await self.write_data(COMMAND_FACTORY.render(STOP_COMMANDS[stream.metric]),
+                                 priority=PRIORITY_MEASUREMENT, coalesce=STOP_COMMANDS[stream.metric])
+
+
+
+
    async def send_vibration(self, vib_type):
        """Envoyer vibration"""
        if vib_type not in VIBRATIONS:
@@ -188,7 +576,9 @@ class Wakering:
       
        vib = VIBRATIONS[vib_type]
        print(f"📳 {vib['name']}")
-       return await self.write_data(vib['data'])
+       # Voie prioritaire: ne dépend pas des commandes en attente
+       return await self.write_data(COMMAND_FACTORY.render(f'vibration_{vib_type}'), priority=PRIORITY_ALARM,
+                                    coalesce=('vibration', vib_type))
 
 
 
@@ -196,17 +586,19 @@ class Wakering:
    async def unbind(self):
        """Dissocier la bague"""
        print("🔓 Unbind...")
-       success = await self.write_data(COMMANDS['unbind'])
+       success = await self.write_data(COMMAND_FACTORY.render('unbind'), ack_timeout=UNBIND_ACK_TIMEOUT)
        if success:
-           await asyncio.sleep(3)
            print("✅ Dissociée")
+           if self.alarm_sync:
+               # La dissociation vide les emplacements d'alarme de la bague
+               self.alarm_sync.forget()
        return success
 
 
 
 
-   def print_status(self):
-       """Afficher le statut"""
+   def status_line(self):
+       """Statut courant sur une ligne (dernières valeurs décodées)"""
        if self.client and self.client.is_connected:
            auth = "🔐 Auth" if self.is_authenticated else "🔒 Non auth"
            bpm = f"💓 {self.analyzer.current_bpm} BPM" if self.analyzer.current_bpm else "💓 -"
@@ -214,15 +606,27 @@ class Wakering:
            temp = f"🌡️ {self.analyzer.current_temperature:.1f} °C" if self.analyzer.current_temperature else "🌡️ -"
            steps = f"🚶 {self.analyzer.current_steps} pas" if self.analyzer.current_steps is not None else "🚶 -"
           
-           print(f"\n📊 ✅ Connectée | {auth} | {bpm} | {o2} | {temp} | {steps}")
-       else:
-           print("\n📊 ❌ Déconnectée")
+           return f"✅ Connectée | {auth} | {bpm} | {o2} | {temp} | {steps}"
+       if self.reconnect_task and not self.reconnect_task.done():
+           return "🔄 Reconnexion..."
+       return "❌ Déconnectée"
+
+
+
+
+   def print_status(self):
+       """Afficher le statut"""
+       print(f"\n📊 {self.status_line()}")
 
 
 
 
    async def disconnect(self):
        """Se déconnecter"""
+       self.closing = True
+       if self.reconnect_task and not self.reconnect_task.done():
+           self.reconnect_task.cancel()
+       self.commands.stop()
        if self.client and self.client.is_connected:
            await self.client.disconnect()
            print("🔌 Déconnectée")
\ No newline at end of file